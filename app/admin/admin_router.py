@@ -5,9 +5,23 @@ from fastapi.security import OAuth2PasswordBearer
 from starlette.templating import _TemplateResponse
 from typing import List, Dict
 from logging_manager import logger
-from admin.db_manager import AdminRepository
+from admin.db_manager import AdminRepository, analytics_cache
 from admin.admin_schemes import ParkingLocationSchema, ParkingSpotSchema, AdminUserSchema, UpdatePriceSchema, BookingSchema
-from db_conn import DB_connection
+from db_conn import UnitOfWork, db_registry, route_stats, unit_of_work
+from sql_monitor import sql_monitor
+from password_hasher import password_hasher
+from scheduler import sweep_stats
+from expiry_engine import expiry_engine
+from kafka_producer import kafka_producer
+from cache_invalidation import cache_invalidation
+from outbox_relay import outbox_relay
+from payments.booking_consumer import booking_consumer, booking_store
+from users.availability_cache import availability_summary
+from users.spot_index import spot_index
+from users.price_table import price_table
+from users.principal_cache import principal_cache
+from users.spot_stream import spot_stream
+from users.notification_inbox import notification_inbox
 import configparser
 from datetime import datetime
 
@@ -18,13 +32,18 @@ config = configparser.ConfigParser()
 config.read('config.ini')
 user_server = config['BD INFO']['USER_DB']
 pay_server = config['BD INFO']['PAY_DB']
-user_db = DB_connection(user_server)
-pay_db = DB_connection(pay_server)
+user_db = db_registry.get(user_server)
+pay_db = db_registry.get(pay_server)
+user_unit_of_work = unit_of_work(user_db)
+pay_unit_of_work = unit_of_work(pay_db)
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/login")
 
-def get_admin_repository() -> AdminRepository:
-    return AdminRepository(user_db, pay_db)
+def get_admin_repository(
+    user_unit: UnitOfWork = Depends(user_unit_of_work),
+    pay_unit: UnitOfWork = Depends(pay_unit_of_work)
+) -> AdminRepository:
+    return AdminRepository(user_unit, pay_unit)
 
 async def get_token_from_cookie(request: Request):
     token = request.cookies.get("access_token")
@@ -32,12 +51,19 @@ async def get_token_from_cookie(request: Request):
         raise HTTPException(status_code=401, detail="Токен не найден в cookies")
     return token
 
+async def get_current_admin(
+    token: str = Depends(get_token_from_cookie),
+    repository: AdminRepository = Depends(get_admin_repository)
+) -> AdminUserSchema:
+    return await repository.get_current_admin(token)
+
 @router.get("/admin/dashboard", response_class=HTMLResponse)
 async def get_dashboard(
     request: Request,
-    current_admin: AdminUserSchema = Depends(lambda: get_admin_repository().get_current_admin(get_token_from_cookie))
+    current_admin: AdminUserSchema = Depends(get_current_admin),
+    repository: AdminRepository = Depends(get_admin_repository)
 ) -> _TemplateResponse:
-    parkings = await get_admin_repository().get_parkings()
+    parkings = await repository.get_parkings()
     logger.info(f"Парковки для dashboard: {parkings}")
     return templates.TemplateResponse(
         "admin.html",
@@ -46,32 +72,36 @@ async def get_dashboard(
 
 @router.get("/admin/parkings", response_model=List[ParkingLocationSchema])
 async def get_parkings(
-    current_admin: AdminUserSchema = Depends(lambda: get_admin_repository().get_current_admin(get_token_from_cookie))
+    current_admin: AdminUserSchema = Depends(get_current_admin),
+    repository: AdminRepository = Depends(get_admin_repository)
 ):
-    return await get_admin_repository().get_parkings()
+    return await repository.get_parkings()
 
 @router.get("/admin/spots/{location_id}")
 async def get_spots(
     location_id: int,
-    current_admin: AdminUserSchema = Depends(lambda: get_admin_repository().get_current_admin(get_token_from_cookie))
+    current_admin: AdminUserSchema = Depends(get_current_admin),
+    repository: AdminRepository = Depends(get_admin_repository)
 ) -> Dict:
-    return await get_admin_repository().get_spots_by_parking(location_id)
+    return await repository.get_spots_by_parking(location_id)
 
 @router.post("/admin/spots/{spot_id}/reserve")
 async def reserve_spot(
     spot_id: int,
-    current_admin: AdminUserSchema = Depends(lambda: get_admin_repository().get_current_admin(get_token_from_cookie))
+    current_admin: AdminUserSchema = Depends(get_current_admin),
+    repository: AdminRepository = Depends(get_admin_repository)
 ):
-    await get_admin_repository().update_spot_status(spot_id, False)
+    await repository.update_spot_status(spot_id, False)
     return {"message": f"Место {spot_id} зарезервировано"}
 
 @router.post("/admin/spots/{spot_id}/free")
 async def free_spot(
     spot_id: int,
-    current_admin: AdminUserSchema = Depends(lambda: get_admin_repository().get_current_admin(get_token_from_cookie))
+    current_admin: AdminUserSchema = Depends(get_current_admin),
+    repository: AdminRepository = Depends(get_admin_repository)
 ):
     try:
-        await get_admin_repository().update_spot_status(spot_id, True)
+        await repository.update_spot_status(spot_id, True)
         return {"message": f"Место {spot_id} освобождено, связанная бронь отменена"}
     except HTTPException as e:
         logger.error(f"Ошибка при освобождении места {spot_id}: {e.detail}")
@@ -84,25 +114,28 @@ async def free_spot(
 async def update_spot_price(
     spot_id: int,
     price_data: UpdatePriceSchema,
-    current_admin: AdminUserSchema = Depends(lambda: get_admin_repository().get_current_admin(get_token_from_cookie))
+    current_admin: AdminUserSchema = Depends(get_current_admin),
+    repository: AdminRepository = Depends(get_admin_repository)
 ):
-    await get_admin_repository().update_spot_price(spot_id, price_data.price)   
+    await repository.update_spot_price(spot_id, price_data.price)   
     return {"message": f"Цена места {spot_id} обновлена"}
 
 @router.get("/admin/users", response_model=List[AdminUserSchema])
 async def get_users(
-    current_admin: AdminUserSchema = Depends(lambda: get_admin_repository().get_current_admin(get_token_from_cookie))
+    current_admin: AdminUserSchema = Depends(get_current_admin),
+    repository: AdminRepository = Depends(get_admin_repository)
 ):
-    users = await get_admin_repository().get_all_users()
+    users = await repository.get_all_users()
     logger.info(f"Получен список пользователей: {len(users)} записей")
     return users
 
 @router.get("/admin/users/{user_id}/bookings", response_model=List[BookingSchema])
 async def get_user_bookings(
     user_id: int,
-    current_admin: AdminUserSchema = Depends(lambda: get_admin_repository().get_current_admin(get_token_from_cookie))
+    current_admin: AdminUserSchema = Depends(get_current_admin),
+    repository: AdminRepository = Depends(get_admin_repository)
 ):
-    bookings = await get_admin_repository().get_user_bookings(user_id)
+    bookings = await repository.get_user_bookings(user_id)
     logger.info(f"Получено {len(bookings)} бронирований для пользователя {user_id}")
     return bookings
 
@@ -110,21 +143,23 @@ async def get_user_bookings(
 async def update_user_status(
     user_id: int,
     status_data: dict,
-    current_admin: AdminUserSchema = Depends(lambda: get_admin_repository().get_current_admin(get_token_from_cookie))
+    current_admin: AdminUserSchema = Depends(get_current_admin),
+    repository: AdminRepository = Depends(get_admin_repository)
 ):
     status = status_data.get("status")
     if status not in ["White", "Black"]:
         raise HTTPException(status_code=400, detail="Недопустимое значение статуса")
-    await get_admin_repository().update_user_status(user_id, status)
+    await repository.update_user_status(user_id, status)
     return {"message": f"Статус пользователя {user_id} обновлен на {status}"}
 
 @router.get("/admin/analytics/parkings")
 async def get_parkings_analytics(
     start_date: datetime,
     end_date: datetime,
-    current_admin: AdminUserSchema = Depends(lambda: get_admin_repository().get_current_admin(get_token_from_cookie))
+    current_admin: AdminUserSchema = Depends(get_current_admin),
+    repository: AdminRepository = Depends(get_admin_repository)
 ):
-    analytics = await get_admin_repository().get_parkings_analytics(start_date, end_date)
+    analytics = await repository.get_parkings_analytics(start_date, end_date)
     logger.info(f"Получена аналитика парковок за период {start_date} - {end_date}: {analytics}")
     return analytics
 
@@ -132,9 +167,10 @@ async def get_parkings_analytics(
 async def get_spots_analytics(
     start_date: datetime,
     end_date: datetime,
-    current_admin: AdminUserSchema = Depends(lambda: get_admin_repository().get_current_admin(get_token_from_cookie))
+    current_admin: AdminUserSchema = Depends(get_current_admin),
+    repository: AdminRepository = Depends(get_admin_repository)
 ):
-    analytics = await get_admin_repository().get_spots_analytics(start_date, end_date)
+    analytics = await repository.get_spots_analytics(start_date, end_date)
     logger.info(f"Получена аналитика мест за период {start_date} - {end_date}: {analytics}")
     return analytics
 
@@ -142,12 +178,83 @@ async def get_spots_analytics(
 async def get_revenue_analytics(
     start_date: datetime,
     end_date: datetime,
-    current_admin: AdminUserSchema = Depends(lambda: get_admin_repository().get_current_admin(get_token_from_cookie))
+    current_admin: AdminUserSchema = Depends(get_current_admin),
+    repository: AdminRepository = Depends(get_admin_repository)
 ):
-    analytics = await get_admin_repository().get_revenue_analytics(start_date, end_date)
+    analytics = await repository.get_revenue_analytics(start_date, end_date)
     logger.info(f"Получена аналитика доходов за период {start_date} - {end_date}: {analytics}")
     return analytics
 
+@router.get("/admin/analytics/summary")
+async def get_analytics_summary(
+    start_date: datetime,
+    end_date: datetime,
+    current_admin: AdminUserSchema = Depends(get_current_admin),
+    repository: AdminRepository = Depends(get_admin_repository)
+):
+    summary = await repository.get_analytics_summary(start_date, end_date)
+    logger.info(f"Получена сводная аналитика за период {start_date} - {end_date}")
+    return summary
+
+@router.get("/admin/db/pool_stats")
+async def get_pool_stats(
+    current_admin: AdminUserSchema = Depends(get_current_admin)
+):
+    return db_registry.pool_stats()
+
+@router.get("/admin/db/route_stats")
+async def get_route_stats(
+    current_admin: AdminUserSchema = Depends(get_current_admin)
+):
+    return route_stats.stats()
+
+@router.get("/admin/db/slow_queries")
+async def get_slow_queries(
+    current_admin: AdminUserSchema = Depends(get_current_admin)
+):
+    return sql_monitor.stats()
+
+@router.get("/admin/cache/stats")
+async def get_cache_stats(
+    current_admin: AdminUserSchema = Depends(get_current_admin)
+):
+    return {
+        "availability": availability_summary.stats(),
+        "spot_index": spot_index.stats(),
+        "prices": price_table.stats(),
+        "analytics": analytics_cache.stats(),
+        "principals": principal_cache.stats(),
+        "spot_stream": spot_stream.stats(),
+        "notifications": notification_inbox.stats()
+    }
+
+@router.get("/admin/auth/stats")
+async def get_auth_stats(
+    current_admin: AdminUserSchema = Depends(get_current_admin)
+):
+    return {
+        "password_hasher": password_hasher.stats(),
+        "principals": principal_cache.stats(),
+        "invalidation": cache_invalidation.stats()
+    }
+
+@router.get("/admin/kafka/stats")
+async def get_kafka_stats(
+    current_admin: AdminUserSchema = Depends(get_current_admin)
+):
+    return {
+        "producer": kafka_producer.stats(),
+        "outbox_relay": outbox_relay.stats(),
+        "booking_consumer": booking_consumer.stats(),
+        "booking_store": booking_store.stats()
+    }
+
+@router.get("/admin/scheduler/stats")
+async def get_scheduler_stats(
+    current_admin: AdminUserSchema = Depends(get_current_admin)
+):
+    return {"sweeps": sweep_stats, "expiry_engine": expiry_engine.stats()}
+
 @router.get("/logout")
 async def logout():
     response = RedirectResponse(url="/login")
@@ -1,21 +1,38 @@
+import asyncio
+import configparser
 from typing import List, Dict
 from fastapi import HTTPException, status
 from sqlalchemy import select, update, func, distinct, delete, literal, text
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.ext.asyncio import AsyncSession
 from logging_manager import logger
-from db_conn import DB_connection
-from users.user_models import User, ParkingLocation, ParkingSpot, UserRole, UserRoleMapping, Booking, CancelledBooking
+from db_conn import DB_connection, UnitOfWork
+from users.user_models import User, ParkingLocation, ParkingSpot, UserRole, UserRoleMapping, Booking, CancelledBooking, BookingDailyRollup
+from users.booking_rollup import remove_from_rollup
+from ttl_cache import TTLCache
+from users.principal_cache import principal_cache
 from admin.admin_models import Car
 from admin.admin_schemes import ParkingLocationSchema, ParkingSpotSchema, AdminUserSchema, UpdatePriceSchema, BookingSchema
+import events
 from users.db_manager import pwd_context, SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES
 from datetime import datetime, timezone
 import jwt
 from jwt.exceptions import InvalidTokenError
 
+config = configparser.ConfigParser()
+config.read('config.ini')
+analytics_cache = TTLCache(
+    ttl_seconds=config.getint('ANALYTICS', 'CACHE_TTL_SECONDS', fallback=60),
+    max_entries=config.getint('ANALYTICS', 'CACHE_MAX_ENTRIES', fallback=128)
+)
+
 class AdminRepository:
-    def __init__(self, user_db_connection: DB_connection, pay_db_connection: DB_connection):
+    def __init__(self, user_db_connection: DB_connection | UnitOfWork, pay_db_connection: DB_connection | UnitOfWork):
         self.user_db_connection = user_db_connection
+        self.pay_db_connection = pay_db_connection
+
+    def fork(self) -> "AdminRepository":
+        return AdminRepository(self.user_db_connection.fork(), self.pay_db_connection.fork())
 
     async def get_current_admin(self, token: str) -> AdminUserSchema:
         try:
@@ -23,16 +40,15 @@ class AdminRepository:
             email: str = payload.get("sub")
             if email is None:
                 raise HTTPException(status_code=401, detail="Недействительный токен")
-            user, role_name = await self.get_user_by_email(email)
-            if role_name != "Admin":
+            principal = principal_cache.get(email)
+            if principal is None:
+                user, role_name = await self.get_user_by_email(email)
+                if user is None:
+                    raise HTTPException(status_code=401, detail="Недействительный токен")
+                principal = principal_cache.put(user, role_name)
+            if principal.RoleName != "Admin":
                 raise HTTPException(status_code=403, detail="Недостаточно прав")
-            return AdminUserSchema(
-                UserID=user.UserID,
-                Username=user.Username,
-                Email=user.Email,
-                RoleName=role_name,
-                Status=user.Status
-            )
+            return AdminUserSchema(**principal.model_dump())
         except InvalidTokenError:
             raise HTTPException(status_code=401, detail="Недействительный токен")
 
@@ -106,6 +122,8 @@ class AdminRepository:
                 if not spot:
                     raise HTTPException(status_code=404, detail="Место не найдено")
 
+                cancelled_ids = []
+                notified_users = []
                 if is_available:
                     subquery = (
                         select(
@@ -148,6 +166,9 @@ class AdminRepository:
                             logger.info(f"Добавлена запись об отмене для BookingID={booking.BookingID}")
 
                         booking_ids = [b.BookingID for b in last_bookings]
+                        cancelled_ids = booking_ids
+                        notified_users = [b.UserID for b in last_bookings]
+                        await remove_from_rollup(session, booking_ids)
                         await session.execute(
                             delete(Booking).where(Booking.BookingID.in_(booking_ids))
                         )
@@ -155,6 +176,11 @@ class AdminRepository:
 
                 spot.IsAvailable = is_available
                 await session.commit()
+                for booking_id in cancelled_ids:
+                    events.publish(events.BOOKING_CANCELLED, booking_id=booking_id)
+                for user_id in notified_users:
+                    events.publish(events.USER_NOTIFICATION, user_id=user_id, message="Отменено администратором")
+                events.publish(events.SPOT_STATUS_CHANGED, spot_id=spot_id, is_available=is_available)
                 logger.info(f"Статус места {spot_id} успешно обновлен на {is_available}")
 
             except SQLAlchemyError as e:
@@ -183,6 +209,7 @@ class AdminRepository:
                     .values(Price=price)
                 )
                 await session.commit()
+                events.publish(events.SPOT_PRICE_CHANGED, spot_id=spot_id, price=price)
                 logger.info(f"Цена места {spot_id} обновлена: Price={price}")
             except SQLAlchemyError as e:
                 await session.rollback()
@@ -227,8 +254,8 @@ class AdminRepository:
                         bookingId=row.BookingID,
                         address=row.Address,
                         floor=row.Floor,
-                        startTime=row.StartTime,
-                        endTime=row.EndTime,
+                        startTime=row.StartTime.strftime("%Y-%m-%d %H:%M"),
+                        endTime=row.EndTime.strftime("%Y-%m-%d %H:%M"),
                         carBrand=car.CarBrand if car else None,
                         carNumber=car.CarNumber if car else None
                     )
@@ -250,6 +277,7 @@ class AdminRepository:
                     .values(Status=status)
                 )
                 await session.commit()
+                events.publish(events.USER_STATUS_CHANGED, user_id=user_id, status=status)
                 logger.info(f"Статус пользователя {user_id} обновлен на {status}")
             except SQLAlchemyError as e:
                 await session.rollback()
@@ -261,17 +289,18 @@ class AdminRepository:
             try:
                 if start_date > end_date:
                     raise HTTPException(status_code=400, detail="Дата начала не может быть позже даты окончания")
+                booking_count = func.sum(BookingDailyRollup.BookingCount)
                 query = (
                     select(
                         ParkingLocation.Address,
-                        func.count(Booking.BookingID).label("booking_count")
+                        booking_count.label("booking_count")
                     )
-                    .join(ParkingSpot, ParkingLocation.LocationID == ParkingSpot.LocationID)
-                    .join(Booking, ParkingSpot.SpotID == Booking.SpotID)
-                    .where(Booking.StartTime >= start_date)
-                    .where(Booking.StartTime <= end_date)
+                    .join(BookingDailyRollup, ParkingLocation.LocationID == BookingDailyRollup.LocationID)
+                    .where(BookingDailyRollup.Day >= start_date.date())
+                    .where(BookingDailyRollup.Day <= end_date.date())
                     .group_by(ParkingLocation.Address)
-                    .order_by(func.count(Booking.BookingID).desc())
+                    .having(booking_count > 0)
+                    .order_by(booking_count.desc())
                 )
                 result = await session.execute(query)
                 analytics = [
@@ -284,49 +313,29 @@ class AdminRepository:
                 logger.error(f"Ошибка при получении аналитики парковок: {e}")
                 raise HTTPException(status_code=500, detail="Ошибка при получении аналитики парковок")
             
-    async def update_booking_times_format(self) -> None:
-        async for session in self.user_db_connection.get_session():
-            try:
-                query = text("""
-                    UPDATE Bookings
-                    SET StartTime = StartTime + :seconds,
-                        EndTime = EndTime + :seconds
-                    WHERE LEN(StartTime) = 16 AND LEN(EndTime) = 16
-                """)
-                result = await session.execute(query, {"seconds": ":00"})
-                await session.commit()
-                logger.info(f"Обновлено {result.rowcount} записей в Bookings с добавлением секунд")
-            except SQLAlchemyError as e:
-                await session.rollback()
-                logger.error(f"Ошибка при обновлении формата времени в Bookings: {e}")
-                raise HTTPException(status_code=500, detail="Ошибка при обновлении формата времени")
-
     async def get_spots_analytics(self, start_date: datetime, end_date: datetime) -> List[Dict]:
         async for session in self.user_db_connection.get_session():
             try:
                 if start_date > end_date:
                     raise HTTPException(status_code=400, detail="Дата начала не может быть позже даты окончания")
-                
-                await self.update_booking_times_format()
 
                 query = text("""
-                    SELECT TOP 5 
-                        ps.SpotID, 
-                        ps.SpotNumber, 
-                        pl.Address, 
-                        ps.Floor, 
-                        AVG(CAST(DATEDIFF(second, b.StartTime, b.EndTime) AS FLOAT) / 3600.0) AS avg_hours
-                    FROM ParkingSpots ps
-                    JOIN Bookings b ON ps.SpotID = b.SpotID
-                    JOIN ParkingLocations pl ON ps.LocationID = pl.LocationID
-                    WHERE b.StartTime >= :start_date
-                      AND b.StartTime <= :end_date
-                      AND b.StartTime IS NOT NULL
-                      AND b.EndTime IS NOT NULL
+                    SELECT TOP 5
+                        ps.SpotID,
+                        ps.SpotNumber,
+                        pl.Address,
+                        ps.Floor,
+                        SUM(r.TotalHours) / SUM(r.BookingCount) AS avg_hours
+                    FROM BookingDailyRollups r
+                    JOIN ParkingSpots ps ON r.SpotID = ps.SpotID
+                    JOIN ParkingLocations pl ON r.LocationID = pl.LocationID
+                    WHERE r.Day >= :start_date
+                      AND r.Day <= :end_date
                     GROUP BY ps.SpotID, ps.SpotNumber, pl.Address, ps.Floor
-                    ORDER BY AVG(CAST(DATEDIFF(second, b.StartTime, b.EndTime) AS FLOAT) / 3600.0) DESC
+                    HAVING SUM(r.BookingCount) > 0
+                    ORDER BY SUM(r.TotalHours) / SUM(r.BookingCount) DESC
                 """)
-                result = await session.execute(query, {"start_date": start_date, "end_date": end_date})
+                result = await session.execute(query, {"start_date": start_date.date(), "end_date": end_date.date()})
                 analytics = [
                     {
                         "spot_id": row.SpotID,
@@ -348,25 +357,21 @@ class AdminRepository:
             try:
                 if start_date > end_date:
                     raise HTTPException(status_code=400, detail="Дата начала не может быть позже даты окончания")
-                
-                await self.update_booking_times_format()
-                
+
                 query = text("""
-                    SELECT 
-                        pl.Address, 
-                        CAST(b.StartTime AS DATE) AS date, 
-                        SUM(CAST(DATEDIFF(second, b.StartTime, b.EndTime) AS FLOAT) / 3600.0 * ps.Price) AS revenue
-                    FROM Bookings b
-                    JOIN ParkingSpots ps ON b.SpotID = ps.SpotID
-                    JOIN ParkingLocations pl ON ps.LocationID = pl.LocationID
-                    WHERE b.StartTime >= :start_date
-                      AND b.StartTime <= :end_date
-                      AND b.StartTime IS NOT NULL
-                      AND b.EndTime IS NOT NULL
-                    GROUP BY pl.Address, CAST(b.StartTime AS DATE)
-                    ORDER BY CAST(b.StartTime AS DATE)
+                    SELECT
+                        pl.Address,
+                        r.Day AS date,
+                        SUM(r.Revenue) AS revenue
+                    FROM BookingDailyRollups r
+                    JOIN ParkingLocations pl ON r.LocationID = pl.LocationID
+                    WHERE r.Day >= :start_date
+                      AND r.Day <= :end_date
+                    GROUP BY pl.Address, r.Day
+                    HAVING SUM(r.BookingCount) > 0
+                    ORDER BY r.Day
                 """)
-                result = await user_session.execute(query, {"start_date": start_date, "end_date": end_date})
+                result = await user_session.execute(query, {"start_date": start_date.date(), "end_date": end_date.date()})
                 analytics = [
                     {
                         "address": row.Address,
@@ -379,4 +384,22 @@ class AdminRepository:
                 return analytics
             except SQLAlchemyError as e:
                 logger.error(f"Ошибка при получении аналитики доходов: {e}")
-                raise HTTPException(status_code=500, detail="Ошибка при получении аналитики доходов")
\ No newline at end of file
+                raise HTTPException(status_code=500, detail="Ошибка при получении аналитики доходов")
+
+    async def get_analytics_summary(self, start_date: datetime, end_date: datetime) -> Dict:
+        if start_date > end_date:
+            raise HTTPException(status_code=400, detail="Дата начала не может быть позже даты окончания")
+
+        key = (start_date.date(), end_date.date())
+        summary = analytics_cache.get(key)
+        if summary is not None:
+            return summary
+
+        parkings, spots, revenue = await asyncio.gather(
+            self.fork().get_parkings_analytics(start_date, end_date),
+            self.fork().get_spots_analytics(start_date, end_date),
+            self.fork().get_revenue_analytics(start_date, end_date)
+        )
+        summary = {"parkings": parkings, "spots": spots, "revenue": revenue}
+        analytics_cache.set(key, summary)
+        return summary
@@ -0,0 +1,96 @@
+import argparse
+import asyncio
+import time
+
+from benchmarks.kafka_producer import FakeKafkaBroker
+from kafka_producer import KafkaProducerManager, kafka_server
+from logging_manager import logger
+from payments.booking_consumer import BookingEventConsumer, booking_ttl
+from payments.booking_store import BookingStore
+
+
+async def wait_complete(stores: list[BookingStore], user_ids: range, timeout: float) -> float | None:
+    started = time.perf_counter()
+    while time.perf_counter() - started < timeout:
+        if all(store.peek(user_id) is not None for store in stores for user_id in user_ids):
+            return time.perf_counter() - started
+        await asyncio.sleep(0.05)
+    return None
+
+
+async def start_consumer(bootstrap: str, topic: str, bookings: int) -> tuple[BookingEventConsumer, BookingStore]:
+    store = BookingStore(ttl_seconds=booking_ttl, max_entries=bookings * 2)
+    worker = BookingEventConsumer(store, bootstrap, topic)
+    worker.start()
+    while not worker.connected:
+        await asyncio.sleep(0.05)
+    return worker, store
+
+
+async def run(consumers: int, bookings: int, partitions: int, topic: str, timeout: float, real_kafka: bool) -> None:
+    broker = None
+    if real_kafka:
+        bootstrap = kafka_server
+    else:
+        broker = FakeKafkaBroker(topic, partitions=partitions, delay_ms=0)
+        await broker.start()
+        bootstrap = f"{broker.host}:{broker.port}"
+
+    producer = KafkaProducerManager(bootstrap, topic, linger_ms=5)
+    workers = []
+    try:
+        await producer.start()
+        if producer.producer is None:
+            raise RuntimeError("Kafka недоступна")
+        workers = [await start_consumer(bootstrap, topic, bookings) for _ in range(consumers)]
+
+        user_ids = range(1_000_000, 1_000_000 + bookings)
+        errors = await producer.send_batch(
+            [{"user_id": user_id, "booking_id": user_id, "amount": 100.0} for user_id in user_ids],
+            keys=list(user_ids)
+        )
+        failed = sum(1 for error in errors if error is not None)
+        elapsed = await wait_complete([store for _, store in workers], user_ids, timeout)
+
+        started = time.perf_counter()
+        late = await start_consumer(bootstrap, topic, bookings)
+        workers.append(late)
+        replayed = await wait_complete([late[1]], user_ids, timeout)
+        if replayed is not None:
+            replayed = time.perf_counter() - started
+
+        for index, (worker, store) in enumerate(workers):
+            held = sum(1 for user_id in user_ids if store.peek(user_id) is not None)
+            label = "запущен после отправки" if index == consumers else "работал во время отправки"
+            logger.info(f"Консьюмер {index} ({label}): партиции {sorted(worker.partitions)}, бронирований {held}/{bookings}")
+            assert held == bookings, f"Консьюмер {index} получил {held} из {bookings} бронирований"
+        assert failed == 0, f"Ошибок отправки: {failed}"
+        assert elapsed is not None and replayed is not None
+        logger.info(
+            f"{consumers} консьюмеров получили все {bookings} бронирований за {elapsed * 1000:.0f} мс, "
+            f"консьюмер, запущенный после отправки, подключился и перечитал окно TTL за {replayed * 1000:.0f} мс"
+        )
+    finally:
+        for worker, _ in workers:
+            await worker.stop()
+        await producer.stop()
+        if broker is not None:
+            await broker.stop()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description="Проверка, что каждый веб-процесс получает все бронирования из Kafka"
+    )
+    parser.add_argument("--consumers", type=int, default=4)
+    parser.add_argument("--bookings", type=int, default=1000)
+    parser.add_argument("--partitions", type=int, default=6, help="число партиций фейкового брокера")
+    parser.add_argument("--topic", default="booking-broadcast-bench")
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument(
+        "--real-kafka",
+        action="store_true",
+        help="использовать KAFKA_SERVER из config.ini вместо локального фейкового брокера (топик должен существовать)"
+    )
+    args = parser.parse_args()
+    asyncio.run(run(args.consumers, args.bookings, args.partitions, args.topic, args.timeout, args.real_kafka))
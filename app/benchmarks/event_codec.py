@@ -0,0 +1,36 @@
+import argparse
+import time
+
+from logging_manager import logger
+from payments import event_codec
+
+
+def rate(func, count: int) -> float:
+    started = time.perf_counter()
+    func()
+    return count / (time.perf_counter() - started)
+
+
+def run(messages: int) -> None:
+    events = [
+        {"user_id": 100_000 + i % 5000, "booking_id": 1_000_000 + i, "amount": 250.0 + i % 100}
+        for i in range(messages)
+    ]
+    for name, encode in (("binary", event_codec.encode), ("json", event_codec.encode_json)):
+        values = [encode(event) for event in events]
+        assert event_codec.decode(values[0]) == events[0]
+        encode_rate = rate(lambda: [encode(event) for event in events], messages)
+        decode_rate = rate(lambda: [event_codec.decode(value) for value in values], messages)
+        batch_rate = rate(lambda: event_codec.decode_batch(values), messages)
+        logger.info(
+            f"{name}: {sum(map(len, values)) / messages:.0f} байт/сообщение, "
+            f"encode {encode_rate / 1e6:.2f} M/с, decode {decode_rate / 1e6:.2f} M/с, "
+            f"decode_batch {batch_rate / 1e6:.2f} M/с"
+        )
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Скорость кодирования событий бронирования: бинарный формат против JSON")
+    parser.add_argument("--messages", type=int, default=200_000)
+    args = parser.parse_args()
+    run(args.messages)
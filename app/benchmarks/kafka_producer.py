@@ -0,0 +1,224 @@
+import argparse
+import asyncio
+import json
+import struct
+import time
+from io import BytesIO
+
+from aiokafka import AIOKafkaProducer
+from aiokafka.protocol.admin import ApiVersionResponse_v0
+from aiokafka.protocol.fetch import FetchRequest, FetchResponse_v3
+from aiokafka.protocol.metadata import MetadataResponse_v0, MetadataResponse_v1
+from aiokafka.protocol.offset import OffsetRequest, OffsetResponse_v1
+from aiokafka.protocol.produce import ProduceRequest, ProduceResponse_v2
+from aiokafka.record.legacy_records import LegacyRecordBatchBuilder
+from aiokafka.record.memory_records import MemoryRecords
+
+from kafka_producer import KafkaProducerManager
+from logging_manager import logger
+
+PRODUCE, FETCH, LIST_OFFSETS, METADATA, API_VERSIONS = 0, 1, 2, 3, 18
+LATEST, EARLIEST = -1, -2
+FETCH_MAX_RECORDS = 500
+
+
+class FakeKafkaBroker:
+    """Однонодовый брокер в памяти: ApiVersions, Metadata, Produce, Fetch и ListOffsets (протокол Kafka 0.10.1) с заданной задержкой ответа."""
+
+    def __init__(self, topic: str, partitions: int = 6, delay_ms: float = 1.0):
+        self.topic = topic
+        self.partitions = partitions
+        self.delay = delay_ms / 1000
+        self.host = "127.0.0.1"
+        self.port = 0
+        self.connections = 0
+        self.produced = 0
+        self.fetched = 0
+        self.log: dict[int, list[tuple[int, bytes | None, bytes | None]]] = {p: [] for p in range(partitions)}
+        self._appended = asyncio.Event()
+        self._handlers: set[asyncio.Task] = set()
+        self._server: asyncio.AbstractServer | None = None
+
+    async def start(self) -> None:
+        self._server = await asyncio.start_server(self._serve, self.host, 0)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def stop(self) -> None:
+        self._server.close()
+        for handler in self._handlers:
+            handler.cancel()
+        await asyncio.gather(*self._handlers, return_exceptions=True)
+        await self._server.wait_closed()
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.connections += 1
+        handler = asyncio.current_task()
+        self._handlers.add(handler)
+        try:
+            while True:
+                size = struct.unpack(">i", await reader.readexactly(4))[0]
+                frame = await reader.readexactly(size)
+                api_key, api_version, correlation_id, client_len = struct.unpack(">hhih", frame[:10])
+                body = BytesIO(frame[10 + max(client_len, 0):])
+                response = await self._respond(api_key, api_version, body)
+                if response is None:
+                    continue
+                if self.delay:
+                    await asyncio.sleep(self.delay)
+                payload = struct.pack(">i", correlation_id) + response.encode()
+                writer.write(struct.pack(">i", len(payload)) + payload)
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            self._handlers.discard(handler)
+            writer.close()
+
+    async def _respond(self, api_key: int, api_version: int, body: BytesIO):
+        if api_key == API_VERSIONS:
+            return ApiVersionResponse_v0(0, [
+                (PRODUCE, 0, 2), (FETCH, 0, 3), (LIST_OFFSETS, 0, 1), (METADATA, 0, 2), (API_VERSIONS, 0, 0)
+            ])
+        if api_key == METADATA:
+            partitions = [(0, p, 0, [0], [0]) for p in range(self.partitions)]
+            if api_version == 0:
+                return MetadataResponse_v0([(0, self.host, self.port)], [(0, self.topic, partitions)])
+            return MetadataResponse_v1([(0, self.host, self.port, None)], 0, [(0, self.topic, False, partitions)])
+        if api_key == PRODUCE:
+            return self._produce(ProduceRequest[api_version].decode(body))
+        if api_key == FETCH:
+            return await self._fetch(FetchRequest[api_version].decode(body))
+        if api_key == LIST_OFFSETS:
+            return self._list_offsets(OffsetRequest[api_version].decode(body))
+        raise ValueError(f"Неподдерживаемый запрос api_key={api_key}")
+
+    def _produce(self, request):
+        results = []
+        for topic, partitions in request.topics:
+            acks = []
+            for partition, records in partitions:
+                log = self.log[partition]
+                base_offset = len(log)
+                batches = MemoryRecords(bytes(records))
+                while batches.has_next():
+                    for record in batches.next_batch():
+                        log.append((record.timestamp, record.key, record.value))
+                self.produced += len(log) - base_offset
+                acks.append((partition, 0, base_offset, -1))
+            results.append((topic, acks))
+        self._appended.set()
+        if request.required_acks == 0:
+            return None
+        return ProduceResponse_v2(results, 0)
+
+    async def _fetch(self, request):
+        def available() -> bool:
+            return any(offset < len(self.log[partition]) for _, parts in request.topics for partition, offset, _ in parts)
+
+        if not available():
+            self._appended.clear()
+            try:
+                await asyncio.wait_for(self._appended.wait(), timeout=request.max_wait_time / 1000)
+            except asyncio.TimeoutError:
+                pass
+
+        topics = []
+        for topic, parts in request.topics:
+            results = []
+            for partition, offset, max_bytes in parts:
+                log = self.log[partition]
+                builder = LegacyRecordBatchBuilder(magic=1, compression_type=0, batch_size=max_bytes)
+                for position in range(offset, min(len(log), offset + FETCH_MAX_RECORDS)):
+                    timestamp, key, value = log[position]
+                    if builder.append(position, timestamp, key, value) is None:
+                        break
+                    self.fetched += 1
+                results.append((partition, 0, len(log), bytes(builder.build())))
+            topics.append((topic, results))
+        return FetchResponse_v3(0, topics)
+
+    def _list_offsets(self, request):
+        topics = []
+        for topic, parts in request.topics:
+            results = []
+            for partition, timestamp, *_ in parts:
+                log = self.log[partition]
+                if timestamp == LATEST:
+                    offset = len(log)
+                elif timestamp == EARLIEST:
+                    offset = 0
+                else:
+                    offset = next((i for i, (created, _, _) in enumerate(log) if created >= timestamp), -1)
+                results.append((partition, 0, timestamp, offset))
+            topics.append((topic, results))
+        return OffsetResponse_v1(topics)
+
+
+def percentile(samples: list[float], q: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(int(len(ordered) * q), len(ordered) - 1)]
+
+
+async def measure(name: str, call, requests: int, concurrency: int) -> None:
+    samples = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def timed(i: int) -> None:
+        async with semaphore:
+            started = time.perf_counter()
+            await call(i)
+            samples.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(timed(i) for i in range(requests)))
+    elapsed = time.perf_counter() - started
+    logger.info(
+        f"{name}: p50={percentile(samples, 0.5):.2f} мс, p99={percentile(samples, 0.99):.2f} мс, "
+        f"{requests / elapsed:.0f} запросов/с"
+    )
+
+
+async def run(requests: int, concurrency: int, delay_ms: float, partitions: int) -> None:
+    topic = "bookings-bench"
+    broker = FakeKafkaBroker(topic, partitions=partitions, delay_ms=delay_ms)
+    await broker.start()
+    bootstrap = f"{broker.host}:{broker.port}"
+    try:
+        async def producer_per_request(i: int) -> None:
+            producer = AIOKafkaProducer(bootstrap_servers=bootstrap)
+            await producer.start()
+            try:
+                message = {"user_id": i, "booking_id": i, "amount": 100.0}
+                await producer.send_and_wait(topic, json.dumps(message).encode('utf-8'))
+            finally:
+                await producer.stop()
+
+        connections = broker.connections
+        await measure("До: producer на каждый /book", producer_per_request, requests, concurrency)
+        logger.info(f"  TCP-подключений к брокеру: {broker.connections - connections}")
+
+        shared = KafkaProducerManager(bootstrap, topic, linger_ms=5, compression_type="gzip", acks=1)
+        await shared.start()
+        try:
+            async def shared_send(i: int) -> None:
+                await shared.send_batch([{"user_id": i, "booking_id": i, "amount": 100.0}], keys=[i])
+
+            connections = broker.connections
+            await measure("После: общий producer, send_batch", shared_send, requests, concurrency)
+            logger.info(f"  TCP-подключений к брокеру: {broker.connections - connections}, stats={shared.stats()}")
+        finally:
+            await shared.stop()
+    finally:
+        await broker.stop()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description="Задержка отправки события бронирования в Kafka: producer на запрос против общего producer"
+    )
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--delay-ms", type=float, default=1.0, help="задержка ответа фейкового брокера")
+    parser.add_argument("--partitions", type=int, default=6)
+    args = parser.parse_args()
+    asyncio.run(run(args.requests, args.concurrency, args.delay_ms, args.partitions))
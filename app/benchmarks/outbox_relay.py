@@ -0,0 +1,95 @@
+import argparse
+import asyncio
+import configparser
+import json
+import time
+
+from sqlalchemy import delete, func, insert, select
+
+from db_conn import db_registry
+from kafka_producer import kafka_producer
+from logging_manager import logger
+from outbox_relay import OutboxRelay
+from users.user_models import OutboxEvent
+
+
+config = configparser.ConfigParser()
+config.read('config.ini')
+user_server = config['BD INFO']['USER_DB']
+
+BENCH_EVENT = "bench"
+
+
+async def seed(user_db, events: int, users: int) -> None:
+    async with user_db.session_maker() as session:
+        await session.execute(
+            insert(OutboxEvent),
+            [
+                {"UserID": i % users, "EventType": BENCH_EVENT, "Payload": json.dumps({"event": BENCH_EVENT, "seq": i})}
+                for i in range(events)
+            ]
+        )
+        await session.commit()
+
+
+async def drain(relay: OutboxRelay) -> None:
+    while await relay.relay_batch():
+        pass
+
+
+async def pending(user_db) -> int:
+    async with user_db.session_maker() as session:
+        result = await session.execute(
+            select(func.count()).select_from(OutboxEvent)
+            .where(OutboxEvent.EventType == BENCH_EVENT, OutboxEvent.SentAt.is_(None))
+        )
+        return result.scalar_one()
+
+
+async def cleanup(user_db) -> None:
+    async with user_db.session_maker() as session:
+        await session.execute(delete(OutboxEvent).where(OutboxEvent.EventType == BENCH_EVENT))
+        await session.commit()
+
+
+async def run(events: int, users: int, workers: int, batch_size: int, topic: str) -> None:
+    user_db = db_registry.get(user_server)
+    kafka_producer.topic = topic
+    kafka_producer.encoding = "json"
+    await kafka_producer.start()
+    if kafka_producer.producer is None:
+        raise RuntimeError("Kafka недоступна")
+    try:
+        await cleanup(user_db)
+        await seed(user_db, events, users)
+
+        relays = [OutboxRelay(batch_size=batch_size) for _ in range(workers)]
+        started = time.perf_counter()
+        await asyncio.gather(*(drain(relay) for relay in relays))
+        elapsed = time.perf_counter() - started
+
+        relayed = sum(relay.relayed for relay in relays)
+        left = await pending(user_db)
+        logger.info(
+            f"Outbox: {events} событий, {workers} ретрансляторов, пакет {batch_size}: "
+            f"{elapsed:.2f} с, {events / elapsed:.0f} событий/с, "
+            f"опубликовано {relayed}, дубликатов {relayed - events + left}, осталось {left}"
+        )
+    finally:
+        await cleanup(user_db)
+        await kafka_producer.stop()
+        await db_registry.close_all()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description="Пропускная способность ретранслятора outbox и проверка на дубликаты "
+                    "(запускать на тестовой базе при остановленном приложении)"
+    )
+    parser.add_argument("--events", type=int, default=5000)
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--batch-size", type=int, default=200)
+    parser.add_argument("--topic", default="outbox-bench")
+    args = parser.parse_args()
+    asyncio.run(run(args.events, args.users, args.workers, args.batch_size, args.topic))
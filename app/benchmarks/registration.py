@@ -0,0 +1,140 @@
+import argparse
+import asyncio
+import configparser
+import os
+import tempfile
+import time
+
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.mssql import DATETIME2
+from sqlalchemy.ext.compiler import compiles
+
+from db_conn import DB_connection
+from logging_manager import logger
+from password_hasher import password_hasher
+from sql_monitor import sql_monitor
+from users.db_manager import UserRepository
+from users.role_cache import role_cache
+from users.user_models import Base, User, UserRole, UserRoleMapping
+from users.user_schemes import SRegisterForm
+
+
+config = configparser.ConfigParser()
+config.read('config.ini')
+
+PREFIX = "bench"
+
+
+@compiles(DATETIME2, "sqlite")
+def compile_datetime2(element, compiler, **kw):
+    return "DATETIME"
+
+
+async def register_sequential(repository: UserRepository, data: SRegisterForm) -> int:
+    async for session in repository.db_connection.get_session():
+        for column, value in ((User.Username, data.username), (User.Email, data.email), (User.PhoneNumber, data.phone)):
+            if (await session.execute(select(User.UserID).where(column == value))).scalar_one_or_none():
+                raise ValueError(f"{column.key} уже занят")
+        role_id = (await session.execute(select(UserRole.RoleID).where(UserRole.RoleName == "User"))).scalar_one_or_none()
+        user = User(
+            Username=data.username,
+            Email=data.email,
+            PhoneNumber=data.phone,
+            Password=await repository.get_password_hash(data.password),
+            Status='White'
+        )
+        session.add(user)
+        await session.flush()
+        session.add(UserRoleMapping(UserID=user.UserID, RoleID=role_id))
+        await session.commit()
+        return user.UserID
+
+
+async def register_single_query(repository: UserRepository, data: SRegisterForm) -> int:
+    return await repository.register_user(data)
+
+
+async def measure(name: str, register, repository: UserRepository, offset: int, users: int, concurrency: int) -> None:
+    semaphore = asyncio.Semaphore(concurrency)
+    forms = [
+        SRegisterForm(
+            username=f"{PREFIX}{offset + i}",
+            email=f"{PREFIX}{offset + i}@bench.local",
+            phone=f"+7{offset + i:010d}",
+            password="Bench12345"
+        )
+        for i in range(users)
+    ]
+
+    async def one(form: SRegisterForm) -> None:
+        async with semaphore:
+            await register(repository, form)
+
+    sql_monitor.reset()
+    started = time.perf_counter()
+    await asyncio.gather(*(one(form) for form in forms))
+    elapsed = time.perf_counter() - started
+    logger.info(
+        f"{name}: {users / elapsed:.1f} регистраций/с, {elapsed / users * 1000:.1f} мс на регистрацию, "
+        f"{sql_monitor.statements / users:.1f} SQL-запросов на регистрацию"
+    )
+
+
+async def cleanup(connection: DB_connection) -> None:
+    async with connection.session_maker() as session:
+        user_ids = select(User.UserID).where(User.Username.like(f"{PREFIX}%"))
+        await session.execute(delete(UserRoleMapping).where(UserRoleMapping.UserID.in_(user_ids)))
+        await session.execute(delete(User).where(User.Username.like(f"{PREFIX}%")))
+        await session.commit()
+
+
+async def run(users: int, concurrency: int, database_url: str | None, bcrypt_rounds: int | None) -> None:
+    if bcrypt_rounds is not None:
+        password_hasher.context = password_hasher.context.copy(bcrypt__rounds=bcrypt_rounds)
+        password_hasher.rounds = bcrypt_rounds
+    if database_url:
+        connection = DB_connection("bench", database_url=database_url)
+        if database_url.startswith("sqlite"):
+            async with connection.engine.begin() as conn:
+                await conn.run_sync(Base.metadata.create_all)
+            async with connection.session_maker() as session:
+                session.add(UserRole(RoleName="User"))
+                await session.commit()
+    else:
+        connection = DB_connection(config['BD INFO']['USER_DB'])
+
+    repository = UserRepository(connection)
+    try:
+        await cleanup(connection)
+        await repository.load_roles()
+        logger.info(f"bcrypt rounds={password_hasher.rounds}, потоков хеширования={password_hasher.workers}")
+        await measure("До: 4 SELECT + хеш внутри сессии", register_sequential, repository, 0, users, concurrency)
+        await measure("После: 1 SELECT + кеш ролей", register_single_query, repository, users, users, concurrency)
+        logger.info(f"Хеширование: {password_hasher.stats()}, роли: {role_cache.stats()['roles']}")
+    finally:
+        await cleanup(connection)
+        await connection.close()
+        password_hasher.shutdown()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Пропускная способность регистрации пользователей до и после оптимизации")
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument(
+        "--database-url",
+        default=None,
+        help="URL тестовой базы; по умолчанию USER_DB из config.ini, для SQLite схема создаётся во временном файле"
+    )
+    parser.add_argument("--sqlite", action="store_true", help="использовать временную базу SQLite (aiosqlite)")
+    parser.add_argument(
+        "--bcrypt-rounds",
+        type=int,
+        default=None,
+        help="понизить стоимость bcrypt, чтобы измерить только работу с базой; по умолчанию BCRYPT_ROUNDS"
+    )
+    args = parser.parse_args()
+    database_url = args.database_url
+    if args.sqlite:
+        database_url = f"sqlite+aiosqlite:///{os.path.join(tempfile.mkdtemp(), 'registration.sqlite3')}"
+    asyncio.run(run(args.users, args.concurrency, database_url, args.bcrypt_rounds))
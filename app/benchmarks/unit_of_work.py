@@ -0,0 +1,124 @@
+import argparse
+import asyncio
+import configparser
+import os
+import tempfile
+import time
+
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.mssql import DATETIME2
+from sqlalchemy.ext.compiler import compiles
+
+from db_conn import DB_connection, UnitOfWork, route_stats
+from logging_manager import logger
+from users.availability_cache import availability_summary
+from users.db_manager import UserRepository
+from users.user_models import Base, ParkingLocation, ParkingSpot, User
+
+
+config = configparser.ConfigParser()
+config.read('config.ini')
+
+PREFIX = "uowbench"
+
+
+@compiles(DATETIME2, "sqlite")
+def compile_datetime2(element, compiler, **kw):
+    return "DATETIME"
+
+
+async def main_page(repository: UserRepository, user_id: int) -> None:
+    availability_summary.invalidate()
+    await repository.get_username(user_id)
+    await repository.check_available_parking_spots()
+    await repository.get_user_info(user_id)
+
+
+def percentile(samples: list[float], q: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(int(len(ordered) * q), len(ordered) - 1)]
+
+
+async def measure(name: str, connection: DB_connection, user_id: int, requests: int, concurrency: int, shared: bool) -> None:
+    semaphore = asyncio.Semaphore(concurrency)
+    samples = []
+    checkouts = []
+
+    async def request() -> None:
+        async with semaphore:
+            counter = route_stats.begin()
+            started = time.perf_counter()
+            unit = UnitOfWork(connection) if shared else None
+            try:
+                await main_page(UserRepository(unit or connection), user_id)
+            finally:
+                if unit is not None:
+                    await unit.close()
+            samples.append((time.perf_counter() - started) * 1000)
+            checkouts.append(counter[0])
+
+    started = time.perf_counter()
+    await asyncio.gather(*(request() for _ in range(requests)))
+    elapsed = time.perf_counter() - started
+    logger.info(
+        f"{name}: p50={percentile(samples, 0.5):.2f} мс, p99={percentile(samples, 0.99):.2f} мс, "
+        f"{requests / elapsed:.0f} запросов/с, подключений из пула на запрос {sum(checkouts) / len(checkouts):.2f}"
+    )
+
+
+async def seed(connection: DB_connection, spots: int) -> int:
+    async with connection.session_maker() as session:
+        user = User(Username=PREFIX, Password="-", Email=f"{PREFIX}@bench.local", PhoneNumber=PREFIX)
+        location = ParkingLocation(Address=f"{PREFIX} street")
+        session.add_all([user, location])
+        await session.flush()
+        session.add_all([
+            ParkingSpot(LocationID=location.LocationID, SpotNumber=str(i), Floor="A", Price=100, IsAvailable=True)
+            for i in range(spots)
+        ])
+        await session.commit()
+        return user.UserID
+
+
+async def cleanup(connection: DB_connection) -> None:
+    async with connection.session_maker() as session:
+        locations = select(ParkingLocation.LocationID).where(ParkingLocation.Address == f"{PREFIX} street")
+        await session.execute(delete(ParkingSpot).where(ParkingSpot.LocationID.in_(locations)))
+        await session.execute(delete(ParkingLocation).where(ParkingLocation.Address == f"{PREFIX} street"))
+        await session.execute(delete(User).where(User.Username == PREFIX))
+        await session.commit()
+
+
+async def run(requests: int, concurrency: int, database_url: str | None) -> None:
+    if database_url:
+        connection = DB_connection("bench", database_url=database_url)
+        if database_url.startswith("sqlite"):
+            async with connection.engine.begin() as conn:
+                await conn.run_sync(Base.metadata.create_all)
+    else:
+        connection = DB_connection(config['BD INFO']['USER_DB'])
+
+    try:
+        await cleanup(connection)
+        user_id = await seed(connection, spots=20)
+        await measure("До: сессия на каждый вызов репозитория", connection, user_id, requests, concurrency, shared=False)
+        await measure("После: одна сессия на запрос (UnitOfWork)", connection, user_id, requests, concurrency, shared=True)
+        logger.info(f"Пул: {connection.pool_stats()}")
+    finally:
+        await cleanup(connection)
+        await connection.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description="Задержка запроса, похожего на /main_page: сессия на вызов репозитория против сессии на запрос"
+    )
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--database-url", default=None, help="URL тестовой базы; по умолчанию USER_DB из config.ini")
+    parser.add_argument("--sqlite", action="store_true", help="использовать временную базу SQLite (aiosqlite)")
+    args = parser.parse_args()
+    database_url = args.database_url
+    if args.sqlite:
+        database_url = f"sqlite+aiosqlite:///{os.path.join(tempfile.mkdtemp(), 'unit_of_work.sqlite3')}"
+    asyncio.run(run(args.requests, args.concurrency, database_url))
@@ -0,0 +1,140 @@
+import asyncio
+import configparser
+import functools
+import json
+import uuid
+from aiokafka import AIOKafkaConsumer, AIOKafkaProducer, TopicPartition
+
+import events
+from logging_manager import logger
+
+
+config = configparser.ConfigParser()
+config.read('config.ini')
+kafka_server = config['KAFKA SETTINGS']['KAFKA_SERVER']
+invalidation_topic = config.get('KAFKA SETTINGS', 'INVALIDATION_TOPIC', fallback='cache_invalidation')
+
+FORWARDED_EVENTS = {
+    events.USER_STATUS_CHANGED: ("user_id", "status"),
+    events.SPOT_PRICE_CHANGED: ("spot_id", "price"),
+    events.SPOT_STATUS_CHANGED: ("spot_id", "is_available"),
+    events.USER_NOTIFICATION: ("user_id", "message"),
+}
+
+
+class CacheInvalidationBus:
+    def __init__(self, bootstrap_servers: str, topic: str):
+        self.bootstrap_servers = bootstrap_servers
+        self.topic = topic
+        self.origin = uuid.uuid4().hex
+        self.producer: AIOKafkaProducer | None = None
+        self._task: asyncio.Task | None = None
+        self._pending: set[asyncio.Task] = set()
+        self.sent = 0
+        self.received = 0
+        self.failed = 0
+        self.connected = False
+
+    async def start(self) -> None:
+        for event_name in FORWARDED_EVENTS:
+            events.subscribe(event_name, functools.partial(self.forward, event_name))
+        producer = AIOKafkaProducer(
+            bootstrap_servers=self.bootstrap_servers,
+            value_serializer=lambda value: json.dumps(value).encode('utf-8')
+        )
+        try:
+            await producer.start()
+            self.producer = producer
+        except Exception as e:
+            logger.error(f"Не удалось запустить producer инвалидации кешей: {e}")
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._pending:
+            await asyncio.gather(*self._pending, return_exceptions=True)
+        if self.producer is not None:
+            producer, self.producer = self.producer, None
+            await producer.stop()
+
+    def forward(self, event_name: str, remote: bool = False, **payload) -> None:
+        if remote or self.producer is None:
+            return
+        message = {"event": event_name, "origin": self.origin}
+        message.update((field, payload.get(field)) for field in FORWARDED_EVENTS[event_name])
+        task = asyncio.create_task(self._send(message))
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+
+    async def _send(self, message: dict) -> None:
+        try:
+            await self.producer.send_and_wait(self.topic, message)
+            self.sent += 1
+        except Exception as e:
+            self.failed += 1
+            logger.error(f"Не удалось разослать инвалидацию {message['event']}: {e}")
+
+    async def _run(self) -> None:
+        backoff = 1
+        while True:
+            consumer = AIOKafkaConsumer(
+                bootstrap_servers=self.bootstrap_servers,
+                group_id=None,
+                retry_backoff_ms=200,
+                enable_auto_commit=False
+            )
+            try:
+                await consumer.start()
+                await consumer.topics()
+                partitions = [TopicPartition(self.topic, p) for p in consumer.partitions_for_topic(self.topic) or []]
+                if not partitions:
+                    raise RuntimeError(f"Топик {self.topic} не найден")
+                consumer.assign(partitions)
+                await consumer.seek_to_end(*partitions)
+                self.connected = True
+                backoff = 1
+                logger.info(f"Подписка на инвалидацию кешей через {self.topic}")
+                async for msg in consumer:
+                    self.handle(msg.value)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Ошибка консьюмера инвалидации кешей, переподключение через {backoff} с: {e}")
+            finally:
+                self.connected = False
+                await consumer.stop()
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, 30)
+
+    def handle(self, value: bytes) -> None:
+        try:
+            message = json.loads(value.decode('utf-8'))
+            event_name = message["event"]
+            fields = FORWARDED_EVENTS.get(event_name)
+            if fields is not None:
+                message[fields[0]] = int(message[fields[0]])
+        except (ValueError, KeyError, TypeError, UnicodeDecodeError) as e:
+            logger.error(f"Ошибка при декодировании инвалидации: {value} ({e})")
+            return
+        if message.get("origin") == self.origin or fields is None:
+            return
+        self.received += 1
+        events.publish(event_name, remote=True, **{field: message.get(field) for field in fields})
+
+    def stats(self) -> dict:
+        return {
+            "connected": self.connected,
+            "sent": self.sent,
+            "received": self.received,
+            "failed": self.failed
+        }
+
+
+cache_invalidation = CacheInvalidationBus(kafka_server, invalidation_topic)
@@ -1,6 +1,13 @@
 import configparser
-from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+import logging
+import time
+from contextvars import ContextVar
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
 from sqlalchemy import text
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from logging_manager import logger
+from sql_monitor import sql_monitor
 
 
 config = configparser.ConfigParser()
@@ -9,27 +16,210 @@ server = config['BD INFO']['SERVER']
 username = config['BD INFO']['USERNAME']
 driver = config['BD INFO']['DRIVER']
 
+pool_size = config.getint('DB POOL', 'POOL_SIZE', fallback=5)
+max_overflow = config.getint('DB POOL', 'MAX_OVERFLOW', fallback=10)
+pool_recycle = config.getint('DB POOL', 'POOL_RECYCLE', fallback=1800)
+pool_pre_ping = config.getboolean('DB POOL', 'POOL_PRE_PING', fallback=True)
+pool_timeout = config.getint('DB POOL', 'POOL_TIMEOUT', fallback=30)
+sql_echo = config.getboolean('SQL LOGGING', 'ECHO', fallback=False)
+
+if not sql_echo:
+    logging.getLogger("sqlalchemy.engine").setLevel(logging.WARNING)
+
+_request_checkouts: ContextVar[list[int] | None] = ContextVar("request_checkouts", default=None)
+
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.checkouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            elapsed = time.perf_counter() - started
+            self.checkouts += 1
+            self.total_wait += elapsed
+            counter = _request_checkouts.get()
+            if counter is not None:
+                counter[0] += 1
+            if elapsed > self.max_wait:
+                self.max_wait = elapsed
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.checkouts = self.checkouts
+        pool.total_wait = self.total_wait
+        pool.max_wait = self.max_wait
+        return pool
+
 
 class DB_connection:
-    def __init__(self, db_name):
+    def __init__(self, db_name, database_url: str | None = None):
         self.username = username
         self.server = server
         self.db_name = db_name
         self.driver = driver
-        self.database_url = (
+        self.database_url = database_url or (
             f"mssql+aioodbc://{self.username}@{self.server}/{self.db_name}?driver={self.driver}&trusted_connection=yes"
         )
-        self.engine = create_async_engine(self.database_url, echo=True)
+        self.engine = create_async_engine(
+            self.database_url,
+            echo=sql_echo,
+            poolclass=TimedQueuePool,
+            pool_size=pool_size,
+            max_overflow=max_overflow,
+            pool_recycle=pool_recycle,
+            pool_pre_ping=pool_pre_ping,
+            pool_timeout=pool_timeout
+        )
+        sql_monitor.attach(self.engine)
         self.session_maker = async_sessionmaker(self.engine, expire_on_commit=False)
 
     async def get_session(self):
         async with self.session_maker() as session:
             yield session
 
+    def fork(self) -> "DB_connection":
+        return self
+
+    async def release(self) -> None:
+        pass
+
     async def execute_query(self, query, params=None):
         async with self.session_maker() as session:
             result = await session.execute(text(query), params)
             return result.fetchall()
 
+    def pool_stats(self) -> dict:
+        pool = self.engine.sync_engine.pool
+        return {
+            "database": self.db_name,
+            "pool_size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "checked_in": pool.checkedin(),
+            "overflow": pool.overflow(),
+            "checkouts": pool.checkouts,
+            "avg_wait_ms": round(pool.total_wait / pool.checkouts * 1000, 3) if pool.checkouts else 0.0,
+            "max_wait_ms": round(pool.max_wait * 1000, 3)
+        }
+
     async def close(self):
         await self.engine.dispose()
+
+
+# Одна сессия на запрос; для параллельных чтений через asyncio.gather нужен fork() со своей сессией
+class UnitOfWork:
+    def __init__(self, db_connection: DB_connection):
+        self.db_connection = db_connection
+        self._session: AsyncSession | None = None
+        self._forks: list[UnitOfWork] = []
+
+    async def get_session(self):
+        if self._session is None:
+            self._session = self.db_connection.session_maker()
+        elif not self._session.is_active or self._session.new or self._session.dirty or self._session.deleted:
+            logger.warning("Сессия запроса осталась незавершённой после ошибки, выполняется откат")
+            await self._session.rollback()
+        yield self._session
+
+    def fork(self) -> "UnitOfWork":
+        unit = UnitOfWork(self.db_connection)
+        self._forks.append(unit)
+        return unit
+
+    async def release(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+
+    async def rollback(self) -> None:
+        for unit in self._forks:
+            await unit.rollback()
+        if self._session is not None and self._session.in_transaction():
+            await self._session.rollback()
+
+    async def close(self) -> None:
+        for unit in self._forks:
+            await unit.close()
+        self._forks.clear()
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+
+def unit_of_work(db_connection: DB_connection):
+    async def dependency():
+        unit = UnitOfWork(db_connection)
+        try:
+            yield unit
+        except Exception:
+            await unit.rollback()
+            raise
+        finally:
+            await unit.close()
+    return dependency
+
+
+class RouteStats:
+    def __init__(self):
+        self._routes: dict[str, dict] = {}
+
+    def begin(self) -> list[int]:
+        counter = [0]
+        _request_checkouts.set(counter)
+        return counter
+
+    def record(self, route: str, checkouts: int, elapsed: float) -> None:
+        entry = self._routes.get(route)
+        if entry is None:
+            entry = {"requests": 0, "checkouts": 0, "max_checkouts": 0, "total_ms": 0.0, "max_ms": 0.0}
+            self._routes[route] = entry
+        elapsed_ms = elapsed * 1000
+        entry["requests"] += 1
+        entry["checkouts"] += checkouts
+        entry["total_ms"] += elapsed_ms
+        if checkouts > entry["max_checkouts"]:
+            entry["max_checkouts"] = checkouts
+        if elapsed_ms > entry["max_ms"]:
+            entry["max_ms"] = elapsed_ms
+
+    def stats(self) -> list[dict]:
+        return [
+            {
+                "route": route,
+                "requests": entry["requests"],
+                "avg_checkouts": round(entry["checkouts"] / entry["requests"], 2),
+                "max_checkouts": entry["max_checkouts"],
+                "avg_ms": round(entry["total_ms"] / entry["requests"], 1),
+                "max_ms": round(entry["max_ms"], 1)
+            }
+            for route, entry in sorted(self._routes.items())
+        ]
+
+
+class DB_registry:
+    def __init__(self):
+        self._connections: dict[str, DB_connection] = {}
+
+    def get(self, db_name: str) -> DB_connection:
+        connection = self._connections.get(db_name)
+        if connection is None:
+            connection = DB_connection(db_name)
+            self._connections[db_name] = connection
+        return connection
+
+    def pool_stats(self) -> list[dict]:
+        return [connection.pool_stats() for connection in self._connections.values()]
+
+    async def close_all(self):
+        for connection in self._connections.values():
+            await connection.close()
+        self._connections.clear()
+
+
+db_registry = DB_registry()
+route_stats = RouteStats()
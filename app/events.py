@@ -0,0 +1,27 @@
+from collections import defaultdict
+from typing import Callable
+
+from logging_manager import logger
+
+
+SPOT_STATUS_CHANGED = "spot_status_changed"
+SPOT_PRICE_CHANGED = "spot_price_changed"
+BOOKING_CREATED = "booking_created"
+BOOKING_CANCELLED = "booking_cancelled"
+BOOKING_EXPIRED = "booking_expired"
+USER_STATUS_CHANGED = "user_status_changed"
+USER_NOTIFICATION = "user_notification"
+
+_listeners: dict[str, list[Callable]] = defaultdict(list)
+
+
+def subscribe(event_name: str, listener: Callable) -> None:
+    _listeners[event_name].append(listener)
+
+
+def publish(event_name: str, **payload) -> None:
+    for listener in _listeners[event_name]:
+        try:
+            listener(**payload)
+        except Exception as e:
+            logger.error(f"Ошибка обработчика события {event_name}: {e}")
@@ -0,0 +1,195 @@
+import asyncio
+import heapq
+import time
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+from sqlalchemy import select
+
+import events
+from logging_manager import logger
+from payments.pay_models import Payment
+from scheduler import (
+    user_db_connection, pay_db_connection, release_bookings, publish_released,
+    hold_minutes, sweep_chunk_size, HOLD_EXPIRED, END_EXPIRED
+)
+from users.user_models import Booking
+
+
+ExpiringBooking = namedtuple("ExpiringBooking", ["BookingID", "SpotID"])
+
+
+class ExpiryEngine:
+    def __init__(self, hold: timedelta, max_batch: int = 500):
+        self.hold = hold
+        self.max_batch = max_batch
+        self._heap: list[tuple[datetime, int, str]] = []
+        self._live: dict[int, dict] = {}
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task | None = None
+        self.released = 0
+        self.paid = 0
+        self.pruned = 0
+        self.last_lag_ms = 0.0
+
+    def schedule(self, booking_id: int, spot_id: int, created: datetime, end_time: datetime) -> None:
+        hold_deadline = created + self.hold
+        self._live[booking_id] = {"spot_id": spot_id, HOLD_EXPIRED: hold_deadline, END_EXPIRED: end_time}
+        earliest = self._heap[0][0] if self._heap else None
+        heapq.heappush(self._heap, (hold_deadline, booking_id, HOLD_EXPIRED))
+        heapq.heappush(self._heap, (end_time, booking_id, END_EXPIRED))
+        if earliest is None or min(hold_deadline, end_time) < earliest:
+            self._wakeup.set()
+
+    def forget(self, booking_id: int, **_) -> None:
+        self._live.pop(booking_id, None)
+
+    def on_booking_created(self, booking_id: int, spot_id: int, created: datetime, end_time: datetime, **_) -> None:
+        self.schedule(booking_id, spot_id, created, end_time)
+
+    async def load(self) -> None:
+        horizon = datetime.now() - self.hold
+        async with user_db_connection.session_maker() as session:
+            result = await session.execute(
+                select(Booking.BookingID, Booking.SpotID, Booking.Created, Booking.EndTime)
+            )
+            rows = result.all()
+
+        self._heap.clear()
+        self._live.clear()
+        for row in rows:
+            self._live[row.BookingID] = {"spot_id": row.SpotID, HOLD_EXPIRED: None, END_EXPIRED: row.EndTime}
+            self._heap.append((row.EndTime, row.BookingID, END_EXPIRED))
+            if row.Created is not None and row.Created >= horizon:
+                hold_deadline = row.Created + self.hold
+                self._live[row.BookingID][HOLD_EXPIRED] = hold_deadline
+                self._heap.append((hold_deadline, row.BookingID, HOLD_EXPIRED))
+        heapq.heapify(self._heap)
+        self._wakeup.set()
+        logger.info(f"Загружено {len(self._live)} бронирований в планировщик истечения")
+
+    def start(self) -> None:
+        events.subscribe(events.BOOKING_CREATED, self.on_booking_created)
+        events.subscribe(events.BOOKING_CANCELLED, self.forget)
+        events.subscribe(events.BOOKING_EXPIRED, self.forget)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def _pop_due(self, now: datetime) -> list[tuple[datetime, int, str]]:
+        due = []
+        seen = set()
+        while self._heap and self._heap[0][0] <= now and len(due) < self.max_batch:
+            deadline, booking_id, kind = heapq.heappop(self._heap)
+            entry = self._live.get(booking_id)
+            if entry is None or entry[kind] != deadline or (booking_id, kind) in seen:
+                continue
+            seen.add((booking_id, kind))
+            due.append((deadline, booking_id, kind))
+        return due
+
+    def _restore(self, due: list[tuple[datetime, int, str]]) -> None:
+        for item in due:
+            heapq.heappush(self._heap, item)
+
+    def _next_delay(self) -> float | None:
+        if not self._heap:
+            return None
+        return max((self._heap[0][0] - datetime.now()).total_seconds(), 0.0)
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                delay = self._next_delay()
+                if delay is None or delay > 0:
+                    try:
+                        await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                    except asyncio.TimeoutError:
+                        pass
+                self._wakeup.clear()
+
+                now = datetime.now()
+                due = self._pop_due(now)
+                if due:
+                    self.last_lag_ms = round((now - due[0][0]).total_seconds() * 1000, 1)
+                    try:
+                        await self._release(due)
+                    except Exception:
+                        self._restore(due)
+                        raise
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Ошибка в планировщике истечения бронирований: {e}")
+                await asyncio.sleep(1)
+
+    async def _release(self, due: list[tuple[datetime, int, str]]) -> None:
+        holds = []
+        ends = []
+        for _, booking_id, kind in due:
+            entry = self._live.get(booking_id)
+            if entry is None:
+                continue
+            row = ExpiringBooking(booking_id, entry["spot_id"])
+            (holds if kind == HOLD_EXPIRED else ends).append(row)
+
+        unpaid = []
+        paid_ids = set()
+        if holds:
+            async with pay_db_connection.session_maker() as pay_session:
+                result = await pay_session.execute(
+                    select(Payment.BookingID).where(Payment.BookingID.in_([row.BookingID for row in holds]))
+                )
+                paid_ids = set(result.scalars().all())
+            self.paid += len(paid_ids)
+            unpaid = [row for row in holds if row.BookingID not in paid_ids]
+
+        started = time.perf_counter()
+        async with user_db_connection.session_maker() as user_session:
+            try:
+                released_holds = await release_bookings(user_session, unpaid, unpaid=True) if unpaid else []
+                released_ends = await release_bookings(user_session, ends) if ends else []
+                await user_session.commit()
+            except Exception:
+                await user_session.rollback()
+                raise
+
+        for booking_id in paid_ids:
+            entry = self._live.get(booking_id)
+            if entry is not None:
+                entry[HOLD_EXPIRED] = None
+        released_ids = {row.BookingID for row in released_holds} | {row.BookingID for row in released_ends}
+        for row in unpaid + ends:
+            self._live.pop(row.BookingID, None)
+            if row.BookingID not in released_ids:
+                self.pruned += 1
+
+        publish_released(released_holds, HOLD_EXPIRED)
+        publish_released(released_ends, END_EXPIRED)
+        self.released += len(released_holds) + len(released_ends)
+        if released_holds or released_ends:
+            logger.info(
+                f"Освобождено бронирований: неоплаченных {len(released_holds)}, завершённых {len(released_ends)} "
+                f"за {round((time.perf_counter() - started) * 1000, 1)} мс"
+            )
+
+    def stats(self) -> dict:
+        return {
+            "tracked": len(self._live),
+            "heap": len(self._heap),
+            "released": self.released,
+            "paid_holds": self.paid,
+            "pruned": self.pruned,
+            "last_lag_ms": self.last_lag_ms
+        }
+
+
+expiry_engine = ExpiryEngine(hold=timedelta(minutes=hold_minutes), max_batch=sweep_chunk_size)
@@ -0,0 +1,115 @@
+import configparser
+from aiokafka import AIOKafkaProducer
+
+from logging_manager import logger
+from payments import event_codec
+
+
+config = configparser.ConfigParser()
+config.read('config.ini')
+kafka_server = config['KAFKA SETTINGS']['KAFKA_SERVER']
+topic_name = config['KAFKA SETTINGS']['TOPIC_NAME']
+linger_ms = config.getint('KAFKA SETTINGS', 'LINGER_MS', fallback=5)
+compression_type = config.get('KAFKA SETTINGS', 'COMPRESSION_TYPE', fallback='') or None
+acks = config.get('KAFKA SETTINGS', 'ACKS', fallback='1')
+event_encoding = config.get('KAFKA SETTINGS', 'EVENT_ENCODING', fallback='binary')
+
+
+class KafkaProducerManager:
+    def __init__(
+        self,
+        bootstrap_servers: str,
+        topic: str,
+        linger_ms: int = 5,
+        compression_type: str | None = None,
+        acks: int | str = 1,
+        encoding: str = "binary"
+    ):
+        self.bootstrap_servers = bootstrap_servers
+        self.topic = topic
+        self.linger_ms = linger_ms
+        self.compression_type = compression_type
+        self.acks = acks if acks == "all" else int(acks)
+        self.encoding = encoding
+        self.producer: AIOKafkaProducer | None = None
+        self.sent = 0
+        self.delivered = 0
+        self.failed = 0
+
+    async def start(self) -> None:
+        if self.producer is not None:
+            return
+        producer = AIOKafkaProducer(
+            bootstrap_servers=self.bootstrap_servers,
+            linger_ms=self.linger_ms,
+            compression_type=self.compression_type,
+            acks=self.acks,
+            value_serializer=event_codec.encode if self.encoding == "binary" else event_codec.encode_json,
+            key_serializer=lambda key: str(key).encode('utf-8') if key is not None else None
+        )
+        try:
+            await producer.start()
+        except Exception as e:
+            logger.error(f"Не удалось запустить Kafka producer: {e}")
+            return
+        self.producer = producer
+        logger.info(
+            f"Kafka producer запущен: linger_ms={self.linger_ms}, compression={self.compression_type}, "
+            f"acks={self.acks}, encoding={self.encoding}"
+        )
+
+    async def stop(self) -> None:
+        if self.producer is None:
+            return
+        producer, self.producer = self.producer, None
+        try:
+            await producer.flush()
+        finally:
+            await producer.stop()
+        logger.info(f"Kafka producer остановлен: sent={self.sent}, delivered={self.delivered}, failed={self.failed}")
+
+    async def send_batch(self, messages: list[dict], keys: list[str | int | None] | None = None) -> list[Exception | None]:
+        if self.producer is None:
+            raise RuntimeError("Kafka producer не запущен")
+
+        keys = keys or [None] * len(messages)
+        deliveries = []
+        for message, key in zip(messages, keys):
+            try:
+                deliveries.append(await self.producer.send(self.topic, message, key=key))
+                self.sent += 1
+            except Exception as e:
+                self.failed += 1
+                deliveries.append(e)
+
+        errors = []
+        for delivery in deliveries:
+            if isinstance(delivery, Exception):
+                errors.append(delivery)
+                continue
+            try:
+                await delivery
+                self.delivered += 1
+                errors.append(None)
+            except Exception as e:
+                self.failed += 1
+                errors.append(e)
+        return errors
+
+    def stats(self) -> dict:
+        return {
+            "sent": self.sent,
+            "delivered": self.delivered,
+            "failed": self.failed,
+            "in_flight": self.sent - self.delivered - self.failed
+        }
+
+
+kafka_producer = KafkaProducerManager(
+    bootstrap_servers=kafka_server,
+    topic=topic_name,
+    linger_ms=linger_ms,
+    compression_type=compression_type,
+    acks=acks,
+    encoding=event_encoding
+)
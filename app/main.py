@@ -1,19 +1,44 @@
 from contextlib import asynccontextmanager
-from fastapi import FastAPI
+import time
+from fastapi import FastAPI, Request
 from fastapi.staticfiles import StaticFiles
 import uvicorn
 
 from users.user_router import router as user_router
 from payments.pay_router import router as pay_router
 from admin.admin_router import router as admin_router
-from scheduler import setup_scheduler, scheduler, user_db_connection, pay_db_connection
+from users.user_router import user_db
+from users.db_manager import UserRepository
+from kafka_producer import kafka_producer
+from cache_invalidation import cache_invalidation
+from payments.booking_consumer import booking_consumer
+from scheduler import setup_scheduler, scheduler, refresh_spot_index, refresh_notification_inbox
+from expiry_engine import expiry_engine
+from outbox_relay import outbox_relay
+from db_conn import db_registry, route_stats
+from password_hasher import password_hasher
 from logging_manager import logger
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     setup_scheduler()
-    
+    await kafka_producer.start()
+    booking_consumer.start()
+    await cache_invalidation.start()
+    await refresh_spot_index()
+    await refresh_notification_inbox()
+    try:
+        await UserRepository(user_db).load_roles()
+    except Exception as e:
+        logger.error(f"Не удалось загрузить роли пользователей: {e}")
+    try:
+        await expiry_engine.load()
+    except Exception as e:
+        logger.error(f"Не удалось загрузить сроки бронирований: {e}")
+    expiry_engine.start()
+    outbox_relay.start()
+
     try:
         yield
     finally:
@@ -22,12 +47,27 @@ async def lifespan(app: FastAPI):
 async def shutdown():
     logger.info("Shutting down application")
     scheduler.shutdown(wait=False)  
-    await user_db_connection.close() 
-    await pay_db_connection.close()
+    await expiry_engine.stop()
+    await booking_consumer.stop()
+    await cache_invalidation.stop()
+    await outbox_relay.stop()
+    await kafka_producer.stop()
+    await db_registry.close_all()
+    password_hasher.shutdown()
     logger.info("Application shutdown complete")
 
 app = FastAPI(lifespan=lifespan)
 
+@app.middleware("http")
+async def track_route_checkouts(request: Request, call_next):
+    counter = route_stats.begin()
+    started = time.perf_counter()
+    try:
+        return await call_next(request)
+    finally:
+        route = request.scope.get("route")
+        route_stats.record(getattr(route, "path", "unmatched"), counter[0], time.perf_counter() - started)
+
 app.mount("/static", StaticFiles(directory="static"), name="static")
 app.include_router(user_router)
 app.include_router(pay_router)
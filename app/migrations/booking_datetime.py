@@ -0,0 +1,105 @@
+import argparse
+import asyncio
+import configparser
+
+from sqlalchemy import text
+
+from db_conn import db_registry
+from logging_manager import logger
+
+
+config = configparser.ConfigParser()
+config.read('config.ini')
+user_server = config['BD INFO']['USER_DB']
+
+INDEXES = {
+    "IX_Bookings_EndTime": "CREATE INDEX IX_Bookings_EndTime ON Bookings (EndTime)",
+    "IX_Bookings_SpotID_StartTime": "CREATE INDEX IX_Bookings_SpotID_StartTime ON Bookings (SpotID, StartTime)",
+    "IX_Bookings_UserID": "CREATE INDEX IX_Bookings_UserID ON Bookings (UserID)",
+}
+
+
+async def column_type(session, column: str) -> str | None:
+    result = await session.execute(
+        text("""
+            SELECT DATA_TYPE FROM INFORMATION_SCHEMA.COLUMNS
+            WHERE TABLE_NAME = 'Bookings' AND COLUMN_NAME = :column
+        """),
+        {"column": column}
+    )
+    return result.scalar_one_or_none()
+
+
+async def convert_columns(session, batch_size: int) -> None:
+    for column in ("StartTimeDT", "EndTimeDT"):
+        if await column_type(session, column) is None:
+            await session.execute(text(f"ALTER TABLE Bookings ADD {column} DATETIME2 NULL"))
+    await session.commit()
+
+    max_id = (await session.execute(text("SELECT ISNULL(MAX(BookingID), 0) FROM Bookings"))).scalar_one()
+    last_id = 0
+    converted = 0
+    while last_id < max_id:
+        result = await session.execute(
+            text("""
+                UPDATE Bookings
+                SET StartTimeDT = TRY_CONVERT(DATETIME2, REPLACE(StartTime, 'Z', '')),
+                    EndTimeDT = TRY_CONVERT(DATETIME2, REPLACE(EndTime, 'Z', ''))
+                WHERE BookingID > :last_id AND BookingID <= :upper_id
+            """),
+            {"last_id": last_id, "upper_id": last_id + batch_size}
+        )
+        await session.commit()
+        converted += result.rowcount
+        last_id += batch_size
+        logger.info(f"Сконвертировано {converted} бронирований (BookingID <= {min(last_id, max_id)})")
+
+    invalid = (await session.execute(
+        text("SELECT BookingID, StartTime, EndTime FROM Bookings WHERE StartTimeDT IS NULL OR EndTimeDT IS NULL")
+    )).fetchall()
+    if invalid:
+        for row in invalid:
+            logger.error(f"Не удалось сконвертировать BookingID={row.BookingID}: {row.StartTime} - {row.EndTime}")
+        raise ValueError(f"{len(invalid)} бронирований с некорректными датами, миграция остановлена")
+
+    await session.execute(text("ALTER TABLE Bookings DROP COLUMN StartTime"))
+    await session.execute(text("ALTER TABLE Bookings DROP COLUMN EndTime"))
+    await session.execute(text("EXEC sp_rename 'Bookings.StartTimeDT', 'StartTime', 'COLUMN'"))
+    await session.execute(text("EXEC sp_rename 'Bookings.EndTimeDT', 'EndTime', 'COLUMN'"))
+    await session.execute(text("ALTER TABLE Bookings ALTER COLUMN StartTime DATETIME2 NOT NULL"))
+    await session.execute(text("ALTER TABLE Bookings ALTER COLUMN EndTime DATETIME2 NOT NULL"))
+    await session.commit()
+    logger.info("Столбцы StartTime/EndTime переведены на DATETIME2")
+
+
+async def create_indexes(session) -> None:
+    for name, ddl in INDEXES.items():
+        exists = await session.execute(
+            text("SELECT 1 FROM sys.indexes WHERE name = :name AND object_id = OBJECT_ID('Bookings')"),
+            {"name": name}
+        )
+        if exists.scalar_one_or_none():
+            continue
+        await session.execute(text(ddl))
+        await session.commit()
+        logger.info(f"Создан индекс {name}")
+
+
+async def migrate(batch_size: int) -> None:
+    user_db = db_registry.get(user_server)
+    try:
+        async with user_db.session_maker() as session:
+            if await column_type(session, "StartTime") == "datetime2":
+                logger.info("Столбцы StartTime/EndTime уже имеют тип DATETIME2")
+            else:
+                await convert_columns(session, batch_size)
+            await create_indexes(session)
+    finally:
+        await db_registry.close_all()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Перевод Bookings.StartTime/EndTime на DATETIME2")
+    parser.add_argument("--batch-size", type=int, default=5000)
+    args = parser.parse_args()
+    asyncio.run(migrate(args.batch_size))
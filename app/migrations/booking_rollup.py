@@ -0,0 +1,79 @@
+import argparse
+import asyncio
+import configparser
+
+from sqlalchemy import text
+
+from db_conn import db_registry
+from logging_manager import logger
+from users.booking_rollup import add_range_to_rollup
+from users.user_models import BookingDailyRollup
+
+
+config = configparser.ConfigParser()
+config.read('config.ini')
+user_server = config['BD INFO']['USER_DB']
+
+
+async def backfill_revenue(session, batch_size: int) -> None:
+    exists = (await session.execute(
+        text("""
+            SELECT 1 FROM INFORMATION_SCHEMA.COLUMNS
+            WHERE TABLE_NAME = 'Bookings' AND COLUMN_NAME = 'Revenue'
+        """)
+    )).scalar_one_or_none()
+    if not exists:
+        await session.execute(text("ALTER TABLE Bookings ADD Revenue DECIMAL(12, 2) NULL"))
+        await session.commit()
+
+    max_id = (await session.execute(text("SELECT ISNULL(MAX(BookingID), 0) FROM Bookings"))).scalar_one()
+    last_id = 0
+    filled = 0
+    while last_id < max_id:
+        result = await session.execute(
+            text("""
+                UPDATE b
+                SET Revenue = ROUND(CAST(DATEDIFF(second, b.StartTime, b.EndTime) AS FLOAT) / 3600.0 * ps.Price, 2)
+                FROM Bookings b
+                JOIN ParkingSpots ps ON ps.SpotID = b.SpotID
+                WHERE b.Revenue IS NULL AND b.BookingID > :last_id AND b.BookingID <= :upper_id
+            """),
+            {"last_id": last_id, "upper_id": last_id + batch_size}
+        )
+        await session.commit()
+        filled += result.rowcount
+        last_id += batch_size
+    logger.info(f"Bookings.Revenue заполнен для {filled} бронирований по текущим ценам")
+
+
+async def rebuild_rollup(session, batch_size: int) -> None:
+    await session.execute(text("DELETE FROM BookingDailyRollups"))
+    max_id = (await session.execute(text("SELECT COALESCE(MAX(BookingID), 0) FROM Bookings"))).scalar_one()
+    last_id = 0
+    while last_id < max_id:
+        await add_range_to_rollup(session, last_id, last_id + batch_size)
+        last_id += batch_size
+        logger.info(f"Витрина пересчитана до BookingID <= {min(last_id, max_id)}")
+    await session.commit()
+
+    rows = (await session.execute(text("SELECT COUNT(*) FROM BookingDailyRollups"))).scalar_one()
+    logger.info(f"Витрина BookingDailyRollups заполнена: {rows} строк")
+
+
+async def migrate(batch_size: int) -> None:
+    user_db = db_registry.get(user_server)
+    try:
+        async with user_db.engine.begin() as conn:
+            await conn.run_sync(BookingDailyRollup.__table__.create, checkfirst=True)
+        async with user_db.session_maker() as session:
+            await backfill_revenue(session, batch_size)
+            await rebuild_rollup(session, batch_size)
+    finally:
+        await db_registry.close_all()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Создание и пересчёт дневной витрины бронирований")
+    parser.add_argument("--batch-size", type=int, default=5000)
+    args = parser.parse_args()
+    asyncio.run(migrate(args.batch_size))
@@ -0,0 +1,25 @@
+import asyncio
+import configparser
+
+from db_conn import db_registry
+from logging_manager import logger
+from users.user_models import OutboxEvent
+
+
+config = configparser.ConfigParser()
+config.read('config.ini')
+user_server = config['BD INFO']['USER_DB']
+
+
+async def migrate() -> None:
+    user_db = db_registry.get(user_server)
+    try:
+        async with user_db.engine.begin() as conn:
+            await conn.run_sync(OutboxEvent.__table__.create, checkfirst=True)
+        logger.info("Таблица OutboxEvents готова")
+    finally:
+        await db_registry.close_all()
+
+
+if __name__ == '__main__':
+    asyncio.run(migrate())
@@ -0,0 +1,54 @@
+import asyncio
+import configparser
+
+from sqlalchemy import text
+
+from db_conn import db_registry
+from logging_manager import logger
+
+
+config = configparser.ConfigParser()
+config.read('config.ini')
+pay_server = config['BD INFO']['PAY_DB']
+
+INDEX_NAME = "UX_Payments_TransactionID"
+
+
+async def create_unique_index(session) -> None:
+    exists = await session.execute(
+        text("SELECT 1 FROM sys.indexes WHERE name = :name AND object_id = OBJECT_ID('Payments')"),
+        {"name": INDEX_NAME}
+    )
+    if exists.scalar_one_or_none():
+        logger.info(f"Индекс {INDEX_NAME} уже существует")
+        return
+
+    duplicates = (await session.execute(
+        text("""
+            SELECT TransactionID, COUNT(*) AS Payments
+            FROM Payments
+            GROUP BY TransactionID
+            HAVING COUNT(*) > 1
+        """)
+    )).fetchall()
+    if duplicates:
+        for row in duplicates:
+            logger.error(f"TransactionID={row.TransactionID} записан {row.Payments} раз")
+        raise ValueError(f"{len(duplicates)} повторяющихся TransactionID, миграция остановлена")
+
+    await session.execute(text(f"CREATE UNIQUE INDEX {INDEX_NAME} ON Payments (TransactionID)"))
+    await session.commit()
+    logger.info(f"Создан индекс {INDEX_NAME}")
+
+
+async def migrate() -> None:
+    pay_db = db_registry.get(pay_server)
+    try:
+        async with pay_db.session_maker() as session:
+            await create_unique_index(session)
+    finally:
+        await db_registry.close_all()
+
+
+if __name__ == '__main__':
+    asyncio.run(migrate())
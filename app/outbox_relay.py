@@ -0,0 +1,167 @@
+import asyncio
+import configparser
+import json
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, exists, or_, select, update
+from sqlalchemy.orm import aliased
+
+import events
+from db_conn import db_registry
+from kafka_producer import kafka_producer
+from logging_manager import logger
+from users.user_models import OutboxEvent
+
+
+config = configparser.ConfigParser()
+config.read('config.ini')
+user_server = config['BD INFO']['USER_DB']
+outbox_batch_size = config.getint('OUTBOX', 'BATCH_SIZE', fallback=200)
+outbox_poll_interval = config.getfloat('OUTBOX', 'POLL_INTERVAL_SECONDS', fallback=1)
+outbox_max_backoff = config.getint('OUTBOX', 'MAX_BACKOFF_SECONDS', fallback=300)
+outbox_retention_hours = config.getint('OUTBOX', 'RETENTION_HOURS', fallback=24)
+
+
+class OutboxRelay:
+    def __init__(self, batch_size: int = 200, poll_interval: float = 1, max_backoff: int = 300, retention_hours: int = 24):
+        self.db_connection = db_registry.get(user_server)
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.max_backoff = max_backoff
+        self.retention = timedelta(hours=retention_hours)
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task | None = None
+        self._last_purge = 0.0
+        self.relayed = 0
+        self.failed = 0
+        self.batches = 0
+        self.last_batch_ms = 0.0
+        self.last_rate = 0.0
+
+    def on_booking_created(self, **_) -> None:
+        self._wakeup.set()
+
+    def start(self) -> None:
+        events.subscribe(events.BOOKING_CREATED, self.on_booking_created)
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                if kafka_producer.producer is None:
+                    await kafka_producer.start()
+                    if kafka_producer.producer is None:
+                        await asyncio.sleep(min(self.max_backoff, 10))
+                        continue
+                drained = await self.relay_batch()
+                await self._purge_sent()
+                if drained < self.batch_size:
+                    try:
+                        await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                    except asyncio.TimeoutError:
+                        pass
+                    self._wakeup.clear()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Ошибка ретранслятора outbox: {e}")
+                await asyncio.sleep(self.poll_interval)
+
+    async def relay_batch(self) -> int:
+        started = time.perf_counter()
+        now = datetime.now()
+        earlier = aliased(OutboxEvent)
+        async with self.db_connection.session_maker() as session:
+            result = await session.execute(
+                select(OutboxEvent)
+                .where(
+                    OutboxEvent.SentAt.is_(None),
+                    or_(OutboxEvent.NextAttemptAt.is_(None), OutboxEvent.NextAttemptAt <= now),
+                    ~exists().where(
+                        earlier.UserID == OutboxEvent.UserID,
+                        earlier.SentAt.is_(None),
+                        earlier.EventID < OutboxEvent.EventID
+                    )
+                )
+                .order_by(OutboxEvent.EventID)
+                .limit(self.batch_size)
+                .with_hint(OutboxEvent, "WITH (UPDLOCK, READPAST, ROWLOCK)", "mssql")
+            )
+            batch = result.scalars().all()
+            if not batch:
+                await session.rollback()
+                return 0
+
+            errors = await kafka_producer.send_batch(
+                [json.loads(event.Payload) for event in batch],
+                keys=[event.UserID for event in batch]
+            )
+
+            sent_ids = [event.EventID for event, error in zip(batch, errors) if error is None]
+            if sent_ids:
+                await session.execute(
+                    update(OutboxEvent)
+                    .where(OutboxEvent.EventID.in_(sent_ids))
+                    .values(SentAt=datetime.now())
+                    .execution_options(synchronize_session=False)
+                )
+            for event, error in zip(batch, errors):
+                if error is None:
+                    continue
+                event.Attempts += 1
+                event.LastError = str(error)[:500]
+                event.NextAttemptAt = datetime.now() + timedelta(seconds=min(2 ** event.Attempts, self.max_backoff))
+            await session.commit()
+
+        elapsed = time.perf_counter() - started
+        self.batches += 1
+        self.relayed += len(sent_ids)
+        self.failed += len(batch) - len(sent_ids)
+        self.last_batch_ms = round(elapsed * 1000, 1)
+        self.last_rate = round(len(sent_ids) / elapsed, 1) if elapsed else 0.0
+        if len(sent_ids) < len(batch):
+            logger.warning(f"Outbox: не доставлено {len(batch) - len(sent_ids)} из {len(batch)} событий")
+        return len(batch)
+
+    async def _purge_sent(self) -> None:
+        if time.monotonic() - self._last_purge < 3600:
+            return
+        self._last_purge = time.monotonic()
+        async with self.db_connection.session_maker() as session:
+            result = await session.execute(
+                delete(OutboxEvent)
+                .where(OutboxEvent.SentAt < datetime.now() - self.retention)
+                .execution_options(synchronize_session=False)
+            )
+            await session.commit()
+            if result.rowcount:
+                logger.info(f"Outbox: удалено {result.rowcount} доставленных событий")
+
+    def stats(self) -> dict:
+        return {
+            "relayed": self.relayed,
+            "failed": self.failed,
+            "batches": self.batches,
+            "last_batch_ms": self.last_batch_ms,
+            "last_rate_per_second": self.last_rate
+        }
+
+
+outbox_relay = OutboxRelay(
+    batch_size=outbox_batch_size,
+    poll_interval=outbox_poll_interval,
+    max_backoff=outbox_max_backoff,
+    retention_hours=outbox_retention_hours
+)
@@ -0,0 +1,78 @@
+import asyncio
+import configparser
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from passlib.context import CryptContext
+
+from logging_manager import logger
+
+
+config = configparser.ConfigParser()
+config.read('config.ini')
+bcrypt_rounds = config.getint('PASSWORD HASHING', 'BCRYPT_ROUNDS', fallback=12)
+hash_workers = config.getint('PASSWORD HASHING', 'WORKERS', fallback=4)
+
+
+class PasswordHasher:
+    def __init__(self, rounds: int = 12, workers: int = 4):
+        self.context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=rounds)
+        self.rounds = rounds
+        self.workers = workers
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+        self._lock = threading.Lock()
+        self.queued = 0
+        self.running = 0
+        self.max_queued = 0
+        self.calls = 0
+        self.total_wait = 0.0
+        self.total_work = 0.0
+
+    def _timed(self, func, submitted: float, *args):
+        started = time.perf_counter()
+        with self._lock:
+            self.queued -= 1
+            self.running += 1
+            self.total_wait += started - submitted
+        try:
+            return func(*args)
+        finally:
+            work = time.perf_counter() - started
+            with self._lock:
+                self.running -= 1
+                self.calls += 1
+                self.total_work += work
+
+    async def _submit(self, func, *args):
+        with self._lock:
+            self.queued += 1
+            self.max_queued = max(self.max_queued, self.queued)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self._timed, func, time.perf_counter(), *args)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._submit(self.context.verify, plain_password, hashed_password)
+
+    async def hash(self, password: str) -> str:
+        return await self._submit(self.context.hash, password)
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        logger.info("Пул хеширования паролей остановлен")
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "rounds": self.rounds,
+                "workers": self.workers,
+                "queued": self.queued,
+                "running": self.running,
+                "max_queued": self.max_queued,
+                "calls": self.calls,
+                "avg_wait_ms": round(self.total_wait / self.calls * 1000, 2) if self.calls else 0.0,
+                "avg_work_ms": round(self.total_work / self.calls * 1000, 2) if self.calls else 0.0
+            }
+
+
+password_hasher = PasswordHasher(rounds=bcrypt_rounds, workers=hash_workers)
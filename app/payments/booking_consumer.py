@@ -0,0 +1,120 @@
+import asyncio
+import configparser
+import time
+from aiokafka import AIOKafkaConsumer, TopicPartition
+
+from logging_manager import logger
+from payments.booking_store import BookingStore
+from payments import event_codec
+
+
+config = configparser.ConfigParser()
+config.read('config.ini')
+kafka_server = config['KAFKA SETTINGS']['KAFKA_SERVER']
+topic_name = config['KAFKA SETTINGS']['TOPIC_NAME']
+booking_ttl = config.getint('PAYMENTS', 'BOOKING_TTL_SECONDS', fallback=900)
+booking_max_entries = config.getint('PAYMENTS', 'BOOKING_MAX_ENTRIES', fallback=10000)
+wait_timeout = config.getfloat('PAYMENTS', 'WAIT_TIMEOUT_SECONDS', fallback=5)
+
+
+class BookingEventConsumer:
+    def __init__(self, store: BookingStore, bootstrap_servers: str, topic: str):
+        self.store = store
+        self.bootstrap_servers = bootstrap_servers
+        self.topic = topic
+        self._task: asyncio.Task | None = None
+        self.partitions: set[int] = set()
+        self.consumed = 0
+        self.skipped = 0
+        self.invalid = 0
+        self.connected = False
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _assign_all(self, consumer: AIOKafkaConsumer) -> None:
+        await consumer.topics()
+        partitions = [TopicPartition(self.topic, p) for p in sorted(consumer.partitions_for_topic(self.topic) or [])]
+        if not partitions:
+            raise RuntimeError(f"Топик {self.topic} не найден")
+        consumer.assign(partitions)
+        since = int((time.time() - self.store.ttl) * 1000)
+        offsets = await consumer.offsets_for_times({tp: since for tp in partitions})
+        latest = []
+        for tp in partitions:
+            found = offsets.get(tp)
+            if found is None:
+                latest.append(tp)
+            else:
+                consumer.seek(tp, found.offset)
+        if latest:
+            await consumer.seek_to_end(*latest)
+        self.partitions = {tp.partition for tp in partitions}
+
+    async def _run(self) -> None:
+        backoff = 1
+        while True:
+            consumer = AIOKafkaConsumer(
+                bootstrap_servers=self.bootstrap_servers,
+                group_id=None,
+                retry_backoff_ms=200,
+                request_timeout_ms=10000,
+                enable_auto_commit=False
+            )
+            try:
+                await consumer.start()
+                await self._assign_all(consumer)
+                self.connected = True
+                backoff = 1
+                logger.info(f"Консьюмер бронирований подключён к {self.topic}, партиции {sorted(self.partitions)}")
+                async for msg in consumer:
+                    self.handle(msg.value, msg.timestamp / 1000)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Ошибка консьюмера бронирований, переподключение через {backoff} с: {e}")
+            finally:
+                self.connected = False
+                await consumer.stop()
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, 30)
+
+    def handle(self, value: bytes, created: float | None = None) -> None:
+        try:
+            message = event_codec.decode(value)
+            user_id = int(message["user_id"])
+        except (ValueError, KeyError, TypeError, UnicodeDecodeError) as e:
+            self.invalid += 1
+            logger.error(f"Ошибка при декодировании сообщения: {value} ({e})")
+            return
+        if message.get("processed"):
+            self.skipped += 1
+            return
+        booking_id = message.get("booking_id")
+        self.store.put(user_id, {"booking_id": booking_id, "amount": message.get("amount")}, created, booking_id)
+        self.consumed += 1
+        logger.info(f"Получено сообщение из Kafka: user_id={user_id}, booking_id={message.get('booking_id')}")
+
+    def stats(self) -> dict:
+        return {
+            "connected": self.connected,
+            "consumed": self.consumed,
+            "skipped": self.skipped,
+            "invalid": self.invalid,
+            "partitions": sorted(self.partitions)
+        }
+
+
+booking_store = BookingStore(ttl_seconds=booking_ttl, max_entries=booking_max_entries)
+booking_consumer = BookingEventConsumer(booking_store, kafka_server, topic_name)
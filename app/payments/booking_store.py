@@ -0,0 +1,108 @@
+import asyncio
+import time
+from collections import OrderedDict
+
+
+class BookingStore:
+    def __init__(self, ttl_seconds: float = 900, max_entries: int = 10000):
+        self.ttl = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: OrderedDict[int, tuple[float, dict, int | None]] = OrderedDict()
+        self._tombstones: OrderedDict[int, float] = OrderedDict()
+        self._waiters: dict[int, list[asyncio.Future]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+        self.expired = 0
+        self.wait_timeouts = 0
+        self.suppressed = 0
+
+    def put(self, user_id: int, booking: dict, created: float | None = None, booking_id: int | None = None) -> None:
+        ttl = self.ttl if created is None else self.ttl - max(time.time() - created, 0)
+        if ttl <= 0:
+            return
+        if booking_id is not None and self._is_tombstoned(booking_id):
+            self.suppressed += 1
+            return
+        self._entries[user_id] = (time.monotonic() + ttl, booking, booking_id)
+        self._entries.move_to_end(user_id)
+        self._evict()
+        for waiter in self._waiters.pop(user_id, []):
+            if not waiter.done():
+                waiter.set_result(booking)
+
+    def get(self, user_id: int) -> dict | None:
+        entry = self._entries.get(user_id)
+        if entry is None:
+            self.misses += 1
+            return None
+        if entry[0] <= time.monotonic():
+            del self._entries[user_id]
+            self.expired += 1
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry[1]
+
+    def peek(self, user_id: int) -> dict | None:
+        entry = self._entries.get(user_id)
+        return entry[1] if entry else None
+
+    def pop(self, user_id: int, booking_id: int | None = None) -> dict | None:
+        entry = self._entries.pop(user_id, None)
+        for tombstone in {booking_id, entry[2] if entry else None} - {None}:
+            self._tombstones[tombstone] = time.monotonic() + self.ttl
+            self._tombstones.move_to_end(tombstone)
+        while len(self._tombstones) > self.max_entries:
+            self._tombstones.popitem(last=False)
+        return entry[1] if entry else None
+
+    def _is_tombstoned(self, booking_id: int) -> bool:
+        now = time.monotonic()
+        while self._tombstones and next(iter(self._tombstones.values())) <= now:
+            self._tombstones.popitem(last=False)
+        return booking_id in self._tombstones
+
+    async def wait_for(self, user_id: int, timeout: float) -> dict | None:
+        booking = self.get(user_id)
+        if booking is not None:
+            return booking
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.setdefault(user_id, []).append(waiter)
+        try:
+            return await asyncio.wait_for(waiter, timeout=timeout)
+        except asyncio.TimeoutError:
+            self.wait_timeouts += 1
+            return None
+        finally:
+            waiters = self._waiters.get(user_id)
+            if waiters and waiter in waiters:
+                waiters.remove(waiter)
+                if not waiters:
+                    del self._waiters[user_id]
+
+    def _evict(self) -> None:
+        now = time.monotonic()
+        while self._entries:
+            user_id, (expires, _, _) = next(iter(self._entries.items()))
+            if expires <= now:
+                self.expired += 1
+            elif len(self._entries) > self.max_entries:
+                self.evicted += 1
+            else:
+                break
+            del self._entries[user_id]
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "tombstones": len(self._tombstones),
+            "waiting_users": len(self._waiters),
+            "hits": self.hits,
+            "misses": self.misses,
+            "expired": self.expired,
+            "evicted": self.evicted,
+            "wait_timeouts": self.wait_timeouts,
+            "suppressed": self.suppressed
+        }
@@ -3,8 +3,7 @@ import configparser
 import json
 import logging
 import time
-import aiohttp
-from aiokafka import AIOKafkaConsumer
+from aiokafka import AIOKafkaConsumer, TopicPartition
 from aiogram import Bot, Dispatcher, types, F
 from aiogram.enums import ContentType
 from aiogram.filters import Command, CommandStart
@@ -12,6 +11,10 @@ from aiogram.exceptions import TelegramBadRequest
 from aiogram.client.default import DefaultBotProperties
 from fastapi.responses import RedirectResponse
 
+from booking_store import BookingStore
+import event_codec
+from payment_client import PaymentServerClient, RetryQueue
+
 
 logging.basicConfig(format="%(asctime)s - %(name)s - %(levelname)s - %(message)s", level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -25,80 +28,145 @@ PAYMENTS_TOKEN = config["API TOKEN"]["PAYMENTS_TOKEN"]
 KAFKA_SERVER = config["KAFKA SETTINGS"]["KAFKA_SERVER"]
 TOPIC_NAME = config["KAFKA SETTINGS"]["TOPIC_NAME"]
 PAYMENT_SERVER_URL = config["API TOKEN"]["PAYMENT_SERVER_URL"]
+BOOKING_TTL_SECONDS = config.getint("BOOKING CACHE", "TTL_SECONDS", fallback=900)
+BOOKING_MAX_ENTRIES = config.getint("BOOKING CACHE", "MAX_ENTRIES", fallback=10000)
+WAIT_TIMEOUT_SECONDS = config.getfloat("BOOKING CACHE", "WAIT_TIMEOUT_SECONDS", fallback=15)
+METRICS_INTERVAL_SECONDS = config.getint("BOOKING CACHE", "METRICS_INTERVAL_SECONDS", fallback=60)
+BATCH_SIZE = config.getint("KAFKA CONSUMER", "BATCH_SIZE", fallback=500)
+BATCH_TIMEOUT_MS = config.getint("KAFKA CONSUMER", "BATCH_TIMEOUT_MS", fallback=200)
+RETRY_DRAIN_INTERVAL_SECONDS = config.getint("PAYMENT SERVER", "RETRY_DRAIN_INTERVAL_SECONDS", fallback=30)
 
 
 bot = Bot(token=BOT_TOKEN, default=DefaultBotProperties(parse_mode="HTML"))
 dp = Dispatcher()
 
-user_booking_cache = {}
+payment_client = PaymentServerClient(
+    PAYMENT_SERVER_URL,
+    RetryQueue(config.get("PAYMENT SERVER", "RETRY_QUEUE_PATH", fallback="payment_retry_queue.sqlite3")),
+    connection_limit=config.getint("PAYMENT SERVER", "CONNECTION_LIMIT", fallback=20),
+    timeout_seconds=config.getfloat("PAYMENT SERVER", "TIMEOUT_SECONDS", fallback=5),
+    max_retries=config.getint("PAYMENT SERVER", "MAX_RETRIES", fallback=3),
+    backoff_seconds=config.getfloat("PAYMENT SERVER", "BACKOFF_SECONDS", fallback=0.5)
+)
+booking_store = BookingStore(ttl_seconds=BOOKING_TTL_SECONDS, max_entries=BOOKING_MAX_ENTRIES)
+listener_stats = {
+    "consumed": 0,
+    "skipped": 0,
+    "invalid": 0,
+    "stale": 0,
+    "reconnects": 0,
+    "batches": 0,
+    "last_batch_ms": 0.0,
+    "max_batch_ms": 0.0,
+    "lag": {}
+}
+
+async def assign_all(consumer: AIOKafkaConsumer) -> list[TopicPartition]:
+    await consumer.topics()
+    partitions = [TopicPartition(TOPIC_NAME, p) for p in sorted(consumer.partitions_for_topic(TOPIC_NAME) or [])]
+    if not partitions:
+        raise RuntimeError(f"Топик {TOPIC_NAME} не найден")
+    consumer.assign(partitions)
+    since = int((time.time() - booking_store.ttl) * 1000)
+    offsets = await consumer.offsets_for_times({tp: since for tp in partitions})
+    latest = []
+    for tp in partitions:
+        found = offsets.get(tp)
+        if found is None:
+            latest.append(tp)
+        else:
+            consumer.seek(tp, found.offset)
+    if latest:
+        await consumer.seek_to_end(*latest)
+    return partitions
+
+def decode_batch(records) -> list[tuple[int, float, dict]]:
+    decoded = []
+    for record, message in zip(records, event_codec.decode_batch(record.value for record in records)):
+        if message is None:
+            listener_stats["invalid"] += 1
+            logger.error(f"Ошибка декодирования: {record.value}")
+            continue
+        decoded.append((record.offset, record.timestamp / 1000, message))
+    return decoded
+
+def apply_booking_event(offset: int, message: dict, created: float | None = None) -> None:
+    if message.get('processed'):
+        listener_stats["skipped"] += 1
+        return
+
+    user_id = message.get("user_id")
+    current = booking_store.peek(user_id)
+    if current is not None and (current['data'].get("booking_id") or 0) >= (message.get("booking_id") or 0):
+        listener_stats["stale"] += 1
+        return
+
+    booking_store.put(user_id, {
+        'data': message,
+        'offset': offset
+    }, created, message.get("booking_id"))
+    listener_stats["consumed"] += 1
+    logger.info(f"Получено и сохранено сообщение из Kafka: user_id={user_id}, message={message}")
+
+def process_batches(consumer: AIOKafkaConsumer, batches: dict) -> None:
+    started = time.perf_counter()
+    for tp, records in batches.items():
+        for offset, created, message in decode_batch(records):
+            try:
+                apply_booking_event(offset, message, created)
+            except Exception as e:
+                logger.error(f"Ошибка обработки сообщения: {e}")
+        highwater = consumer.highwater(tp)
+        if highwater is not None:
+            listener_stats["lag"][f"{tp.topic}-{tp.partition}"] = highwater - records[-1].offset - 1
+    batch_ms = round((time.perf_counter() - started) * 1000, 2)
+    listener_stats["batches"] += 1
+    listener_stats["last_batch_ms"] = batch_ms
+    listener_stats["max_batch_ms"] = max(listener_stats["max_batch_ms"], batch_ms)
 
-async def start_consumer() -> AIOKafkaConsumer:
-    for _ in range(5):
+async def kafka_listener():
+    backoff = 1
+    while True:
+        consumer = AIOKafkaConsumer(
+            bootstrap_servers=KAFKA_SERVER,
+            group_id=None,
+            retry_backoff_ms=200,
+            request_timeout_ms=10000,
+            enable_auto_commit=False
+        )
         try:
-            consumer = AIOKafkaConsumer(
-                TOPIC_NAME,
-                bootstrap_servers=KAFKA_SERVER,
-                group_id="payment-bot-group",
-                session_timeout_ms=40000,
-                heartbeat_interval_ms=10000,
-                retry_backoff_ms=200,
-                request_timeout_ms=10000,
-                auto_offset_reset="earliest",
-                enable_auto_commit=False
-            )
             await consumer.start()
-            logger.info("Kafka consumer запущен")
-            return consumer
+            partitions = await assign_all(consumer)
+            backoff = 1
+            logger.info(f"Kafka consumer запущен, партиции {[tp.partition for tp in partitions]}")
+            while True:
+                batches = await consumer.getmany(timeout_ms=BATCH_TIMEOUT_MS, max_records=BATCH_SIZE)
+                if batches:
+                    process_batches(consumer, batches)
+        except asyncio.CancelledError:
+            raise
         except Exception as e:
-            logger.error(f"Ошибка подключения к Kafka: {e}")
-            await asyncio.sleep(2)
-    raise Exception("Не удалось подключиться к Kafka после 5 попыток")
-
-async def kafka_listener():
-    consumer = await start_consumer()
-    try:
-        async for msg in consumer:
-            try:
-                message = json.loads(msg.value.decode('utf-8'))
-                if message.get('processed'):
-                    await consumer.commit()
-                    continue
-
-                user_id = message.get("user_id")
-                user_booking_cache[user_id] = {
-                    'data': message,
-                    'offset': msg.offset
-                }
-                logger.info(f"Получено и сохранено сообщение из Kafka: user_id={user_id}, message={message}")
-                await consumer.commit()
-            except json.JSONDecodeError:
-                logger.error(f"Ошибка декодирования: {msg.value}")
-                await consumer.commit()
-            except Exception as e:
-                logger.error(f"Ошибка обработки сообщения: {e}")
-                await consumer.commit()
-    except Exception as e:
-        logger.error(f"Ошибка в kafka_listener: {e}")
-    finally:
-        await consumer.stop()
-        logger.info("Kafka consumer остановлен")
+            listener_stats["reconnects"] += 1
+            logger.error(f"Ошибка в kafka_listener, переподключение через {backoff} с: {e}")
+        finally:
+            await consumer.stop()
+            logger.info("Kafka consumer остановлен")
+        await asyncio.sleep(backoff)
+        backoff = min(backoff * 2, 30)
 
 async def consume_from_kafka(user_id: int = None) -> dict:
-    timeout = 15
-    start_time = asyncio.get_event_loop().time()
-
-    while asyncio.get_event_loop().time() - start_time < timeout:
-        if user_id in user_booking_cache:
-            return user_booking_cache[user_id]
-        
-        if user_booking_cache:
-            last_user_id = max(user_booking_cache.keys()) 
-            logger.info(f"Данные для user_id={user_id} не найдены, возвращаем последнее сообщение для user_id={last_user_id}")
-            return user_booking_cache[last_user_id]
-        await asyncio.sleep(0.1)
-    
-    logger.warning(f"Таймаут ожидания данных Kafka для user_id={user_id}")
-    return None
+    kafka_data = await booking_store.wait_for(user_id, timeout=WAIT_TIMEOUT_SECONDS)
+    if kafka_data is None:
+        logger.warning(f"Таймаут ожидания данных Kafka для user_id={user_id}")
+    return kafka_data
+
+async def metrics_reporter():
+    while True:
+        await asyncio.sleep(METRICS_INTERVAL_SECONDS)
+        logger.info(
+            f"Метрики бота: listener={listener_stats}, booking_store={booking_store.stats()}, "
+            f"payment_client={payment_client.stats()}"
+        )
 
 @dp.message(Command("start"))
 async def handle_buy(message: types.Message):
@@ -208,37 +276,36 @@ async def successful_payment(message: types.Message):
         booking_id = payload["booking_id"]
         user_id = payload["user_id"]
 
-        async with aiohttp.ClientSession() as session:
-            response = await session.post(
-                f"{PAYMENT_SERVER_URL}/save_payment",
-                json={
-                    "booking_id": booking_id,
-                    "amount": payment.total_amount / 100,
-                    "telegram_transaction_id": payment.telegram_payment_charge_id,
-                    "user_id": user_id
-                }
-            )
-            if response.status != 200:
-                logger.error(f"Ошибка сохранения платежа: {await response.text()}")
-                await message.answer("❌ Ошибка при сохранении платежа")
-                return
+        saved = await payment_client.save_payment({
+            "booking_id": booking_id,
+            "amount": payment.total_amount / 100,
+            "telegram_transaction_id": payment.telegram_payment_charge_id,
+            "user_id": user_id
+        })
+        if booking_store.pop(user_id, booking_id) is not None:
+            logger.info(f"Кэш очищен для user_id={user_id}")
+
+        if not saved:
+            await message.answer("✅ Платеж прошел, подтверждение бронирования придёт чуть позже.")
+            return
 
         await message.answer(
             f"✅ Платеж на сумму {payment.total_amount // 100} RUB прошел успешно!\n"
             f"Бронирование #{booking_id} подтверждено."
         )
 
-        if user_id in user_booking_cache:
-            del user_booking_cache[user_id]
-            logger.info(f"Кэш очищен для user_id={user_id}")
-
     except Exception as e:
         logger.error(f"Ошибка успешного платежа: {e}")
         await message.answer("✅ Платеж прошел, но возникла ошибка при обработке.")
 
 async def main():
     asyncio.create_task(kafka_listener())
-    await dp.start_polling(bot)
+    asyncio.create_task(metrics_reporter())
+    await payment_client.start(drain_interval=RETRY_DRAIN_INTERVAL_SECONDS)
+    try:
+        await dp.start_polling(bot)
+    finally:
+        await payment_client.close()
 
 if __name__ == "__main__":
     asyncio.run(main())
\ No newline at end of file
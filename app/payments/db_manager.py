@@ -11,8 +11,18 @@ class PayRepository:
     def __init__(self, db_connection: DB_connection) -> None:
         self.db_connection = db_connection
 
+    async def is_recorded(self, session, telegram_transaction_id: str) -> bool:
+        existing = await session.execute(
+            select(Payment.PaymentID).where(Payment.TransactionID == telegram_transaction_id)
+        )
+        return existing.scalar_one_or_none() is not None
+
     async def add_telegram_payment(self, booking_id: int, amount: float, telegram_transaction_id: str, user_id: int) -> str:
         async for session in self.db_connection.get_session():
+            if await self.is_recorded(session, telegram_transaction_id):
+                logger.info(f"Telegram-платеж {telegram_transaction_id} уже сохранен, повторная доставка пропущена")
+                return telegram_transaction_id
+
             transaction_id = str(uuid.uuid4())
             payment = Payment(
                 BookingID=booking_id,
@@ -32,6 +42,9 @@ class PayRepository:
                 return transaction_id
             except IntegrityError as e:
                 await session.rollback()
+                if await self.is_recorded(session, telegram_transaction_id):
+                    logger.info(f"Telegram-платеж {telegram_transaction_id} сохранен параллельным запросом, повторная доставка пропущена")
+                    return telegram_transaction_id
                 logger.error(f"IntegrityError при сохранении Telegram-платежа: {str(e)}")
                 raise ValueError(f"Ошибка при сохранении данных об оплате: {str(e)}")
             except SQLAlchemyError as e:
@@ -0,0 +1,68 @@
+import json
+import math
+import struct
+
+
+MAGIC = 0xB0
+VERSION = 1
+FLAG_PROCESSED = 0x01
+
+HEADER = struct.Struct("<BB")
+BOOKING_EVENT_V1 = struct.Struct("<BBBqqd")
+
+
+def encode(event: dict) -> bytes:
+    amount = event.get("amount")
+    flags = FLAG_PROCESSED if event.get("processed") else 0
+    return BOOKING_EVENT_V1.pack(
+        MAGIC,
+        VERSION,
+        flags,
+        int(event["user_id"]),
+        int(event["booking_id"]),
+        float(amount) if amount is not None else math.nan
+    )
+
+
+def encode_json(event: dict) -> bytes:
+    return json.dumps(event).encode("utf-8")
+
+
+def decode(value: bytes) -> dict:
+    if value and value[0] == MAGIC:
+        if len(value) < HEADER.size:
+            raise ValueError(f"Усечённое событие: {len(value)} байт")
+        magic, version = HEADER.unpack_from(value)
+        if version != VERSION:
+            raise ValueError(f"Неизвестная версия схемы события: {version}")
+        if len(value) != BOOKING_EVENT_V1.size:
+            raise ValueError(f"Неверная длина события: {len(value)} байт вместо {BOOKING_EVENT_V1.size}")
+        _, _, flags, user_id, booking_id, amount = BOOKING_EVENT_V1.unpack(value)
+        event = {
+            "user_id": user_id,
+            "booking_id": booking_id,
+            "amount": None if math.isnan(amount) else amount
+        }
+        if flags & FLAG_PROCESSED:
+            event["processed"] = True
+        return event
+    return json.loads(value.decode("utf-8"))
+
+
+def decode_batch(values) -> list[dict | None]:
+    unpack = BOOKING_EVENT_V1.unpack
+    isnan = math.isnan
+    events = []
+    for value in values:
+        try:
+            if value and value[0] == MAGIC and len(value) == BOOKING_EVENT_V1.size and value[1] == VERSION:
+                _, _, flags, user_id, booking_id, amount = unpack(value)
+                event = {"user_id": user_id, "booking_id": booking_id, "amount": None if isnan(amount) else amount}
+                if flags & FLAG_PROCESSED:
+                    event["processed"] = True
+                events.append(event)
+            else:
+                events.append(decode(value))
+        except (ValueError, UnicodeDecodeError, struct.error):
+            events.append(None)
+    return events
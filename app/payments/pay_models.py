@@ -1,5 +1,5 @@
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
-from sqlalchemy import Integer, Numeric, String, DateTime, func
+from sqlalchemy import Index, Integer, Numeric, String, DateTime, func
 
 
 class Model(DeclarativeBase):
@@ -7,6 +7,10 @@ class Model(DeclarativeBase):
 
 class Payment(Model):
     __tablename__ = "Payments"
+    __table_args__ = (
+        Index("UX_Payments_TransactionID", "TransactionID", unique=True),
+    )
+
     PaymentID: Mapped[int] = mapped_column(Integer, primary_key=True)
     UserID: Mapped[int] = mapped_column(Integer, nullable=False)
     BookingID: Mapped[int] = mapped_column(Integer, nullable=False)
@@ -1,19 +1,17 @@
 import configparser
-import asyncio
-import json
 
 from fastapi import FastAPI, APIRouter, HTTPException, Depends, Request
 from fastapi.templating import Jinja2Templates
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import HTMLResponse, RedirectResponse
 from fastapi.background import BackgroundTasks
-from aiokafka import AIOKafkaConsumer
 from starlette.templating import _TemplateResponse
 from pydantic import BaseModel
 
 from logging_manager import logger
-from db_conn import DB_connection
+from db_conn import UnitOfWork, db_registry, unit_of_work
 from payments.db_manager import PayRepository
+from payments.booking_consumer import booking_store, wait_timeout
 
 
 router = APIRouter()
@@ -23,85 +21,20 @@ templates = Jinja2Templates(directory="templates")
 config = configparser.ConfigParser()
 config.read('config.ini')
 server = config['BD INFO']['PAY_DB']
-kafka_server = config['KAFKA SETTINGS']['KAFKA_SERVER']
-topic_name = config['KAFKA SETTINGS']['TOPIC_NAME']
 telegram_bot_username = config['API TOKEN']['BOT_USERNAME'] 
 
-user_booking_cache = {}
+pay_db = db_registry.get(server)
+pay_unit_of_work = unit_of_work(pay_db)
 
-pay_db = DB_connection(server)
-
-def get_pay_repository() -> PayRepository:
-    return PayRepository(pay_db)
-
-async def start_consumer() -> AIOKafkaConsumer:
-    for _ in range(5):  
-        try:
-            consumer = AIOKafkaConsumer(
-                topic_name,
-                bootstrap_servers=kafka_server,
-                group_id="my-group",
-                session_timeout_ms=40000, 
-                heartbeat_interval_ms=10000,
-                retry_backoff_ms=200,  
-                request_timeout_ms=10000,  
-                auto_offset_reset="earliest",
-                enable_auto_commit=False
-            )
-            await consumer.start()
-            logger.info("Консьюмер начал работу.")
-            return consumer
-        except Exception as e:
-            logger.info(f"Повторная попытка подключения из-за ошибки: {e}")
-            await asyncio.sleep(2)
-    raise Exception("Не удалось подключиться к Kafka после нескольких попыток.")
-
-async def consume_from_kafka(user_id: int) -> None:
-    global user_booking_cache
-    
-    consumer = await start_consumer()
-    try:
-        timeout = 15 
-        start_time = asyncio.get_event_loop().time()
-
-        async for msg in consumer:
-            try:
-                message = json.loads(msg.value.decode('utf-8'))
-                msg_user_id = message.get("user_id")
-                booking_id = message.get("booking_id")
-                amount = message.get("amount")
-                logger.info(f"Получено сообщение из Kafka: user_id={msg_user_id}, booking_id={booking_id}, amount={amount}")
-
-                user_booking_cache[msg_user_id] = {
-                    "booking_id": booking_id,
-                    "amount": amount
-                }
-                logger.info(f"Сохранено в кэш: {user_booking_cache}")
-
-                await consumer.commit()
-
-                if msg_user_id == user_id:
-                    break
-            except json.JSONDecodeError:
-                logger.error(f"Ошибка при декодировании сообщения: {msg.value}")
-                await consumer.commit()
-
-            if asyncio.get_event_loop().time() - start_time > timeout:
-                logger.info("Тайм-аут ожидания сообщений из Kafka.")
-                break
-    finally: 
-        await consumer.stop()
+def get_pay_repository(unit: UnitOfWork = Depends(pay_unit_of_work)) -> PayRepository:
+    return PayRepository(unit)
 
 @router.get("/pay/{user_id}", response_class=HTMLResponse)
 async def get_pay(request: Request, user_id: int):
-    if user_id not in user_booking_cache:
-        logger.info(f"Ожидание сообщения Kafka для user_id={user_id}")
-        await consume_from_kafka(user_id)
-    
-    if user_id not in user_booking_cache:
+    data = await booking_store.wait_for(user_id, timeout=wait_timeout)
+    if data is None:
         raise HTTPException(status_code=400, detail="Данные бронирования не найдены")
 
-    data = user_booking_cache[user_id]
     amount = data['amount']
     booking_id = data.get('booking_id')  
 
@@ -130,13 +63,13 @@ async def process_payment(
             logger.error(f"Неверный формат user_id: {user_id}")
             raise HTTPException(status_code=400, detail="Неверный формат идентификатора пользователя")
 
-        logger.info(f"POST /pay: user_id={user_id}, cache={user_booking_cache}")
+        logger.info(f"POST /pay: user_id={user_id}")
 
-        if not user_booking_cache or user_id not in user_booking_cache:
+        cache_data = booking_store.get(user_id) if user_id else None
+        if cache_data is None:
             logger.error(f"Данные бронирования не найдены для user_id={user_id}")
             raise HTTPException(status_code=400, detail="Данные бронирования не найдены")
-        
-        cache_data = user_booking_cache[user_id]
+
         booking_id = cache_data.get("booking_id")
         amount = cache_data.get("amount")
         
@@ -174,7 +107,7 @@ async def save_payment(
         transaction_id = await pay_repo.add_telegram_payment(booking_id, amount, telegram_transaction_id, user_id)
         logger.info(f"Платеж сохранен: booking_id={booking_id}, transaction_id={transaction_id}")
 
-        user_booking_cache.pop(user_id, None)
+        booking_store.pop(user_id, int(booking_id))
         logger.info(f"Кэш очищен для user_id={user_id}")
 
         return RedirectResponse(url=f"/waiting/{user_id}", status_code=303)
@@ -188,11 +121,11 @@ async def save_payment(
 @router.post("/cancel_booking/{user_id}")
 async def cancel_booking(user_id: int, pay_repo: PayRepository = Depends(get_pay_repository)):
     try:
-        if user_id not in user_booking_cache:
+        booking = booking_store.pop(user_id)
+        if booking is None:
             raise HTTPException(status_code=400, detail="Бронирование не найдено")
-        
-        booking_id = user_booking_cache[user_id].get("booking_id")
-        user_booking_cache.pop(user_id, None)
+
+        booking_id = booking.get("booking_id")
         logger.info(f"Бронирование {booking_id} для user_id={user_id} отменено")
         return {"message": "Бронирование успешно отменено"}
     except HTTPException:
@@ -0,0 +1,203 @@
+import asyncio
+import json
+import logging
+import sqlite3
+import time
+
+import aiohttp
+
+
+logger = logging.getLogger(__name__)
+
+
+class RetryQueue:
+    def __init__(self, path: str):
+        self.path = path
+        self._conn = sqlite3.connect(path)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS pending_payments ("
+            "charge_id TEXT PRIMARY KEY, payload TEXT NOT NULL, attempts INTEGER NOT NULL DEFAULT 0, "
+            "next_attempt REAL NOT NULL, last_error TEXT)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS rejected_payments ("
+            "charge_id TEXT PRIMARY KEY, payload TEXT NOT NULL, error TEXT NOT NULL, rejected_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def push(self, charge_id: str, payload: dict, error: str, delay: float) -> None:
+        self._conn.execute(
+            "INSERT INTO pending_payments (charge_id, payload, attempts, next_attempt, last_error) "
+            "VALUES (?, ?, 1, ?, ?) "
+            "ON CONFLICT(charge_id) DO UPDATE SET attempts = attempts + 1, "
+            "next_attempt = excluded.next_attempt, last_error = excluded.last_error",
+            (charge_id, json.dumps(payload), time.time() + delay, error)
+        )
+        self._conn.commit()
+
+    def due(self, limit: int) -> list[tuple[str, dict, int]]:
+        rows = self._conn.execute(
+            "SELECT charge_id, payload, attempts FROM pending_payments WHERE next_attempt <= ? "
+            "ORDER BY next_attempt LIMIT ?",
+            (time.time(), limit)
+        ).fetchall()
+        return [(charge_id, json.loads(payload), attempts) for charge_id, payload, attempts in rows]
+
+    def remove(self, charge_id: str) -> None:
+        self._conn.execute("DELETE FROM pending_payments WHERE charge_id = ?", (charge_id,))
+        self._conn.commit()
+
+    def reject(self, charge_id: str, payload: dict, error: str) -> None:
+        self._conn.execute(
+            "INSERT OR REPLACE INTO rejected_payments (charge_id, payload, error, rejected_at) VALUES (?, ?, ?, ?)",
+            (charge_id, json.dumps(payload), error, time.time())
+        )
+        self._conn.execute("DELETE FROM pending_payments WHERE charge_id = ?", (charge_id,))
+        self._conn.commit()
+
+    def size(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM pending_payments").fetchone()[0]
+
+    def rejected(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM rejected_payments").fetchone()[0]
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+class PaymentServerClient:
+    def __init__(
+        self,
+        base_url: str,
+        retry_queue: RetryQueue,
+        connection_limit: int = 20,
+        timeout_seconds: float = 5,
+        max_retries: int = 3,
+        backoff_seconds: float = 0.5,
+        max_backoff_seconds: float = 300
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.retry_queue = retry_queue
+        self.connection_limit = connection_limit
+        self.timeout = aiohttp.ClientTimeout(total=timeout_seconds)
+        self.max_retries = max_retries
+        self.backoff = backoff_seconds
+        self.max_backoff = max_backoff_seconds
+        self._session: aiohttp.ClientSession | None = None
+        self._drain_task: asyncio.Task | None = None
+        self.delivered = 0
+        self.retried = 0
+        self.queued = 0
+        self.rejected = 0
+
+    @staticmethod
+    def is_permanent(error: aiohttp.ClientResponseError) -> bool:
+        return error.status < 500 and error.status != 429
+
+    def _reject(self, charge_id: str, payload: dict, error: str) -> None:
+        self.retry_queue.reject(charge_id, payload, error)
+        self.rejected += 1
+        logger.error(f"Платёж {charge_id} отклонён сервером платежей без повторов: {error}")
+
+    async def start(self, drain_interval: float = 30) -> None:
+        if self._session is None:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.connection_limit, keepalive_timeout=60),
+                timeout=self.timeout
+            )
+        if self._drain_task is None:
+            self._drain_task = asyncio.create_task(self._drain_loop(drain_interval))
+
+    async def close(self) -> None:
+        if self._drain_task is not None:
+            self._drain_task.cancel()
+            try:
+                await self._drain_task
+            except asyncio.CancelledError:
+                pass
+            self._drain_task = None
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+        self.retry_queue.close()
+
+    async def _post(self, path: str, payload: dict, idempotency_key: str) -> None:
+        async with self._session.post(
+            f"{self.base_url}{path}",
+            json=payload,
+            headers={"Idempotency-Key": idempotency_key},
+            allow_redirects=False
+        ) as response:
+            if response.status >= 400:
+                raise aiohttp.ClientResponseError(
+                    response.request_info, response.history,
+                    status=response.status, message=await response.text()
+                )
+
+    async def save_payment(self, payload: dict) -> bool:
+        charge_id = payload["telegram_transaction_id"]
+        error = None
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                self.retried += 1
+                await asyncio.sleep(self.backoff * 2 ** (attempt - 1))
+            try:
+                await self._post("/save_payment", payload, charge_id)
+                self.delivered += 1
+                return True
+            except aiohttp.ClientResponseError as e:
+                error = f"HTTP {e.status}: {e.message}"
+                if self.is_permanent(e):
+                    self._reject(charge_id, payload, error)
+                    return False
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                error = repr(e)
+            logger.warning(f"Не удалось сохранить платёж {charge_id} (попытка {attempt + 1}): {error}")
+
+        self.retry_queue.push(charge_id, payload, error, self.backoff * 2 ** self.max_retries)
+        self.queued += 1
+        logger.error(f"Платёж {charge_id} отложен в очередь повторной отправки: {error}")
+        return False
+
+    async def drain(self, limit: int = 100) -> int:
+        delivered = 0
+        for charge_id, payload, attempts in self.retry_queue.due(limit):
+            try:
+                await self._post("/save_payment", payload, charge_id)
+            except aiohttp.ClientResponseError as e:
+                error = f"HTTP {e.status}: {e.message}"
+                if self.is_permanent(e):
+                    self._reject(charge_id, payload, error)
+                    continue
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                error = repr(e)
+            else:
+                self.retry_queue.remove(charge_id)
+                self.delivered += 1
+                delivered += 1
+                continue
+            delay = min(self.backoff * 2 ** (self.max_retries + attempts), self.max_backoff)
+            self.retry_queue.push(charge_id, payload, error, delay)
+        if delivered:
+            logger.info(f"Доставлено {delivered} отложенных платежей")
+        return delivered
+
+    async def _drain_loop(self, interval: float) -> None:
+        while True:
+            try:
+                await self.drain()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Ошибка при отправке отложенных платежей: {e}")
+            await asyncio.sleep(interval)
+
+    def stats(self) -> dict:
+        return {
+            "delivered": self.delivered,
+            "retried": self.retried,
+            "queued": self.queued,
+            "rejected": self.rejected,
+            "pending": self.retry_queue.size(),
+            "dead_letters": self.retry_queue.rejected()
+        }
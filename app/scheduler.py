@@ -1,11 +1,15 @@
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 import configparser
+import time
 from datetime import datetime, timedelta
 
-from sqlalchemy import select
-from db_conn import DB_connection
+from sqlalchemy import delete, select, update
+from db_conn import db_registry
 from users.user_models import Booking, ParkingSpot
+from users.db_manager import UserRepository
+from users.booking_rollup import remove_from_rollup
 from payments.pay_models import Payment
+import events
 import logging
 
 logging.basicConfig(level=logging.INFO)
@@ -15,101 +19,144 @@ config = configparser.ConfigParser()
 config.read('config.ini')
 user_server = config['BD INFO']['USER_DB']
 pay_server = config['BD INFO']['PAY_DB']
+spot_index_refresh = config.getint('CACHE', 'SPOT_INDEX_REFRESH_MINUTES', fallback=10)
+notification_refresh = config.getint('CACHE', 'NOTIFICATION_REFRESH_MINUTES', fallback=5)
+sweep_chunk_size = config.getint('SCHEDULER', 'SWEEP_CHUNK_SIZE', fallback=500)
+hold_minutes = config.getint('SCHEDULER', 'HOLD_MINUTES', fallback=60)
+reconcile_minutes = config.getint('SCHEDULER', 'RECONCILE_MINUTES', fallback=30)
 
-user_db_connection = DB_connection(db_name=user_server) 
-pay_db_connection = DB_connection(db_name=pay_server)
+HOLD_EXPIRED = "hold"
+END_EXPIRED = "end"
+
+user_db_connection = db_registry.get(user_server)
+pay_db_connection = db_registry.get(pay_server)
 
 scheduler = AsyncIOScheduler()
+sweep_stats: dict[str, dict] = {}
+
+async def release_bookings(user_session, rows, unpaid: bool = False) -> list:
+    booking_ids = [row.BookingID for row in rows]
+    if unpaid:
+        await remove_from_rollup(user_session, booking_ids)
+    result = await user_session.execute(
+        delete(Booking)
+        .where(Booking.BookingID.in_(booking_ids))
+        .returning(Booking.BookingID, Booking.SpotID)
+        .execution_options(synchronize_session=False)
+    )
+    released = result.all()
+    spot_ids = list({row.SpotID for row in released if row.SpotID is not None})
+    if spot_ids:
+        await user_session.execute(
+            update(ParkingSpot)
+            .where(ParkingSpot.SpotID.in_(spot_ids))
+            .values(IsAvailable=1)
+            .execution_options(synchronize_session=False)
+        )
+    return released
+
+def publish_released(released, reason: str) -> None:
+    for row in released:
+        events.publish(events.BOOKING_EXPIRED, booking_id=row.BookingID, reason=reason)
+    for spot_id in {row.SpotID for row in released if row.SpotID is not None}:
+        events.publish(events.SPOT_STATUS_CHANGED, spot_id=spot_id, is_available=True)
 
 async def check_expired_bookings():
     logger.info("Starting check for expired bookings")
-    print("Starting check for expired bookings")
-    
+    started = time.perf_counter()
+    stats = {"scanned": 0, "paid": 0, "released": 0, "chunks": 0}
+    cutoff = datetime.now() - timedelta(minutes=hold_minutes)
+    last_booking_id = 0
+
     async with user_db_connection.session_maker() as user_session:
         async with pay_db_connection.session_maker() as pay_session:
             try:
-                stmt = select(Booking)
-                result = await user_session.execute(stmt)
-                all_bookings = result.scalars().all()
-                
-                current_time = datetime.now()
-                expiration_time = timedelta(minutes=60)
-                
-                for booking in all_bookings:
-                    expiry_time = booking.Created + expiration_time
-                    if current_time > expiry_time:
-                        pay_stmt = select(Payment).where(Payment.BookingID == booking.BookingID)
-                        pay_result = await pay_session.execute(pay_stmt)
-                        payment = pay_result.scalars().first()
-                        
-                        if not payment:
-                            logger.info(f"Deleting expired booking: {booking.BookingID}")
-                            await user_session.delete(booking)
-                            
-                            spot_stmt = select(ParkingSpot).where(ParkingSpot.SpotID == booking.SpotID)
-                            spot_result = await user_session.execute(spot_stmt)
-                            spot = spot_result.scalars().first()
-                            if spot:
-                                spot.IsAvailable = 1
-                                logger.info(f"Parking spot {spot.SpotID} is now available")
-                            else:
-                                logger.warning(f"No parking spot found for booking {booking.BookingID}")
-                
-                await user_session.commit()
-                logger.info("Expired bookings check completed")
-                print("Expired bookings check completed")
-            
+                while True:
+                    stmt = (
+                        select(Booking.BookingID, Booking.SpotID)
+                        .where(Booking.Created < cutoff, Booking.BookingID > last_booking_id)
+                        .order_by(Booking.BookingID)
+                        .limit(sweep_chunk_size)
+                    )
+                    rows = (await user_session.execute(stmt)).all()
+                    if not rows:
+                        break
+                    last_booking_id = rows[-1].BookingID
+                    stats["chunks"] += 1
+                    stats["scanned"] += len(rows)
+
+                    pay_stmt = select(Payment.BookingID).where(Payment.BookingID.in_([row.BookingID for row in rows]))
+                    paid_ids = set((await pay_session.execute(pay_stmt)).scalars().all())
+                    stats["paid"] += len(paid_ids)
+
+                    unpaid = [row for row in rows if row.BookingID not in paid_ids]
+                    if not unpaid:
+                        continue
+
+                    released = await release_bookings(user_session, unpaid, unpaid=True)
+                    await user_session.commit()
+                    stats["released"] += len(released)
+                    publish_released(released, HOLD_EXPIRED)
+                    logger.info(f"Deleted {len(released)} expired unpaid bookings: {[row.BookingID for row in released]}")
+
             except Exception as e:
                 logger.error(f"Error during check_expired_bookings: {str(e)}")
-                print(f"Error during check_expired_bookings: {str(e)}")
                 await user_session.rollback()
 
+    stats["duration_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    sweep_stats["check_expired_bookings"] = stats
+    logger.info(f"Expired bookings check completed: {stats}")
+
 async def delete_expired_bookings_by_end_datetime():
     logger.info("Starting check for bookings with expired end_datetime")
-    print("Starting check for bookings with expired end_datetime")
-    
+    started = time.perf_counter()
+    stats = {"released": 0, "chunks": 0}
+    current_time = datetime.now()
+
     async with user_db_connection.session_maker() as user_session:
         try:
-            stmt = select(Booking)
-            result = await user_session.execute(stmt)
-            all_bookings = result.scalars().all()
-            
-            current_time = datetime.now()
-            
-            for booking in all_bookings:
-                try:
-                    end_datetime = datetime.strptime(booking.EndTime, "%Y-%m-%d %H:%M:%S")
-                except ValueError:
-                    try:
-                        end_datetime = datetime.fromisoformat(booking.EndTime)
-                    except ValueError as ve:
-                        logger.error(f"Invalid end_datetime format for booking {booking.BookingID}: {booking.EndTime}")
-                        continue
-                
-                if end_datetime < current_time:
-                    logger.info(f"Deleting booking with expired end_datetime: {booking.BookingID}")
-                    await user_session.delete(booking)
-                    
-                    spot_stmt = select(ParkingSpot).where(ParkingSpot.SpotID == booking.SpotID)
-                    spot_result = await user_session.execute(spot_stmt)
-                    spot = spot_result.scalars().first()
-                    if spot:
-                        spot.IsAvailable = 1
-                        logger.info(f"Parking spot {spot.SpotID} is now available")
-                    else:
-                        logger.warning(f"No parking spot found for booking {booking.BookingID}")
-            
-            await user_session.commit()
-            logger.info("Expired end_datetime bookings check completed")
-            print("Expired end_datetime bookings check completed")
-        
+            while True:
+                stmt = (
+                    select(Booking.BookingID, Booking.SpotID)
+                    .where(Booking.EndTime < current_time)
+                    .order_by(Booking.EndTime)
+                    .limit(sweep_chunk_size)
+                )
+                rows = (await user_session.execute(stmt)).all()
+                if not rows:
+                    break
+                stats["chunks"] += 1
+
+                released = await release_bookings(user_session, rows)
+                await user_session.commit()
+                stats["released"] += len(released)
+                publish_released(released, END_EXPIRED)
+                logger.info(f"Deleted {len(released)} bookings with expired end_datetime: {[row.BookingID for row in released]}")
+
         except Exception as e:
             logger.error(f"Error during delete_expired_bookings_by_end_datetime: {str(e)}")
-            print(f"Error during delete_expired_bookings_by_end_datetime: {str(e)}")
             await user_session.rollback()
 
+    stats["duration_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    sweep_stats["delete_expired_bookings_by_end_datetime"] = stats
+    logger.info(f"Expired end_datetime bookings check completed: {stats}")
+
+async def refresh_spot_index():
+    try:
+        await UserRepository(user_db_connection).load_spot_state()
+    except Exception as e:
+        logger.error(f"Error during refresh_spot_index: {str(e)}")
+
+async def refresh_notification_inbox():
+    try:
+        await UserRepository(user_db_connection).load_pending_notifications()
+    except Exception as e:
+        logger.error(f"Error during refresh_notification_inbox: {str(e)}")
+
 def setup_scheduler():
-    scheduler.add_job(check_expired_bookings, "interval", minutes=5)
-    scheduler.add_job(delete_expired_bookings_by_end_datetime, "interval", minutes=5)
+    scheduler.add_job(check_expired_bookings, "interval", minutes=reconcile_minutes, next_run_time=datetime.now())
+    scheduler.add_job(delete_expired_bookings_by_end_datetime, "interval", minutes=reconcile_minutes, next_run_time=datetime.now())
+    scheduler.add_job(refresh_spot_index, "interval", minutes=spot_index_refresh)
+    scheduler.add_job(refresh_notification_inbox, "interval", minutes=notification_refresh)
     scheduler.start()
     logger.info("Scheduler initialized")
\ No newline at end of file
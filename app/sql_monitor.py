@@ -0,0 +1,113 @@
+import configparser
+import heapq
+import itertools
+import os
+import sys
+import time
+from datetime import datetime
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from logging_manager import logger
+
+try:
+    import greenlet
+except ImportError:
+    greenlet = None
+
+
+config = configparser.ConfigParser()
+config.read('config.ini')
+slow_query_ms = config.getfloat('SQL LOGGING', 'SLOW_QUERY_MS', fallback=200.0)
+top_n = config.getint('SQL LOGGING', 'TOP_N', fallback=50)
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+SKIPPED_FILES = {os.path.abspath(__file__), os.path.join(APP_DIR, "db_conn.py")}
+
+
+def find_caller() -> str | None:
+    frame = sys._getframe(1)
+    current = greenlet.getcurrent() if greenlet else None
+    while True:
+        while frame is not None:
+            filename = frame.f_code.co_filename
+            if filename.startswith(APP_DIR) and filename not in SKIPPED_FILES:
+                owner = frame.f_locals.get("self")
+                if owner is not None:
+                    return f"{type(owner).__name__}.{frame.f_code.co_name}"
+                return f"{os.path.basename(filename)}:{frame.f_code.co_name}"
+            frame = frame.f_back
+        if current is None or current.parent is None:
+            return None
+        current = current.parent
+        frame = current.gr_frame
+
+
+class SlowQueryMonitor:
+    def __init__(self, threshold_ms: float = 200.0, top_n: int = 50):
+        self.threshold = threshold_ms / 1000
+        self.top_n = top_n
+        self.statements = 0
+        self.slow_statements = 0
+        self._slowest: list[tuple] = []
+        self._counter = itertools.count()
+
+    def attach(self, engine: AsyncEngine) -> None:
+        sync_engine = engine.sync_engine
+        event.listen(sync_engine, "before_cursor_execute", self._before_cursor_execute)
+        event.listen(sync_engine, "after_cursor_execute", self._after_cursor_execute)
+        event.listen(sync_engine, "handle_error", self._handle_error)
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["query_started"].pop()
+        elapsed = time.perf_counter() - started
+        self.statements += 1
+        if elapsed < self.threshold:
+            return
+
+        self.slow_statements += 1
+        record = {
+            "duration_ms": round(elapsed * 1000, 3),
+            "rowcount": cursor.rowcount,
+            "caller": find_caller(),
+            "statement": statement,
+            "executed_at": datetime.now().isoformat(timespec="seconds")
+        }
+        logger.warning(
+            f"Медленный SQL-запрос ({record['duration_ms']} мс, строк: {record['rowcount']}, "
+            f"вызов: {record['caller']}): {statement}"
+        )
+
+        entry = (elapsed, next(self._counter), record)
+        if len(self._slowest) < self.top_n:
+            heapq.heappush(self._slowest, entry)
+        elif elapsed > self._slowest[0][0]:
+            heapq.heapreplace(self._slowest, entry)
+
+    def _handle_error(self, exception_context):
+        connection = exception_context.connection
+        if connection is not None and connection.info.get("query_started"):
+            connection.info["query_started"].pop()
+
+    def slowest(self) -> list[dict]:
+        return [record for _, _, record in sorted(self._slowest, reverse=True)]
+
+    def stats(self) -> dict:
+        return {
+            "threshold_ms": self.threshold * 1000,
+            "statements": self.statements,
+            "slow_statements": self.slow_statements,
+            "slowest": self.slowest()
+        }
+
+    def reset(self) -> None:
+        self._slowest.clear()
+        self.statements = 0
+        self.slow_statements = 0
+
+
+sql_monitor = SlowQueryMonitor(threshold_ms=slow_query_ms, top_n=top_n)
@@ -252,35 +252,17 @@ document.addEventListener("DOMContentLoaded", () => {
         try {
             const urlParams = `start_date=${startDate}T00:00:00&end_date=${endDate}T23:59:59`;
 
-            const parkingsResponse = await fetch(`/admin/analytics/parkings?${urlParams}`, {
+            const summaryResponse = await fetch(`/admin/analytics/summary?${urlParams}`, {
                 headers: { "Authorization": `Bearer ${token}` }
             });
-            if (!parkingsResponse.ok) {
-                throw new Error(await parkingsResponse.text());
+            if (!summaryResponse.ok) {
+                throw new Error(await summaryResponse.text());
             }
-            const parkingsData = await parkingsResponse.json();
-            console.log("Получена аналитика парковок:", parkingsData);
-            renderParkingsChart(parkingsData);
-
-            const spotsResponse = await fetch(`/admin/analytics/spots?${urlParams}`, {
-                headers: { "Authorization": `Bearer ${token}` }
-            });
-            if (!spotsResponse.ok) {
-                throw new Error(await spotsResponse.text());
-            }
-            const spotsData = await spotsResponse.json();
-            console.log("Получена аналитика мест:", spotsData);
-            renderSpotsChart(spotsData);
-
-            const revenueResponse = await fetch(`/admin/analytics/revenue?${urlParams}`, {
-                headers: { "Authorization": `Bearer ${token}` }
-            });
-            if (!revenueResponse.ok) {
-                throw new Error(await revenueResponse.text());
-            }
-            const revenueData = await revenueResponse.json();
-            console.log("Получена аналитика доходов:", revenueData);
-            renderRevenueChart(revenueData);
+            const summary = await summaryResponse.json();
+            console.log("Получена сводная аналитика:", summary);
+            renderParkingsChart(summary.parkings);
+            renderSpotsChart(summary.spots);
+            renderRevenueChart(summary.revenue);
 
         } catch (error) {
             console.error("Ошибка при загрузке аналитики:", error);
@@ -5,6 +5,7 @@ let availableFloors = [];
 let allSpots = [];
 let parkingPrices = [];
 let selectedSpot = null;
+let spotEvents = null;
 
 function showSpotErrorNotification() {
     console.log('Вызов showSpotErrorNotification');
@@ -531,6 +532,7 @@ if (selectSpotBtn) {
             };
 
             showModal('spotModal');
+            openSpotStream(location, () => updateTable(hasFloors ? availableFloors[currentFloorIndex] : null));
         } catch (error) {
             console.error('Ошибка при загрузке парковочных мест:', error);
             alert(`Не удалось загрузить парковочные места: ${error.message}`);
@@ -538,9 +540,36 @@ if (selectSpotBtn) {
     });
 }
 
+function openSpotStream(location, onUpdate) {
+    closeSpotStream();
+    spotEvents = new EventSource(`/api/parking_spots/stream?location=${encodeURIComponent(location)}`);
+    spotEvents.addEventListener('spots', (event) => {
+        const delta = JSON.parse(event.data);
+        delta.forEach(([spotNumber, floor, isAvailable]) => {
+            const spot = allSpots.find(s => s.spot_number === spotNumber && s.floor == floor);
+            if (!spot) return;
+            spot.is_available = Boolean(isAvailable);
+            if (!spot.is_available && selectedSpot === spot) {
+                selectedSpot = null;
+                document.getElementById('confirmSpotBtn').disabled = true;
+            }
+        });
+        console.log('Обновление статусов мест:', delta);
+        onUpdate();
+    });
+}
+
+function closeSpotStream() {
+    if (spotEvents) {
+        spotEvents.close();
+        spotEvents = null;
+    }
+}
+
 function closeSpotModal() {
     console.log('closeSpotModal called');
     closeModal('spotModal');
+    closeSpotStream();
 
     const confirmSpotBtn = document.getElementById('confirmSpotBtn');
     if (confirmSpotBtn) confirmSpotBtn.disabled = true;
@@ -0,0 +1,53 @@
+import os
+import sys
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+os.chdir(APP_DIR)
+sys.path.insert(0, APP_DIR)
+
+import configparser
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import text
+from sqlalchemy.dialects.mssql import DATETIME2
+from sqlalchemy.ext.compiler import compiles
+
+from db_conn import DB_connection
+from sql_monitor import sql_monitor
+from users.user_models import Base
+
+
+config = configparser.ConfigParser()
+config.read('config.ini')
+
+
+@compiles(DATETIME2, "sqlite")
+def compile_datetime2(element, compiler, **kw):
+    return "DATETIME"
+
+
+@pytest_asyncio.fixture
+async def sqlite_db(tmp_path):
+    connection = DB_connection("test", database_url=f"sqlite+aiosqlite:///{tmp_path / 'test.sqlite3'}")
+    async with connection.engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    sql_monitor.reset()
+    yield connection
+    await connection.close()
+
+
+@pytest_asyncio.fixture
+async def mssql_db():
+    connection = None
+    try:
+        connection = DB_connection(config['BD INFO']['USER_DB'])
+        async with connection.session_maker() as session:
+            await session.execute(text("SELECT 1"))
+    except Exception as e:
+        if connection is not None:
+            await connection.close()
+        pytest.skip(f"MS SQL недоступен: {e}")
+    sql_monitor.reset()
+    yield connection
+    await connection.close()
@@ -0,0 +1,75 @@
+import asyncio
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import delete, func, select
+
+from sql_monitor import sql_monitor
+from users.db_manager import UserRepository
+from users.user_models import User, ParkingLocation, ParkingSpot, Booking, BookingDailyRollup, OutboxEvent
+from users.user_schemes import SBookingData
+
+CONCURRENT_BOOKINGS = 200
+STATEMENTS_PER_BOOKING = 4
+
+
+async def create_spot(connection) -> tuple[int, int, int, str]:
+    marker = uuid.uuid4().hex[:12]
+    address = f"stress-{marker}"
+    async with connection.session_maker() as session:
+        user = User(Username=f"stress-{marker}", Password="-", Email=f"{marker}@stress.test", PhoneNumber=marker)
+        location = ParkingLocation(Address=address)
+        session.add_all([user, location])
+        await session.flush()
+        spot = ParkingSpot(LocationID=location.LocationID, SpotNumber="1", Floor=None, Price=120, IsAvailable=True)
+        session.add(spot)
+        await session.commit()
+        return user.UserID, location.LocationID, spot.SpotID, address
+
+
+async def drop_spot(connection, user_id: int, location_id: int, spot_id: int) -> None:
+    async with connection.session_maker() as session:
+        await session.execute(delete(OutboxEvent).where(OutboxEvent.UserID == user_id))
+        await session.execute(delete(BookingDailyRollup).where(BookingDailyRollup.SpotID == spot_id))
+        await session.execute(delete(Booking).where(Booking.SpotID == spot_id))
+        await session.execute(delete(ParkingSpot).where(ParkingSpot.SpotID == spot_id))
+        await session.execute(delete(ParkingLocation).where(ParkingLocation.LocationID == location_id))
+        await session.execute(delete(User).where(User.UserID == user_id))
+        await session.commit()
+
+
+@pytest.mark.asyncio
+async def test_parallel_bookings_claim_spot_once(mssql_db):
+    user_id, location_id, spot_id, address = await create_spot(mssql_db)
+    try:
+        start = datetime.now().replace(microsecond=0) + timedelta(days=2)
+        data = SBookingData(
+            user_id=user_id,
+            address=address,
+            spot_number="1",
+            start_datetime=start,
+            end_datetime=start + timedelta(hours=2),
+            amount=240
+        )
+        sql_monitor.reset()
+        results = await asyncio.gather(
+            *(UserRepository(mssql_db).add_booking(data) for _ in range(CONCURRENT_BOOKINGS)),
+            return_exceptions=True
+        )
+
+        booked = [result for result in results if isinstance(result, tuple)]
+        rejected = [result for result in results if isinstance(result, ValueError)]
+        assert len(booked) == 1
+        assert len(rejected) == CONCURRENT_BOOKINGS - 1
+        assert sql_monitor.statements == STATEMENTS_PER_BOOKING + CONCURRENT_BOOKINGS - 1
+
+        async with mssql_db.session_maker() as session:
+            bookings = (await session.execute(
+                select(func.count()).select_from(Booking).where(Booking.SpotID == spot_id)
+            )).scalar_one()
+            spot = await session.get(ParkingSpot, spot_id)
+        assert bookings == 1
+        assert not spot.IsAvailable
+    finally:
+        await drop_spot(mssql_db, user_id, location_id, spot_id)
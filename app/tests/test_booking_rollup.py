@@ -0,0 +1,111 @@
+from datetime import date, datetime, timedelta
+
+import pytest
+from sqlalchemy import select
+
+from migrations.booking_rollup import rebuild_rollup
+from users.booking_rollup import add_to_rollup
+from users.db_manager import UserRepository
+from users.user_models import Booking, BookingDailyRollup, ParkingLocation, ParkingSpot, User
+from users.user_schemes import SBookingData
+
+START = datetime(2030, 1, 1, 8, 0)
+
+
+async def create_spots(connection, prices: list[int]) -> tuple[int, list[int]]:
+    async with connection.session_maker() as session:
+        user = User(Username="rollup", Password="-", Email="rollup@test", PhoneNumber="rollup")
+        location = ParkingLocation(Address="rollup street")
+        session.add_all([user, location])
+        await session.flush()
+        spots = [
+            ParkingSpot(LocationID=location.LocationID, SpotNumber=str(i), Floor="A", Price=price, IsAvailable=True)
+            for i, price in enumerate(prices, start=1)
+        ]
+        session.add_all(spots)
+        await session.commit()
+        return user.UserID, [spot.SpotID for spot in spots]
+
+
+async def book(connection, user_id: int, spot_number: str, start: datetime, hours: int) -> int:
+    data = SBookingData(
+        user_id=user_id,
+        address="rollup street",
+        floor="A",
+        spot_number=spot_number,
+        start_datetime=start,
+        end_datetime=start + timedelta(hours=hours)
+    )
+    booking_id, _, _ = await UserRepository(connection).add_booking(data)
+    async with connection.session_maker() as session:
+        spot = (await session.execute(select(ParkingSpot).where(ParkingSpot.SpotNumber == spot_number))).scalar_one()
+        spot.IsAvailable = True
+        await session.commit()
+    return booking_id
+
+
+async def rollup(connection) -> dict[tuple[date, int], tuple[int, float, float]]:
+    async with connection.session_maker() as session:
+        rows = (await session.execute(select(BookingDailyRollup))).scalars().all()
+    return {(row.Day, row.SpotID): (row.BookingCount, row.TotalHours, float(row.Revenue)) for row in rows}
+
+
+@pytest.mark.asyncio
+async def test_create_adds_and_cancel_subtracts(sqlite_db):
+    user_id, (spot_id,) = await create_spots(sqlite_db, [100])
+    first = await book(sqlite_db, user_id, "1", START, hours=2)
+    await book(sqlite_db, user_id, "1", START + timedelta(hours=3), hours=1)
+
+    assert await rollup(sqlite_db) == {(START.date(), spot_id): (2, 3.0, 300.0)}
+
+    await UserRepository(sqlite_db).cancel_booking(first)
+
+    assert await rollup(sqlite_db) == {(START.date(), spot_id): (1, 1.0, 100.0)}
+
+
+@pytest.mark.asyncio
+async def test_hold_expiry_subtracts_and_end_expiry_keeps(sqlite_db):
+    scheduler = pytest.importorskip("scheduler", exc_type=ImportError)
+    user_id, (spot_id,) = await create_spots(sqlite_db, [100])
+    unpaid = await book(sqlite_db, user_id, "1", START, hours=2)
+    finished = await book(sqlite_db, user_id, "1", START + timedelta(hours=3), hours=1)
+
+    async with sqlite_db.session_maker() as session:
+        await scheduler.release_bookings(session, [Booking(BookingID=unpaid)], unpaid=True)
+        await scheduler.release_bookings(session, [Booking(BookingID=finished)])
+        await session.commit()
+
+    assert await rollup(sqlite_db) == {(START.date(), spot_id): (1, 1.0, 100.0)}
+
+
+@pytest.mark.asyncio
+async def test_rebuild_matches_direct_sum_over_bookings(sqlite_db):
+    user_id, spot_ids = await create_spots(sqlite_db, [100, 250])
+    async with sqlite_db.session_maker() as session:
+        bookings = [
+            Booking(
+                UserID=user_id,
+                SpotID=spot_ids[i % 2],
+                StartTime=START + timedelta(days=i // 3, hours=i),
+                EndTime=START + timedelta(days=i // 3, hours=i, minutes=30 * (i + 1)),
+                Revenue=None if i == 4 else 10 * (i + 1)
+            )
+            for i in range(7)
+        ]
+        session.add_all(bookings)
+        await session.flush()
+        await add_to_rollup(session, [bookings[0].BookingID])
+        await session.commit()
+
+    async with sqlite_db.session_maker() as session:
+        await rebuild_rollup(session, batch_size=2)
+
+    expected = {}
+    for booking in bookings:
+        count, hours, revenue = expected.get((booking.StartTime.date(), booking.SpotID), (0, 0.0, 0.0))
+        expected[(booking.StartTime.date(), booking.SpotID)] = (
+            count + 1,
+            hours + (booking.EndTime - booking.StartTime).total_seconds() / 3600,
+            revenue + (booking.Revenue or 0)
+        )
+    assert await rollup(sqlite_db) == expected
@@ -0,0 +1,54 @@
+import time
+
+from payments import event_codec
+from payments.booking_consumer import BookingEventConsumer
+from payments.booking_store import BookingStore
+
+
+def make_consumer(ttl: float = 60) -> BookingEventConsumer:
+    return BookingEventConsumer(BookingStore(ttl_seconds=ttl, max_entries=100), "localhost:9092", "bookings")
+
+
+def booking_event(user_id: int, booking_id: int, **extra) -> bytes:
+    return event_codec.encode({"user_id": user_id, "booking_id": booking_id, "amount": 100.0, **extra})
+
+
+def test_replay_does_not_resurrect_popped_booking():
+    consumer = make_consumer()
+    consumer.handle(booking_event(1, 10), time.time())
+    assert consumer.store.pop(1) == {"booking_id": 10, "amount": 100.0}
+
+    consumer.handle(booking_event(1, 10), time.time())
+
+    assert consumer.store.peek(1) is None
+    assert consumer.store.stats()["suppressed"] == 1
+
+
+def test_pop_by_booking_id_blocks_booking_not_yet_consumed():
+    consumer = make_consumer()
+    assert consumer.store.pop(1, booking_id=10) is None
+
+    consumer.handle(booking_event(1, 10), time.time())
+    consumer.handle(booking_event(1, 11), time.time())
+
+    assert consumer.store.peek(1) == {"booking_id": 11, "amount": 100.0}
+
+
+def test_processed_events_are_skipped():
+    consumer = make_consumer()
+    consumer.handle(booking_event(1, 10, processed=True), time.time())
+
+    assert consumer.store.peek(1) is None
+    assert consumer.skipped == 1
+
+
+def test_tombstones_expire_with_ttl():
+    store = BookingStore(ttl_seconds=0.05, max_entries=100)
+    store.put(1, {"booking_id": 10}, booking_id=10)
+    store.pop(1)
+    time.sleep(0.06)
+
+    store.put(1, {"booking_id": 10}, booking_id=10)
+
+    assert store.peek(1) == {"booking_id": 10}
+    assert store.stats()["tombstones"] == 0
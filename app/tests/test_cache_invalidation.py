@@ -0,0 +1,75 @@
+import asyncio
+import functools
+import json
+
+import pytest
+
+import events
+from cache_invalidation import CacheInvalidationBus
+import users.spot_stream as spot_stream_module
+from users.price_table import PriceTable
+from users.spot_index import SpotOccupancyIndex
+from users.spot_stream import SpotStream
+from tests.test_spot_index import ROWS
+
+
+@pytest.mark.asyncio
+async def test_price_change_is_forwarded_to_other_processes(monkeypatch):
+    monkeypatch.setattr(events, "_listeners", {events.SPOT_PRICE_CHANGED: []})
+    bus = CacheInvalidationBus("localhost:9092", "cache_invalidation")
+    bus.producer = object()
+    forwarded = []
+
+    async def send(message: dict) -> None:
+        forwarded.append(message)
+
+    monkeypatch.setattr(bus, "_send", send)
+    events.subscribe(events.SPOT_PRICE_CHANGED, functools.partial(bus.forward, events.SPOT_PRICE_CHANGED))
+
+    events.publish(events.SPOT_PRICE_CHANGED, spot_id=10, price=150)
+    await asyncio.gather(*bus._pending)
+
+    assert forwarded == [{"event": events.SPOT_PRICE_CHANGED, "origin": bus.origin, "spot_id": 10, "price": 150}]
+
+
+def test_remote_price_change_updates_price_table(monkeypatch):
+    table = PriceTable()
+    table.load(ROWS, table.begin_load())
+    monkeypatch.setattr(events, "_listeners", {events.SPOT_PRICE_CHANGED: [table.set_price]})
+    bus = CacheInvalidationBus("localhost:9092", "cache_invalidation")
+    bus.producer = object()
+    forwarded = []
+    monkeypatch.setattr(bus, "_send", lambda message: forwarded.append(message))
+    events.subscribe(events.SPOT_PRICE_CHANGED, functools.partial(bus.forward, events.SPOT_PRICE_CHANGED))
+
+    bus.handle(json.dumps({"event": events.SPOT_PRICE_CHANGED, "origin": "other", "spot_id": 10, "price": 200}).encode())
+
+    assert table.spot_price(10) == 200
+    assert bus.received == 1
+    assert forwarded == []
+
+
+@pytest.mark.asyncio
+async def test_remote_status_change_reaches_stream_subscribers(monkeypatch):
+    index = SpotOccupancyIndex()
+    index.load(ROWS, index.begin_load())
+    monkeypatch.setattr(spot_stream_module, "spot_index", index)
+    stream = SpotStream(heartbeat=1)
+    monkeypatch.setattr(events, "_listeners", {
+        events.SPOT_STATUS_CHANGED: [index.set_available, stream.on_status_changed]
+    })
+    bus = CacheInvalidationBus("localhost:9092", "cache_invalidation")
+
+    async def is_disconnected() -> bool:
+        return False
+
+    messages = stream.stream(1, is_disconnected)
+    assert await messages.__anext__() == "retry: 3000\n\n"
+    delta = asyncio.ensure_future(messages.__anext__())
+    await asyncio.sleep(0)
+
+    bus.handle(json.dumps({"event": events.SPOT_STATUS_CHANGED, "origin": "other", "spot_id": 10, "is_available": False}).encode())
+
+    assert await delta == 'event: spots\ndata: [["1","A",0]]\n\n'
+    assert [spot["is_available"] for spot in index.get_spots("Lenina 1")] == [False, True]
+    await messages.aclose()
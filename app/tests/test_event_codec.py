@@ -0,0 +1,54 @@
+import json
+import math
+
+import pytest
+
+from payments import event_codec
+from payments.booking_consumer import BookingEventConsumer
+from payments.booking_store import BookingStore
+
+
+def test_round_trip_keeps_fields_and_processed_flag():
+    event = {"user_id": 7, "booking_id": 42, "amount": 150.5, "processed": True}
+    value = event_codec.encode(event)
+
+    assert len(value) == event_codec.BOOKING_EVENT_V1.size
+    assert event_codec.decode(value) == event
+    assert event_codec.decode_batch([value]) == [event]
+
+
+def test_missing_amount_round_trips_as_none():
+    value = event_codec.encode({"user_id": 7, "booking_id": 42, "amount": None})
+    assert event_codec.decode(value)["amount"] is None
+    assert math.isnan(event_codec.BOOKING_EVENT_V1.unpack(value)[-1])
+
+
+@pytest.mark.parametrize("value", [b"\xb0", b"\xb0\x01", b"\xb0\x01\x00", event_codec.encode({"user_id": 1, "booking_id": 1})[:-1]])
+def test_truncated_input_raises_value_error(value):
+    with pytest.raises(ValueError):
+        event_codec.decode(value)
+    assert event_codec.decode_batch([value]) == [None]
+
+
+def test_unknown_version_raises_value_error():
+    value = bytearray(event_codec.encode({"user_id": 1, "booking_id": 1, "amount": 1.0}))
+    value[1] = event_codec.VERSION + 1
+    with pytest.raises(ValueError):
+        event_codec.decode(bytes(value))
+
+
+def test_json_fallback():
+    event = {"user_id": 3, "booking_id": 9, "amount": 10.0}
+    assert event_codec.decode(json.dumps(event).encode("utf-8")) == event
+    assert event_codec.decode(event_codec.encode_json(event)) == event
+
+
+@pytest.mark.parametrize("value", [b"\xb0", b"\xb0\x01\x00", b"not json", b"{}"])
+def test_consumer_skips_undecodable_messages(value):
+    store = BookingStore(ttl_seconds=60, max_entries=10)
+    consumer = BookingEventConsumer(store, "localhost:9092", "bookings")
+
+    consumer.handle(value)
+
+    assert consumer.invalid == 1
+    assert consumer.consumed == 0
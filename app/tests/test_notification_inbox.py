@@ -0,0 +1,58 @@
+import pytest
+from sqlalchemy import select, text
+
+import users.db_manager as db_manager
+from users.db_manager import UserRepository
+from users.notification_inbox import NotificationInbox
+from users.user_models import CancelledBooking, User
+
+REASON = "Отменено администратором"
+
+
+async def create_cancellation(connection) -> int:
+    async with connection.session_maker() as session:
+        user = User(Username="inbox", Password="-", Email="inbox@test", PhoneNumber="inbox")
+        session.add(user)
+        await session.flush()
+        session.add(CancelledBooking(BookingID=1, UserID=user.UserID, CancellationReason=REASON))
+        await session.commit()
+        return user.UserID
+
+
+@pytest.fixture
+def inbox(monkeypatch):
+    inbox = NotificationInbox()
+    inbox.load([])
+    monkeypatch.setattr(db_manager, "notification_inbox", inbox)
+    return inbox
+
+
+@pytest.mark.asyncio
+async def test_remote_notification_is_read_from_database(sqlite_db, inbox):
+    user_id = await create_cancellation(sqlite_db)
+    repository = UserRepository(sqlite_db)
+    assert (await repository.check_cancelled_bookings(user_id))["show_cancellation_modal"] is False
+
+    inbox.notify(user_id, REASON, remote=True)
+
+    assert await repository.check_cancelled_bookings(user_id) == {
+        "show_cancellation_modal": True,
+        "cancellation_message": REASON
+    }
+    assert not inbox.has_pending(user_id)
+    async with sqlite_db.session_maker() as session:
+        assert (await session.execute(select(CancelledBooking))).first() is None
+
+
+@pytest.mark.asyncio
+async def test_failed_delete_keeps_notification_queued(sqlite_db, inbox):
+    user_id = await create_cancellation(sqlite_db)
+    inbox.notify(user_id, REASON)
+    async with sqlite_db.engine.begin() as conn:
+        await conn.execute(text("DROP TABLE CancelledBookings"))
+
+    result = await UserRepository(sqlite_db).check_cancelled_bookings(user_id)
+
+    assert result["show_cancellation_modal"] is False
+    assert inbox.has_pending(user_id)
+    assert inbox.take(user_id) == [REASON]
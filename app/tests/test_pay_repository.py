@@ -0,0 +1,26 @@
+import asyncio
+
+import pytest
+from sqlalchemy import func, select
+
+from payments.db_manager import PayRepository
+from payments.pay_models import Model, Payment
+
+
+@pytest.mark.asyncio
+async def test_concurrent_redelivery_records_payment_once(sqlite_db):
+    async with sqlite_db.engine.begin() as conn:
+        await conn.run_sync(Model.metadata.create_all)
+    repository = PayRepository(sqlite_db)
+
+    results = await asyncio.gather(
+        *(repository.add_telegram_payment(1, 200, "tg-charge-1", 1) for _ in range(3)),
+        return_exceptions=True
+    )
+
+    assert not [result for result in results if isinstance(result, Exception)]
+    async with sqlite_db.session_maker() as session:
+        payments = (await session.execute(
+            select(func.count()).select_from(Payment).where(Payment.TransactionID == "tg-charge-1")
+        )).scalar_one()
+    assert payments == 1
@@ -0,0 +1,40 @@
+import functools
+import json
+from types import SimpleNamespace
+
+import events
+from cache_invalidation import CacheInvalidationBus
+from users.principal_cache import PrincipalCache
+
+
+def make_user(user_id: int) -> SimpleNamespace:
+    return SimpleNamespace(UserID=user_id, Username=f"user{user_id}", Email=f"user{user_id}@test.ru", Status="active")
+
+
+def test_email_index_is_bounded_like_principals():
+    cache = PrincipalCache(ttl_seconds=60, max_entries=3)
+    for user_id in range(10):
+        cache.put(make_user(user_id), "user")
+
+    assert cache.stats()["entries"] == 3
+    assert len(cache._emails._entries) == 3
+
+
+def test_remote_status_change_invalidates_without_forwarding(monkeypatch):
+    cache = PrincipalCache(ttl_seconds=60, max_entries=10)
+    cache.put(make_user(1), "user")
+    monkeypatch.setattr(events, "_listeners", {events.USER_STATUS_CHANGED: [cache.invalidate_user]})
+
+    bus = CacheInvalidationBus("localhost:9092", "cache_invalidation")
+    bus.producer = object()
+    forwarded = []
+    monkeypatch.setattr(bus, "_send", lambda message: forwarded.append(message))
+    events.subscribe(events.USER_STATUS_CHANGED, functools.partial(bus.forward, events.USER_STATUS_CHANGED))
+
+    bus.handle(json.dumps({"event": events.USER_STATUS_CHANGED, "origin": bus.origin, "user_id": 1}).encode())
+    assert cache.get("user1@test.ru") is not None
+
+    bus.handle(json.dumps({"event": events.USER_STATUS_CHANGED, "origin": "other", "user_id": 1}).encode())
+    assert cache.get("user1@test.ru") is None
+    assert bus.received == 1
+    assert forwarded == []
@@ -0,0 +1,86 @@
+from collections import namedtuple
+
+from users.availability_cache import AvailabilitySummary
+from users.price_table import PriceTable
+from users.spot_index import SpotOccupancyIndex
+
+SpotRow = namedtuple("SpotRow", ["LocationID", "Address", "SpotID", "SpotNumber", "Floor", "Price", "IsAvailable"])
+
+ROWS = [
+    SpotRow(1, "Lenina 1", 10, "1", "A", 100, True),
+    SpotRow(1, "Lenina 1", 11, "2", "A", 100, True),
+]
+
+
+def test_delta_during_snapshot_is_replayed_onto_new_snapshot():
+    index = SpotOccupancyIndex()
+    index.load(ROWS, index.begin_load())
+
+    token = index.begin_load()
+    index.set_available(10, False)
+    index.set_price(11, 150)
+    index.load(ROWS, token)
+
+    assert index.loaded
+    assert [(spot["is_available"], spot["price"]) for spot in index.get_spots("Lenina 1")] == [(False, 100), (True, 150)]
+
+
+def test_delta_before_snapshot_is_not_replayed():
+    index = SpotOccupancyIndex()
+    index.load(ROWS, index.begin_load())
+    index.set_available(10, False)
+
+    index.load(ROWS, index.begin_load())
+
+    assert [spot["is_available"] for spot in index.get_spots("Lenina 1")] == [True, True]
+
+
+def test_delta_for_spot_missing_from_snapshot_marks_index_stale():
+    index = SpotOccupancyIndex()
+    token = index.begin_load()
+    index.set_available(12, False)
+    index.load(ROWS, token)
+
+    assert not index.loaded
+
+
+def test_cancelled_load_stops_buffering():
+    index = SpotOccupancyIndex()
+    token = index.begin_load()
+    index.cancel_load(token)
+    index.set_available(10, False)
+
+    index.load(ROWS, index.begin_load())
+
+    assert index.loaded
+    assert index.stats()["replayed_deltas"] == 0
+
+
+def test_price_change_during_snapshot_is_replayed():
+    table = PriceTable()
+    token = table.begin_load()
+    table.set_price(10, 200)
+    table.load(ROWS, token)
+
+    assert table.loaded
+    assert table.spot_price(10) == 200
+    assert table.price_per_minute("Lenina 1") == 150 / 60
+
+
+def test_availability_change_during_snapshot_is_replayed():
+    summary = AvailabilitySummary()
+    token = summary.begin_load()
+    summary.update_spot(10, False)
+    summary.update_spot(11, False)
+
+    assert summary.load(ROWS, token) == [{"address": "Lenina 1", "floors": {"A"}}]
+    assert summary.is_fresh()
+
+
+def test_invalidate_during_snapshot_leaves_summary_stale():
+    summary = AvailabilitySummary()
+    token = summary.begin_load()
+    summary.invalidate()
+    summary.load(ROWS, token)
+
+    assert not summary.is_fresh()
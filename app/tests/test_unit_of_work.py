@@ -0,0 +1,56 @@
+import pytest
+from sqlalchemy import func, select
+
+from db_conn import UnitOfWork, unit_of_work
+from users.user_models import User
+
+
+def make_user(name: str) -> User:
+    return User(Username=name, Password="-", Email=f"{name}@test", PhoneNumber=name)
+
+
+async def count_users(connection) -> int:
+    async with connection.session_maker() as session:
+        return (await session.execute(select(func.count()).select_from(User))).scalar_one()
+
+
+async def failing_call(unit: UnitOfWork) -> None:
+    async for session in unit.get_session():
+        session.add(make_user("lost"))
+        raise ValueError("ошибка репозитория")
+
+
+async def committing_call(unit: UnitOfWork) -> None:
+    async for session in unit.get_session():
+        session.add(make_user("kept"))
+        await session.commit()
+        return
+
+
+@pytest.mark.asyncio
+async def test_failed_call_does_not_leak_into_next_call(sqlite_db):
+    unit = UnitOfWork(sqlite_db)
+    try:
+        with pytest.raises(ValueError):
+            await failing_call(unit)
+        await committing_call(unit)
+    finally:
+        await unit.close()
+
+    async with sqlite_db.session_maker() as session:
+        names = (await session.execute(select(User.Username))).scalars().all()
+    assert names == ["kept"]
+
+
+@pytest.mark.asyncio
+async def test_dependency_rolls_back_when_request_fails(sqlite_db):
+    dependency = unit_of_work(sqlite_db)()
+    unit = await dependency.__anext__()
+    async for session in unit.get_session():
+        session.add(make_user("pending"))
+        await session.flush()
+        break
+
+    with pytest.raises(ValueError):
+        await dependency.athrow(ValueError("ошибка обработчика"))
+    assert await count_users(sqlite_db) == 0
@@ -0,0 +1,68 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from db_conn import UnitOfWork
+from sql_monitor import sql_monitor
+from users.db_manager import UserRepository, BOOKINGS_PAGE_SIZE
+from users.user_models import User, ParkingLocation, ParkingSpot, Booking, Car
+
+USER_INFO_STATEMENTS = 3
+
+
+async def create_user(session, name: str, bookings: int, cars_per_booking: int = 2) -> int:
+    user = User(Username=name, Password="-", Email=f"{name}@test", PhoneNumber=name)
+    location = ParkingLocation(Address=f"{name} street")
+    session.add_all([user, location])
+    await session.flush()
+    spot = ParkingSpot(LocationID=location.LocationID, SpotNumber="1", Floor="A", Price=100, IsAvailable=False)
+    placeholder = Car(UserID=user.UserID, CarNumber=f"{name}-0", CarBrand="-")
+    session.add_all([spot, placeholder])
+    await session.flush()
+
+    start = datetime(2030, 1, 1, 8, 0)
+    for i in range(bookings):
+        booking = Booking(
+            UserID=user.UserID,
+            CarID=placeholder.CarID,
+            SpotID=spot.SpotID,
+            StartTime=start + timedelta(days=i),
+            EndTime=start + timedelta(days=i, hours=2)
+        )
+        session.add(booking)
+        await session.flush()
+        session.add_all([
+            Car(UserID=user.UserID, CarNumber=f"{name}-{i}-{j}", CarBrand="Lada", BookingID=booking.BookingID)
+            for j in range(cars_per_booking)
+        ])
+    await session.commit()
+    return user.UserID
+
+
+async def count_statements(connection, user_id: int, before: int | None = None) -> tuple[int, dict]:
+    unit = UnitOfWork(connection)
+    try:
+        sql_monitor.reset()
+        info = await UserRepository(unit).get_user_info(user_id, before_booking_id=before)
+        return sql_monitor.statements, info
+    finally:
+        await unit.close()
+
+
+@pytest.mark.asyncio
+async def test_user_info_statement_count_does_not_grow_with_bookings(sqlite_db):
+    async with sqlite_db.session_maker() as session:
+        light_user = await create_user(session, "light", bookings=1)
+        heavy_user = await create_user(session, "heavy", bookings=BOOKINGS_PAGE_SIZE * 3)
+
+    light_statements, light_info = await count_statements(sqlite_db, light_user)
+    heavy_statements, heavy_info = await count_statements(sqlite_db, heavy_user)
+    next_statements, next_info = await count_statements(sqlite_db, heavy_user, heavy_info["next_cursor"])
+
+    assert light_statements == heavy_statements == next_statements == USER_INFO_STATEMENTS
+    assert len(light_info["bookings"]) == 1
+    assert len(light_info["bookings"][0]["cars"]) == 2
+    assert len(heavy_info["bookings"]) == BOOKINGS_PAGE_SIZE
+    assert all(len(booking["cars"]) == 2 for booking in heavy_info["bookings"])
+    assert len(next_info["bookings"]) == BOOKINGS_PAGE_SIZE
+    assert next_info["bookings"][0]["booking_id"] < heavy_info["bookings"][-1]["booking_id"]
@@ -0,0 +1,112 @@
+import configparser
+import time
+
+import events
+from users.pending_deltas import PendingDeltas
+
+
+config = configparser.ConfigParser()
+config.read('config.ini')
+availability_ttl = config.getint('CACHE', 'AVAILABILITY_TTL_SECONDS', fallback=60)
+
+
+class AvailabilitySummary:
+    def __init__(self, ttl_seconds: int = 60):
+        self.ttl = ttl_seconds
+        self.loaded_at: float | None = None
+        self.hits = 0
+        self.misses = 0
+        self._pending = PendingDeltas()
+        self._spot_groups: dict[int, tuple[str, str | None]] = {}
+        self._spot_available: dict[int, bool] = {}
+        self._available_count: dict[tuple[str, str | None], int] = {}
+        self._summary: list[dict] | None = None
+
+    def is_fresh(self) -> bool:
+        return self.loaded_at is not None and time.monotonic() - self.loaded_at < self.ttl
+
+    def get(self) -> list[dict] | None:
+        if not self.is_fresh():
+            self.misses += 1
+            return None
+        self.hits += 1
+        if self._summary is None:
+            self._summary = self._build_summary()
+        return self._summary
+
+    def begin_load(self) -> int:
+        return self._pending.begin()
+
+    def cancel_load(self, token: int) -> None:
+        self._pending.cancel(token)
+
+    def load(self, rows, token: int) -> list[dict]:
+        spot_groups = {}
+        spot_available = {}
+        available_count = {}
+        for row in rows:
+            group = (row.Address, row.Floor)
+            available_count.setdefault(group, 0)
+            if row.SpotID is None:
+                continue
+            spot_groups[row.SpotID] = group
+            spot_available[row.SpotID] = bool(row.IsAvailable)
+            if row.IsAvailable:
+                available_count[group] += 1
+
+        self._spot_groups = spot_groups
+        self._spot_available = spot_available
+        self._available_count = available_count
+        self.loaded_at = time.monotonic()
+        for spot_id, is_available in self._pending.finish(token):
+            self._apply(spot_id, is_available)
+        self._summary = self._build_summary()
+        return self._summary
+
+    def update_spot(self, spot_id: int, is_available: bool, **_) -> None:
+        self._pending.record(spot_id, is_available)
+        self._apply(spot_id, is_available)
+
+    def _apply(self, spot_id: int | None, is_available: bool | None) -> None:
+        group = self._spot_groups.get(spot_id)
+        if group is None:
+            self.loaded_at = None
+            return
+
+        is_available = bool(is_available)
+        if self._spot_available[spot_id] == is_available:
+            return
+        self._spot_available[spot_id] = is_available
+        self._available_count[group] += 1 if is_available else -1
+        self._summary = None
+
+    def invalidate(self) -> None:
+        self._pending.record(None, None)
+        self.loaded_at = None
+
+    def _build_summary(self) -> list[dict]:
+        parking_dict = {}
+        for (address, floor), available in self._available_count.items():
+            if available:
+                continue
+            if address not in parking_dict:
+                parking_dict[address] = {
+                    "address": address,
+                    "floors": set() if floor is not None else None
+                }
+            if floor is not None:
+                parking_dict[address]["floors"].add(floor)
+        return list(parking_dict.values())
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "spots": len(self._spot_groups),
+            "replayed_deltas": self._pending.replayed,
+            "fresh": self.is_fresh()
+        }
+
+
+availability_summary = AvailabilitySummary(ttl_seconds=availability_ttl)
+events.subscribe(events.SPOT_STATUS_CHANGED, availability_summary.update_spot)
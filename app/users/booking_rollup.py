@@ -0,0 +1,114 @@
+from sqlalchemy import bindparam, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql.elements import TextClause
+
+
+BY_IDS = "b.BookingID IN :booking_ids"
+BY_RANGE = "b.BookingID > :last_id AND b.BookingID <= :upper_id"
+
+ROLLUP_ADD = {
+    "mssql": """
+        MERGE BookingDailyRollups WITH (HOLDLOCK) AS r
+        USING (
+            SELECT
+                CAST(b.StartTime AS DATE) AS Day,
+                ps.LocationID,
+                b.SpotID,
+                COUNT(*) AS BookingCount,
+                SUM(CAST(DATEDIFF(second, b.StartTime, b.EndTime) AS FLOAT) / 3600.0) AS TotalHours,
+                SUM(ISNULL(b.Revenue, 0)) AS Revenue
+            FROM Bookings b
+            JOIN ParkingSpots ps ON ps.SpotID = b.SpotID
+            WHERE {where}
+            GROUP BY CAST(b.StartTime AS DATE), ps.LocationID, b.SpotID
+        ) AS src
+        ON r.Day = src.Day AND r.LocationID = src.LocationID AND r.SpotID = src.SpotID
+        WHEN MATCHED THEN UPDATE SET
+            BookingCount = r.BookingCount + src.BookingCount,
+            TotalHours = r.TotalHours + src.TotalHours,
+            Revenue = r.Revenue + src.Revenue
+        WHEN NOT MATCHED BY TARGET THEN
+            INSERT (Day, LocationID, SpotID, BookingCount, TotalHours, Revenue)
+            VALUES (src.Day, src.LocationID, src.SpotID, src.BookingCount, src.TotalHours, src.Revenue);
+    """,
+    "sqlite": """
+        INSERT INTO BookingDailyRollups (Day, LocationID, SpotID, BookingCount, TotalHours, Revenue)
+        SELECT
+            date(b.StartTime),
+            ps.LocationID,
+            b.SpotID,
+            COUNT(*),
+            SUM((strftime('%s', b.EndTime) - strftime('%s', b.StartTime)) / 3600.0),
+            SUM(IFNULL(b.Revenue, 0))
+        FROM Bookings b
+        JOIN ParkingSpots ps ON ps.SpotID = b.SpotID
+        WHERE {where}
+        GROUP BY date(b.StartTime), ps.LocationID, b.SpotID
+        ON CONFLICT (Day, LocationID, SpotID) DO UPDATE SET
+            BookingCount = BookingCount + excluded.BookingCount,
+            TotalHours = TotalHours + excluded.TotalHours,
+            Revenue = Revenue + excluded.Revenue
+    """
+}
+
+ROLLUP_REMOVE = {
+    "mssql": """
+        UPDATE r SET
+            BookingCount = r.BookingCount - src.BookingCount,
+            TotalHours = r.TotalHours - src.TotalHours,
+            Revenue = r.Revenue - src.Revenue
+        FROM BookingDailyRollups r
+        JOIN (
+            SELECT
+                CAST(b.StartTime AS DATE) AS Day,
+                b.SpotID,
+                COUNT(*) AS BookingCount,
+                SUM(CAST(DATEDIFF(second, b.StartTime, b.EndTime) AS FLOAT) / 3600.0) AS TotalHours,
+                SUM(ISNULL(b.Revenue, 0)) AS Revenue
+            FROM Bookings b
+            WHERE {where}
+            GROUP BY CAST(b.StartTime AS DATE), b.SpotID
+        ) AS src ON r.Day = src.Day AND r.SpotID = src.SpotID
+    """,
+    "sqlite": """
+        UPDATE BookingDailyRollups AS r SET
+            BookingCount = r.BookingCount - src.BookingCount,
+            TotalHours = r.TotalHours - src.TotalHours,
+            Revenue = r.Revenue - src.Revenue
+        FROM (
+            SELECT
+                date(b.StartTime) AS Day,
+                b.SpotID,
+                COUNT(*) AS BookingCount,
+                SUM((strftime('%s', b.EndTime) - strftime('%s', b.StartTime)) / 3600.0) AS TotalHours,
+                SUM(IFNULL(b.Revenue, 0)) AS Revenue
+            FROM Bookings b
+            WHERE {where}
+            GROUP BY date(b.StartTime), b.SpotID
+        ) AS src
+        WHERE r.Day = src.Day AND r.SpotID = src.SpotID
+    """
+}
+
+
+def compile_statements(templates: dict[str, str], where: str, *bindparams) -> dict[str, TextClause]:
+    return {dialect: text(sql.format(where=where)).bindparams(*bindparams) for dialect, sql in templates.items()}
+
+
+ADD_BY_IDS = compile_statements(ROLLUP_ADD, BY_IDS, bindparam("booking_ids", expanding=True))
+ADD_BY_RANGE = compile_statements(ROLLUP_ADD, BY_RANGE)
+REMOVE_BY_IDS = compile_statements(ROLLUP_REMOVE, BY_IDS, bindparam("booking_ids", expanding=True))
+
+
+async def add_to_rollup(session: AsyncSession, booking_ids: list[int]) -> None:
+    if booking_ids:
+        await session.execute(ADD_BY_IDS[session.bind.dialect.name], {"booking_ids": list(booking_ids)})
+
+
+async def add_range_to_rollup(session: AsyncSession, last_id: int, upper_id: int) -> None:
+    await session.execute(ADD_BY_RANGE[session.bind.dialect.name], {"last_id": last_id, "upper_id": upper_id})
+
+
+async def remove_from_rollup(session: AsyncSession, booking_ids: list[int]) -> None:
+    if booking_ids:
+        await session.execute(REMOVE_BY_IDS[session.bind.dialect.name], {"booking_ids": list(booking_ids)})
@@ -1,51 +1,60 @@
 from datetime import datetime, timedelta, timezone
-import logging
 import configparser
+import json
 
 from typing import Annotated
 import jwt
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jwt.exceptions import InvalidTokenError
-from passlib.context import CryptContext
-from sqlalchemy import case, delete, func, select, update
+from sqlalchemy import delete, func, or_, select, update
 from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 
-from db_conn import DB_connection
-from users.user_models import User, ParkingLocation, ParkingSpot, Booking, UserRole, UserRoleMapping, CancelledBooking, Car
-from users.user_schemes import SCarInfoForm, SRegisterForm, SLoginForm, SBookingData, Token, TokenData
+from db_conn import DB_connection, UnitOfWork
+from password_hasher import password_hasher
+from users.user_models import User, ParkingLocation, ParkingSpot, Booking, UserRole, UserRoleMapping, CancelledBooking, Car, OutboxEvent
+from users.user_schemes import SCarInfoForm, SRegisterForm, SLoginForm, SBookingData, Token, TokenData, SPrincipal
+from users.principal_cache import principal_cache
+from users.availability_cache import availability_summary
+from users.spot_index import spot_index
+from users.price_table import price_table
+from users.role_cache import role_cache
+from users.notification_inbox import notification_inbox
+from users.booking_rollup import add_to_rollup, remove_from_rollup
+import events
 from logging_manager import logger
 
-logging.basicConfig()
-logging.getLogger("sqlalchemy.engine").setLevel(logging.INFO)
-logging.getLogger("sqlalchemy.dialects").setLevel(logging.DEBUG)
-
 config = configparser.ConfigParser()
 config.read('config.ini')
 SECRET_KEY = config['SECRET KEY']['SECRET_KEY']
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
+BOOKINGS_PAGE_SIZE = 20
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = password_hasher.context
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
 class UserRepository:
-    def __init__(self, db_connection: DB_connection):
+    def __init__(self, db_connection: DB_connection | UnitOfWork):
         self.db_connection = db_connection
 
+    def fork(self) -> "UserRepository":
+        return UserRepository(self.db_connection.fork())
+
     async def cancel_booking(self, booking_id: int):
         async for session in self.db_connection.get_session():
-            async with session.begin():
+            try:
                 booking = await session.get(Booking, booking_id)
                 if not booking:
                     logger.error(f"Booking with ID {booking_id} not found.")
                     raise HTTPException(status_code=404)
 
-                start_time = datetime.strptime(booking.StartTime.replace("T", " "), "%Y-%m-%d %H:%M")
-                if datetime.now() > start_time - timedelta(days=1):
+                if datetime.now() > booking.StartTime - timedelta(days=1):
                     raise HTTPException(status_code=400, detail="Бронирование можно отменить только за сутки до начала")
 
+                await remove_from_rollup(session, [booking_id])
+
                 await session.execute(
                     delete(Car).where(Car.BookingID == booking_id)
                 )
@@ -59,17 +68,23 @@ class UserRepository:
                 await session.delete(booking)
 
                 await session.commit()
+            except Exception:
+                await session.rollback()
+                raise
+
+            events.publish(events.BOOKING_CANCELLED, booking_id=booking_id)
+            events.publish(events.SPOT_STATUS_CHANGED, spot_id=booking.SpotID, is_available=True)
 
-    def verify_password(self, plain_password, hashed_password):
+    async def verify_password(self, plain_password, hashed_password):
         try:
-            return pwd_context.verify(plain_password, hashed_password)
+            return await password_hasher.verify(plain_password, hashed_password)
         except Exception as e:
             logger.error(f"Ошибка верификации пароля: {e}")
             return False
 
-    def get_password_hash(self, password):
+    async def get_password_hash(self, password):
         try:
-            return pwd_context.hash(password)
+            return await password_hasher.hash(password)
         except Exception as e:
             logger.error(f"Ошибка хеширования пароля: {e}")
             raise HTTPException(status_code=500, detail="Ошибка хеширования пароля")
@@ -93,6 +108,7 @@ class UserRepository:
 
     async def authenticate_user(self, email: str, password: str):
         user = await self.get_user(email)
+        await self.db_connection.release()
         
         if not user:
             logger.error("Пользователь не найден")
@@ -101,7 +117,7 @@ class UserRepository:
         logger.info(f"Stored hashed password: {user.Password}")
         logger.info(f"Entered password: {password}")
 
-        if not self.verify_password(password, user.Password):
+        if not await self.verify_password(password, user.Password):
             logger.error("Ошибка верификации пароля")
             raise HTTPException(status_code=401, detail="Неверный email или пароль")
         
@@ -137,48 +153,74 @@ class UserRepository:
         except InvalidTokenError:
             raise credentials_exception
 
-        user = await self.get_user(token_data.email)
-        if user is None:
-            raise credentials_exception
-        return user
+        principal = principal_cache.get(token_data.email)
+        if principal is None:
+            user = await self.get_user(token_data.email)
+            if user is None:
+                raise credentials_exception
+            principal = principal_cache.put(user, user.RoleName)
+        return principal
 
-    async def get_current_active_user(self, current_user: Annotated[User, Depends(get_current_user)]):
-        if current_user.disabled:
-            raise HTTPException(status_code=400, detail="Inactive user")
+    async def get_current_active_user(self, current_user: Annotated[SPrincipal, Depends(get_current_user)]):
+        if current_user.Status == "Black":
+            raise HTTPException(status_code=403, detail="Вас добавили в черный список")
         return current_user
     
+    async def load_roles(self) -> None:
+        async for session in self.db_connection.get_session():
+            result = await session.execute(select(UserRole.RoleID, UserRole.RoleName))
+            role_cache.load(result.all())
+            logger.info(f"Загружены роли пользователей: {role_cache.stats()['roles']}")
+
+    async def get_role_id(self, role_name: str) -> int | None:
+        role_id = role_cache.role_id(role_name)
+        if role_id is None and not role_cache.loaded:
+            await self.load_roles()
+            role_id = role_cache.role_id(role_name)
+        return role_id
+
+    def duplicate_field_error(self, data: SRegisterForm, usernames: set, emails: set, phones: set) -> str | None:
+        if data.username in usernames:
+            logger.error(f"Имя пользователя {data.username} уже занято")
+            return "Имя пользователя уже занято"
+        if data.email in emails:
+            logger.error(f"Email {data.email} уже зарегистрирован")
+            return "Email уже зарегистрирован"
+        if data.phone in phones:
+            logger.error(f"Номер телефона {data.phone} уже зарегистрирован")
+            return "Номер телефона уже зарегистрирован"
+        return None
+
     async def register_user(self, data: SRegisterForm) -> int:
+        logger.info(f"Начало регистрации пользователя: {data.username}, {data.email}, {data.phone}")
+        role_id = await self.get_role_id("User")
+        if not role_id:
+            logger.error("Роль User не найдена в базе данных")
+            raise ValueError("Роль User не найдена")
+
+        hashed_password = await self.get_password_hash(data.password)
+
         async for session in self.db_connection.get_session():
             try:
-                logger.info(f"Начало регистрации пользователя: {data.username}, {data.email}, {data.phone}")
-
-                username_query = select(User.UserID).where(User.Username == data.username)
-                username_result = await session.execute(username_query)
-                if username_result.scalar_one_or_none():
-                    logger.error(f"Имя пользователя {data.username} уже занято")
-                    raise ValueError("Имя пользователя уже занято")
-
-                email_query = select(User.UserID).where(User.Email == data.email)
-                email_result = await session.execute(email_query)
-                if email_result.scalar_one_or_none():
-                    logger.error(f"Email {data.email} уже зарегистрирован")
-                    raise ValueError("Email уже зарегистрирован")
-
-                phone_query = select(User.UserID).where(User.PhoneNumber == data.phone)
-                phone_result = await session.execute(phone_query)
-                if phone_result.scalar_one_or_none():
-                    logger.error(f"Номер телефона {data.phone} уже зарегистрирован")
-                    raise ValueError("Номер телефона уже зарегистрирован")
-
-                role_query = select(UserRole.RoleID).where(UserRole.RoleName == "User")
-                role_result = await session.execute(role_query)
-                role_id = role_result.scalar_one_or_none()
-                
-                if not role_id:
-                    logger.error("Роль User не найдена в базе данных")
-                    raise ValueError("Роль User не найдена")
-
-                hashed_password = self.get_password_hash(data.password)
+                duplicates_query = (
+                    select(User.Username, User.Email, User.PhoneNumber)
+                    .where(or_(
+                        User.Username == data.username,
+                        User.Email == data.email,
+                        User.PhoneNumber == data.phone
+                    ))
+                    .limit(3)
+                )
+                duplicates = (await session.execute(duplicates_query)).all()
+                message = self.duplicate_field_error(
+                    data,
+                    {row.Username for row in duplicates},
+                    {row.Email for row in duplicates},
+                    {row.PhoneNumber for row in duplicates}
+                )
+                if message:
+                    raise ValueError(message)
+
                 user = User(
                     Username=data.username,
                     Email=data.email,
@@ -188,22 +230,17 @@ class UserRepository:
                 )
                 session.add(user)
                 await session.flush()
-                logger.info(f"Создан пользователь: {data.username}, UserID: {user.UserID}")
-
-                user_role_mapping = UserRoleMapping(
-                    UserID=user.UserID,
-                    RoleID=role_id
-                )
-                session.add(user_role_mapping)
-                logger.info(f"Добавлена роль User для UserID: {user.UserID}")
-
+                session.add(UserRoleMapping(UserID=user.UserID, RoleID=role_id))
                 await session.commit()
                 logger.info(f"Пользователь {data.username} зарегистрирован с ID: {user.UserID} и ролью User")
                 return user.UserID
-            except IntegrityError:
+            except IntegrityError as e:
                 await session.rollback()
-                logger.error(f"Ошибка IntegrityError при регистрации: возможное дублирование данных")
-                raise ValueError("Ошибка при регистрации: данные уже существуют")
+                detail = str(e.orig)
+                matched = {value for value in (data.username, data.email, data.phone) if value in detail}
+                logger.error(f"Ошибка IntegrityError при регистрации: {detail}")
+                message = self.duplicate_field_error(data, matched, matched, matched)
+                raise ValueError(message or "Ошибка при регистрации: данные уже существуют")
             except Exception as e:
                 await session.rollback()
                 logger.error(f"Неизвестная ошибка при регистрации: {str(e)}")
@@ -234,87 +271,81 @@ class UserRepository:
             return username
 
     async def check_available_parking_spots(self) -> list[dict[str, str | int | list[int]]]:
+        summary = availability_summary.get()
+        if summary is not None:
+            return summary
+
         async for session in self.db_connection.get_session():
+            token = availability_summary.begin_load()
             try:
                 query = (
-                    select(ParkingLocation.Address, ParkingSpot.Floor)
+                    select(ParkingLocation.Address, ParkingSpot.Floor, ParkingSpot.SpotID, ParkingSpot.IsAvailable)
                     .join(ParkingSpot, ParkingLocation.LocationID == ParkingSpot.LocationID, isouter=True)
-                    .group_by(ParkingLocation.Address, ParkingSpot.Floor)
-                    .having(
-                        func.sum(
-                            case(
-                                (ParkingSpot.IsAvailable == 1, 1),
-                                else_=0
-                            )
-                        ) == 0
-                    )
                 )
                 logger.debug(f"Выполняется SQL-запрос: {str(query)}")
                 result = await session.execute(query)
-                occupied_data = result.fetchall()
-
-                parking_dict = {}
-
-                for row in occupied_data:
-                    address = row.Address
-                    floor = row.Floor
-
-                    if address not in parking_dict:
-                        parking_dict[address] = {
-                            "address": address,
-                            "floors": set() if floor is not None else None 
-                        }
-
-                    if floor is not None:
-                        parking_dict[address]["floors"].add(floor)
-
-                return list(parking_dict.values())
+                return availability_summary.load(result.fetchall(), token)
             except SQLAlchemyError as e:
                 logger.error(f"Ошибка базы данных в check_available_parking_spots: {e}")
                 raise HTTPException(status_code=500, detail=f"Ошибка базы данных: {str(e)}")
+            finally:
+                availability_summary.cancel_load(token)
 
-    async def get_parking_spots(self, location: str) -> list[dict]:
-        coords, address = location.split("|")
+    async def load_spot_state(self) -> None:
         async for session in self.db_connection.get_session():
             query = (
-                select(ParkingSpot.SpotNumber, ParkingSpot.Floor, ParkingSpot.IsAvailable, ParkingSpot.Price)
-                .join(ParkingLocation, ParkingLocation.LocationID == ParkingSpot.LocationID)
-                .where(ParkingLocation.Address == address)
+                select(
+                    ParkingLocation.LocationID,
+                    ParkingLocation.Address,
+                    ParkingSpot.SpotID,
+                    ParkingSpot.SpotNumber,
+                    ParkingSpot.Floor,
+                    ParkingSpot.Price,
+                    ParkingSpot.IsAvailable
+                )
+                .join(ParkingSpot, ParkingLocation.LocationID == ParkingSpot.LocationID, isouter=True)
+                .order_by(ParkingLocation.LocationID, ParkingSpot.SpotID)
             )
-            logger.debug(f"Выполняется SQL-запрос: {str(query)}")
-            result = await session.execute(query)
-            spots = [
-                {
-                    "spot_number": row.SpotNumber,
-                    "floor": row.Floor,
-                    "is_available": row.IsAvailable,
-                    "price": float(row.Price) if row.Price is not None else 0.0
-                }
-                for row in result.fetchall()
-            ]
-            logger.info(f"Найдены места для {address}: {spots}")
-            return spots
+            token = spot_index.begin_load()
+            price_token = price_table.begin_load()
+            try:
+                result = await session.execute(query)
+                rows = result.fetchall()
+                spot_index.load(rows, token)
+                price_table.load(rows, price_token)
+            finally:
+                spot_index.cancel_load(token)
+                price_table.cancel_load(price_token)
+            logger.info(f"Загружен индекс занятости мест: {spot_index.stats()}, цены: {price_table.stats()}")
+
+    async def get_parking_spots(self, location: str) -> list[dict]:
+        coords, address = location.split("|")
+        if not spot_index.loaded:
+            await self.load_spot_state()
+        return spot_index.get_spots(address)
+
+    async def get_location_id(self, location: str) -> int | None:
+        coords, address = location.split("|")
+        if not spot_index.loaded:
+            await self.load_spot_state()
+        return spot_index.location_id(address)
 
     async def get_parking_prices(self) -> list[dict]:
-        async for session in self.db_connection.get_session():
-            query = (
-                select(ParkingLocation.Address, func.avg(ParkingSpot.Price).label("avg_price"))
-                .join(ParkingSpot, ParkingLocation.LocationID == ParkingSpot.LocationID)
-                .group_by(ParkingLocation.Address)
-            )
-            logger.debug(f"Выполняется SQL-запрос: {str(query)}")
-            result = await session.execute(query)
-            prices = [
-                {
-                    "address": row.Address,
-                    "price_per_hour": float(row.avg_price) if row.avg_price is not None else 0.0,
-                    "price_per_minute": float(row.avg_price) / 60 if row.avg_price is not None else 0.0
-                }
-                for row in result.fetchall()
-            ]
-            return prices
-
-    async def get_user_info(self, user_id: int) -> dict:
+        if not price_table.loaded:
+            await self.load_spot_state()
+        return price_table.get_prices()
+
+    async def location_has_floors(self, address: str) -> bool:
+        if not spot_index.loaded:
+            await self.load_spot_state()
+        return spot_index.has_floors(address)
+
+    async def get_price_per_minute(self, address: str) -> float | None:
+        if not price_table.loaded:
+            await self.load_spot_state()
+        return price_table.price_per_minute(address)
+
+    async def get_user_info(self, user_id: int, before_booking_id: int | None = None, limit: int = BOOKINGS_PAGE_SIZE) -> dict:
         async for session in self.db_connection.get_session():
             query_user = select(User).where(User.UserID == user_id)
             result_user = await session.execute(query_user)
@@ -335,134 +366,154 @@ class UserRepository:
                 .join(ParkingSpot, ParkingSpot.SpotID == Booking.SpotID)
                 .join(ParkingLocation, ParkingLocation.LocationID == ParkingSpot.LocationID)
                 .where(Booking.UserID == user_id)
+                .order_by(Booking.BookingID.desc())
+                .limit(limit + 1)
             )
+            if before_booking_id is not None:
+                query_bookings = query_bookings.where(Booking.BookingID < before_booking_id)
             logger.debug(f"Выполняется SQL-запрос: {str(query_bookings)}")
             result_bookings = await session.execute(query_bookings)
             bookings_raw = result_bookings.all()
 
-            bookings = []
-            for row in bookings_raw:
-                cars_query = select(Car.CarNumber, Car.CarBrand).where(Car.BookingID == row.BookingID)
+            next_cursor = None
+            if len(bookings_raw) > limit:
+                bookings_raw = bookings_raw[:limit]
+                next_cursor = bookings_raw[-1].BookingID
+
+            cars_by_booking: dict[int, list[dict]] = {}
+            booking_ids = [row.BookingID for row in bookings_raw]
+            if booking_ids:
+                cars_query = select(Car.BookingID, Car.CarNumber, Car.CarBrand).where(Car.BookingID.in_(booking_ids))
                 result_cars = await session.execute(cars_query)
-                cars_list = [{"car_number": c.CarNumber, "car_brand": c.CarBrand} for c in result_cars.fetchall()]
+                for c in result_cars.fetchall():
+                    cars_by_booking.setdefault(c.BookingID, []).append({"car_number": c.CarNumber, "car_brand": c.CarBrand})
 
+            bookings = []
+            for row in bookings_raw:
                 bookings.append({
                     "booking_id": row.BookingID,
                     "address": row.Address,
                     "spot_number": row.SpotNumber,
                     "floor": row.Floor,
-                    "start_time": row.StartTime.replace("T", " ") if row.StartTime else None,
-                    "end_time": row.EndTime.replace("T", " ") if row.EndTime else None,
-                    "cars": cars_list
+                    "start_time": row.StartTime.strftime("%Y-%m-%d %H:%M") if row.StartTime else None,
+                    "end_time": row.EndTime.strftime("%Y-%m-%d %H:%M") if row.EndTime else None,
+                    "cars": cars_by_booking.get(row.BookingID, [])
                 })
 
             return {
                 "username": user.Username,
                 "email": user.Email,
                 "phone": user.PhoneNumber,
-                "bookings": bookings
+                "bookings": bookings,
+                "next_cursor": next_cursor
             }
 
-    async def check_cancelled_bookings(self, user_id: int) -> dict:
+    async def load_pending_notifications(self) -> None:
         async for session in self.db_connection.get_session():
-            try:
-                query = select(CancelledBooking).where(CancelledBooking.UserID == user_id)
-                result = await session.execute(query)
-                cancellations = result.scalars().all()
-
-                if not cancellations:
-                    return {"show_cancellation_modal": False, "cancellation_message": ""}
+            result = await session.execute(select(CancelledBooking.UserID).distinct())
+            notification_inbox.load(result.scalars().all())
 
-                cancellation = cancellations[0]
-                message = cancellation.CancellationReason
+    async def check_cancelled_bookings(self, user_id: int) -> dict:
+        if not notification_inbox.has_pending(user_id):
+            return {"show_cancellation_modal": False, "cancellation_message": ""}
 
-                await session.execute(
-                    delete(CancelledBooking).where(CancelledBooking.UserID == user_id)
+        async for session in self.db_connection.get_session():
+            try:
+                result = await session.execute(
+                    delete(CancelledBooking)
+                    .where(CancelledBooking.UserID == user_id)
+                    .returning(CancelledBooking.CancellationReason)
+                    .execution_options(synchronize_session=False)
                 )
+                reasons = result.scalars().all()
                 await session.commit()
-                logger.info(f"Удалены записи CancelledBookings для UserID={user_id}")
-
-                return {
-                    "show_cancellation_modal": True,
-                    "cancellation_message": message
-                }
+                if reasons:
+                    logger.info(f"Удалены записи CancelledBookings для UserID={user_id}")
             except SQLAlchemyError as e:
+                await session.rollback()
                 logger.error(f"Ошибка при проверке отмененных броней для UserID={user_id}: {e}")
                 return {"show_cancellation_modal": False, "cancellation_message": ""}
 
-    async def add_booking(self, data: SBookingData) -> tuple[int, int]:
-        async for session in self.db_connection.get_session():
-            try:
-                location = await session.execute(
-                    select(ParkingLocation.LocationID).where(ParkingLocation.Address == data.address)
-                )
-                location_id = location.scalar_one_or_none()
-                if not location_id:
-                    logger.error(f"Парковка не найдена для адреса: {data.address}.")
-                    raise ValueError("Specified location not found.")
-
-                spot_number = int(data.spot_number) if isinstance(data.spot_number, str) else data.spot_number
+            messages = notification_inbox.take(user_id)
+            message = (messages or reasons or [None])[0]
+            if message is None:
+                return {"show_cancellation_modal": False, "cancellation_message": ""}
 
-                query = select(ParkingSpot.SpotID, ParkingSpot.SpotNumber, ParkingSpot.Floor, ParkingSpot.IsAvailable).where(
-                    ParkingSpot.LocationID == location_id,
-                    ParkingSpot.SpotNumber == spot_number,
-                    ParkingSpot.IsAvailable == 1
-                )
+            return {
+                "show_cancellation_modal": True,
+                "cancellation_message": message
+            }
 
-                if data.floor is not None:
-                    query = query.where(ParkingSpot.Floor == data.floor)
+    async def add_booking(self, data: SBookingData) -> tuple[int, str, float]:
+        async for session in self.db_connection.get_session():
+            try:
+                location_id = spot_index.location_id(data.address)
+                if location_id is not None:
+                    location_filter = ParkingSpot.LocationID == location_id
                 else:
-                    query = query.where(ParkingSpot.Floor.is_(None))
+                    location_filter = ParkingSpot.LocationID == (
+                        select(ParkingLocation.LocationID)
+                        .where(ParkingLocation.Address == data.address)
+                        .scalar_subquery()
+                    )
+                floor_filter = ParkingSpot.Floor == data.floor if data.floor is not None else ParkingSpot.Floor.is_(None)
 
-                logger.info(f"Запрос места: LocationID={location_id}, SpotNumber={spot_number}, Floor={data.floor}, IsAvailable=1")
-                logger.debug(f"Выполняется SQL-запрос: {str(query)}")
-                parking_spot = await session.execute(query)
-                spot = parking_spot.fetchone()
+                claim_query = (
+                    update(ParkingSpot)
+                    .where(
+                        location_filter,
+                        floor_filter,
+                        ParkingSpot.SpotNumber == str(data.spot_number),
+                        ParkingSpot.IsAvailable == 1
+                    )
+                    .values(IsAvailable=False)
+                    .returning(ParkingSpot.SpotID, ParkingSpot.SpotNumber, ParkingSpot.Price)
+                    .execution_options(synchronize_session=False)
+                )
+                logger.debug(f"Выполняется SQL-запрос: {str(claim_query)}")
+                claim_result = await session.execute(claim_query)
+                spot = claim_result.first()
 
                 if not spot:
-                    diag_query = select(ParkingSpot.SpotID, ParkingSpot.SpotNumber, ParkingSpot.Floor, ParkingSpot.IsAvailable).where(
-                        ParkingSpot.LocationID == location_id,
-                        ParkingSpot.SpotNumber == spot_number
-                    )
-                    if data.floor is not None:
-                        diag_query = diag_query.where(ParkingSpot.Floor == data.floor)
-                    else:
-                        diag_query = diag_query.where(ParkingSpot.Floor.is_(None))
-                    logger.debug(f"Выполняется диагностический SQL-запрос: {str(diag_query)}")
-                    diag_result = await session.execute(diag_query)
-                    diag_spot = diag_result.fetchone()
-                    if diag_spot:
-                        logger.error(f"Место найдено, но недоступно: SpotID={diag_spot.SpotID}, SpotNumber={diag_spot.SpotNumber}, Floor={diag_spot.Floor}, IsAvailable={diag_spot.IsAvailable}")
-                    else:
-                        logger.error(f"Место не существует: SpotNumber={spot_number}, Floor={data.floor}, LocationID={location_id}")
+                    await session.rollback()
+                    logger.error(f"Место недоступно или не существует: SpotNumber={data.spot_number}, Floor={data.floor}, Address={data.address}")
                     floor_str = f"на этаже {data.floor}" if data.floor else "без этажа"
-                    raise ValueError(f"Место {spot_number} {floor_str} недоступно или не существует для адреса {data.address}")
-
-                spot_id = spot.SpotID
-                spot_number = spot.SpotNumber
-                logger.info(f"Найдено место: SpotID={spot_id}, SpotNumber={spot_number}, Floor={spot.Floor}, IsAvailable={spot.IsAvailable}")
+                    raise ValueError(f"Место {data.spot_number} {floor_str} недоступно или не существует для адреса {data.address}")
 
+                hours = (data.end_datetime - data.start_datetime).total_seconds() / 3600
+                amount = round(hours * float(spot.Price), 2)
                 booking = Booking(
                     UserID=data.user_id,
-                    SpotID=spot_id,
+                    SpotID=spot.SpotID,
                     StartTime=data.start_datetime,
                     EndTime=data.end_datetime,
+                    Revenue=amount
                 )
                 session.add(booking)
-
-                await session.execute(
-                    update(ParkingSpot)
-                    .where(ParkingSpot.SpotID == spot_id)
-                    .values(IsAvailable=0)
-                )
-
                 await session.flush()
                 booking_id = booking.BookingID
+                await add_to_rollup(session, [booking_id])
+                session.add(OutboxEvent(
+                    UserID=data.user_id,
+                    EventType=events.BOOKING_CREATED,
+                    Payload=json.dumps({"user_id": data.user_id, "booking_id": booking_id, "amount": amount})
+                ))
 
                 await session.commit()
-                logger.info(f"Бронирование успешно добавлено с ID: {booking_id} для пользователя {data.user_id}, место {spot_number}, этаж {data.floor}.")
-                return booking_id, spot_number
-            
+                events.publish(events.SPOT_STATUS_CHANGED, spot_id=spot.SpotID, is_available=False)
+                events.publish(
+                    events.BOOKING_CREATED,
+                    booking_id=booking_id,
+                    user_id=data.user_id,
+                    spot_id=spot.SpotID,
+                    created=datetime.now(),
+                    end_time=data.end_datetime
+                )
+                logger.info(f"Бронирование успешно добавлено с ID: {booking_id} для пользователя {data.user_id}, место {spot.SpotNumber}, этаж {data.floor}.")
+                return booking_id, spot.SpotNumber, amount
+
+            except ValueError:
+                raise
             except IntegrityError as e:
                 await session.rollback()
                 logger.error(f"IntegrityError при добавлении бронирования: {e}")
@@ -0,0 +1,44 @@
+import events
+
+
+class NotificationInbox:
+    def __init__(self):
+        self.loaded = False
+        self._messages: dict[int, list[str]] = {}
+        self._pending_users: set[int] = set()
+        self.delivered = 0
+        self.skipped = 0
+
+    def notify(self, user_id: int, message: str, remote: bool = False, **_) -> None:
+        if not remote:
+            self._messages.setdefault(user_id, []).append(message)
+        self._pending_users.add(user_id)
+
+    def load(self, user_ids) -> None:
+        self._pending_users = set(user_ids) | set(self._messages)
+        self.loaded = True
+
+    def has_pending(self, user_id: int) -> bool:
+        if self.loaded and user_id not in self._pending_users:
+            self.skipped += 1
+            return False
+        return True
+
+    def take(self, user_id: int) -> list[str]:
+        self._pending_users.discard(user_id)
+        messages = self._messages.pop(user_id, [])
+        self.delivered += len(messages)
+        return messages
+
+    def stats(self) -> dict:
+        return {
+            "loaded": self.loaded,
+            "pending_users": len(self._pending_users),
+            "queued_messages": sum(len(messages) for messages in self._messages.values()),
+            "delivered": self.delivered,
+            "skipped_lookups": self.skipped
+        }
+
+
+notification_inbox = NotificationInbox()
+events.subscribe(events.USER_NOTIFICATION, notification_inbox.notify)
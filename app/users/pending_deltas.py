@@ -0,0 +1,28 @@
+import itertools
+
+
+class PendingDeltas:
+    def __init__(self):
+        self._tokens = itertools.count()
+        self._loads: dict[int, list[tuple]] = {}
+        self.replayed = 0
+
+    def begin(self) -> int:
+        token = next(self._tokens)
+        self._loads[token] = []
+        return token
+
+    def record(self, *delta) -> None:
+        for buffered in self._loads.values():
+            buffered.append(delta)
+
+    def finish(self, token: int) -> list[tuple]:
+        buffered = self._loads.pop(token, [])
+        self.replayed += len(buffered)
+        return buffered
+
+    def cancel(self, token: int) -> None:
+        self._loads.pop(token, None)
+
+    def loading(self) -> int:
+        return len(self._loads)
@@ -0,0 +1,97 @@
+import hashlib
+import json
+
+import events
+from users.pending_deltas import PendingDeltas
+
+
+class PriceTable:
+    def __init__(self):
+        self.loaded = False
+        self.version = 0
+        self._pending = PendingDeltas()
+        self.etag = ""
+        self._spot_prices: dict[int, tuple[str, float]] = {}
+        self._location_totals: dict[str, list[float]] = {}
+        self._prices: list[dict] = []
+
+    def begin_load(self) -> int:
+        return self._pending.begin()
+
+    def cancel_load(self, token: int) -> None:
+        self._pending.cancel(token)
+
+    def load(self, rows, token: int) -> None:
+        spot_prices = {}
+        location_totals = {}
+        for row in rows:
+            if row.SpotID is None or row.Price is None:
+                continue
+            price = float(row.Price)
+            spot_prices[row.SpotID] = (row.Address, price)
+            totals = location_totals.setdefault(row.Address, [0.0, 0])
+            totals[0] += price
+            totals[1] += 1
+
+        self._spot_prices = spot_prices
+        self._location_totals = location_totals
+        self.loaded = True
+        for spot_id, price in self._pending.finish(token):
+            self._apply_price(spot_id, price)
+        self._rebuild()
+
+    def set_price(self, spot_id: int, price: float, **_) -> None:
+        self._pending.record(spot_id, price)
+        if self._apply_price(spot_id, price):
+            self._rebuild()
+
+    def _apply_price(self, spot_id: int, price: float) -> bool:
+        current = self._spot_prices.get(spot_id)
+        if current is None:
+            self.loaded = False
+            return False
+        address, old_price = current
+        price = float(price)
+        self._spot_prices[spot_id] = (address, price)
+        self._location_totals[address][0] += price - old_price
+        return True
+
+    def _rebuild(self) -> None:
+        self._prices = [
+            {
+                "address": address,
+                "price_per_hour": total / count,
+                "price_per_minute": total / count / 60
+            }
+            for address, (total, count) in self._location_totals.items()
+        ]
+        self.version += 1
+        self.etag = hashlib.sha1(json.dumps(self._prices, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+    def get_prices(self) -> list[dict]:
+        return self._prices
+
+    def spot_price(self, spot_id: int) -> float | None:
+        current = self._spot_prices.get(spot_id)
+        return current[1] if current else None
+
+    def price_per_minute(self, address: str) -> float | None:
+        totals = self._location_totals.get(address)
+        if not totals:
+            return None
+        total, count = totals
+        return total / count / 60
+
+    def stats(self) -> dict:
+        return {
+            "loaded": self.loaded,
+            "version": self.version,
+            "etag": self.etag,
+            "locations": len(self._location_totals),
+            "spots": len(self._spot_prices)
+        }
+
+
+price_table = PriceTable()
+
+events.subscribe(events.SPOT_PRICE_CHANGED, price_table.set_price)
@@ -0,0 +1,45 @@
+import configparser
+
+import events
+from ttl_cache import TTLCache
+from users.user_schemes import SPrincipal
+
+
+config = configparser.ConfigParser()
+config.read('config.ini')
+principal_ttl = config.getint('CACHE', 'PRINCIPAL_TTL_SECONDS', fallback=60)
+principal_max_entries = config.getint('CACHE', 'PRINCIPAL_MAX_ENTRIES', fallback=10000)
+
+
+class PrincipalCache:
+    def __init__(self, ttl_seconds: int = 60, max_entries: int = 10000):
+        self._cache = TTLCache(ttl_seconds=ttl_seconds, max_entries=max_entries)
+        self._emails = TTLCache(ttl_seconds=ttl_seconds, max_entries=max_entries)
+
+    def get(self, email: str) -> SPrincipal | None:
+        return self._cache.get(email)
+
+    def put(self, user, role_name: str) -> SPrincipal:
+        principal = SPrincipal(
+            UserID=user.UserID,
+            Username=user.Username,
+            Email=user.Email,
+            RoleName=role_name,
+            Status=user.Status
+        )
+        self._cache.set(principal.Email, principal)
+        self._emails.set(principal.UserID, principal.Email)
+        return principal
+
+    def invalidate_user(self, user_id: int, **_) -> None:
+        email = self._emails.get(user_id)
+        if email is not None:
+            self._emails.invalidate(user_id)
+            self._cache.invalidate(email)
+
+    def stats(self) -> dict:
+        return self._cache.stats()
+
+
+principal_cache = PrincipalCache(ttl_seconds=principal_ttl, max_entries=principal_max_entries)
+events.subscribe(events.USER_STATUS_CHANGED, principal_cache.invalidate_user)
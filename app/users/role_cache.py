@@ -0,0 +1,17 @@
+class RoleCache:
+    def __init__(self):
+        self.loaded = False
+        self._role_ids: dict[str, int] = {}
+
+    def load(self, rows) -> None:
+        self._role_ids = {row.RoleName: row.RoleID for row in rows}
+        self.loaded = True
+
+    def role_id(self, role_name: str) -> int | None:
+        return self._role_ids.get(role_name)
+
+    def stats(self) -> dict:
+        return {"loaded": self.loaded, "roles": dict(self._role_ids)}
+
+
+role_cache = RoleCache()
@@ -0,0 +1,183 @@
+import sys
+from array import array
+from bisect import bisect_left
+
+import events
+from users.pending_deltas import PendingDeltas
+
+
+class FloorSlice:
+    __slots__ = ("location_id", "floor", "spot_ids", "numbers", "prices", "available")
+
+    def __init__(self, location_id: int, floor: str | None):
+        self.location_id = location_id
+        self.floor = floor
+        self.spot_ids = array("q")
+        self.numbers: list[str] = []
+        self.prices = array("d")
+        self.available = bytearray()
+
+    def append(self, spot_id: int, number: str, price: float, is_available: bool) -> int:
+        position = len(self.spot_ids)
+        self.spot_ids.append(spot_id)
+        self.numbers.append(sys.intern(str(number)))
+        self.prices.append(price)
+        if position % 8 == 0:
+            self.available.append(0)
+        if is_available:
+            self.available[position >> 3] |= 1 << (position & 7)
+        return position
+
+    def is_available(self, position: int) -> bool:
+        return bool(self.available[position >> 3] >> (position & 7) & 1)
+
+    def set_available(self, position: int, is_available: bool) -> None:
+        if is_available:
+            self.available[position >> 3] |= 1 << (position & 7)
+        else:
+            self.available[position >> 3] &= ~(1 << (position & 7)) & 0xFF
+
+    def to_dicts(self) -> list[dict]:
+        floor = self.floor
+        return [
+            {
+                "spot_number": number,
+                "floor": floor,
+                "is_available": self.is_available(position),
+                "price": price
+            }
+            for position, (number, price) in enumerate(zip(self.numbers, self.prices))
+        ]
+
+    def nbytes(self) -> int:
+        return (
+            self.spot_ids.itemsize * len(self.spot_ids)
+            + self.prices.itemsize * len(self.prices)
+            + len(self.available)
+            + sys.getsizeof(self.numbers)
+        )
+
+
+class SpotOccupancyIndex:
+    def __init__(self):
+        self.loaded = False
+        self._pending = PendingDeltas()
+        self._location_ids: dict[str, int] = {}
+        self._location_slices: dict[int, list[FloorSlice]] = {}
+        self._slices: list[FloorSlice] = []
+        self._spot_keys = array("q")
+        self._spot_slots = array("q")
+
+    def begin_load(self) -> int:
+        return self._pending.begin()
+
+    def cancel_load(self, token: int) -> None:
+        self._pending.cancel(token)
+
+    def load(self, rows, token: int) -> None:
+        location_ids = {}
+        location_slices: dict[int, list[FloorSlice]] = {}
+        floor_slices: dict[tuple[int, str | None], FloorSlice] = {}
+        slices: list[FloorSlice] = []
+        slot_by_spot: list[tuple[int, int]] = []
+
+        for row in rows:
+            location_ids[row.Address] = row.LocationID
+            location_slices.setdefault(row.LocationID, [])
+            if row.SpotID is None:
+                continue
+
+            key = (row.LocationID, row.Floor)
+            floor_slice = floor_slices.get(key)
+            if floor_slice is None:
+                floor_slice = FloorSlice(row.LocationID, row.Floor)
+                floor_slices[key] = floor_slice
+                location_slices[row.LocationID].append(floor_slice)
+                slices.append(floor_slice)
+
+            price = float(row.Price) if row.Price is not None else 0.0
+            position = floor_slice.append(row.SpotID, row.SpotNumber, price, bool(row.IsAvailable))
+            slot_by_spot.append((row.SpotID, (len(slices) - 1) << 32 | position))
+
+        slot_by_spot.sort()
+        self._location_ids = location_ids
+        self._location_slices = location_slices
+        self._slices = slices
+        self._spot_keys = array("q", (spot_id for spot_id, _ in slot_by_spot))
+        self._spot_slots = array("q", (slot for _, slot in slot_by_spot))
+        self.loaded = True
+        for apply, spot_id, value in self._pending.finish(token):
+            apply(self, spot_id, value)
+
+    def location_id(self, address: str) -> int | None:
+        return self._location_ids.get(address)
+
+    def has_floors(self, address: str) -> bool:
+        location_id = self._location_ids.get(address)
+        if location_id is None:
+            return False
+        return any(floor_slice.floor is not None for floor_slice in self._location_slices[location_id])
+
+    def get_spots(self, address: str) -> list[dict]:
+        location_id = self._location_ids.get(address)
+        if location_id is None:
+            return []
+        spots = []
+        for floor_slice in self._location_slices[location_id]:
+            spots.extend(floor_slice.to_dicts())
+        return spots
+
+    def _locate(self, spot_id: int) -> tuple[FloorSlice, int] | None:
+        index = bisect_left(self._spot_keys, spot_id)
+        if index == len(self._spot_keys) or self._spot_keys[index] != spot_id:
+            return None
+        slot = self._spot_slots[index]
+        return self._slices[slot >> 32], slot & 0xFFFFFFFF
+
+    def spot_info(self, spot_id: int) -> tuple[int, str | None, str] | None:
+        located = self._locate(spot_id)
+        if located is None:
+            return None
+        floor_slice, position = located
+        return floor_slice.location_id, floor_slice.floor, floor_slice.numbers[position]
+
+    def set_available(self, spot_id: int, is_available: bool, **_) -> None:
+        self._pending.record(SpotOccupancyIndex._apply_available, spot_id, is_available)
+        self._apply_available(spot_id, is_available)
+
+    def set_price(self, spot_id: int, price: float, **_) -> None:
+        self._pending.record(SpotOccupancyIndex._apply_price, spot_id, price)
+        self._apply_price(spot_id, price)
+
+    def _apply_available(self, spot_id: int, is_available: bool) -> None:
+        located = self._locate(spot_id)
+        if located is None:
+            self.loaded = False
+            return
+        floor_slice, position = located
+        floor_slice.set_available(position, bool(is_available))
+
+    def _apply_price(self, spot_id: int, price: float) -> None:
+        located = self._locate(spot_id)
+        if located is None:
+            self.loaded = False
+            return
+        floor_slice, position = located
+        floor_slice.prices[position] = float(price)
+
+    def stats(self) -> dict:
+        return {
+            "loaded": self.loaded,
+            "locations": len(self._location_slices),
+            "floors": len(self._slices),
+            "spots": len(self._spot_keys),
+            "replayed_deltas": self._pending.replayed,
+            "approx_bytes": sum(floor_slice.nbytes() for floor_slice in self._slices)
+            + self._spot_keys.itemsize * len(self._spot_keys) * 2
+        }
+
+
+spot_index = SpotOccupancyIndex()
+
+events.subscribe(events.SPOT_STATUS_CHANGED, spot_index.set_available)
+events.subscribe(events.SPOT_PRICE_CHANGED, spot_index.set_price)
@@ -0,0 +1,92 @@
+import asyncio
+import configparser
+import json
+
+import events
+from users.spot_index import spot_index
+
+
+config = configparser.ConfigParser()
+config.read('config.ini')
+heartbeat_seconds = config.getint('STREAM', 'HEARTBEAT_SECONDS', fallback=15)
+max_subscribers = config.getint('STREAM', 'MAX_SUBSCRIBERS', fallback=5000)
+
+
+class SpotSubscriber:
+    __slots__ = ("pending", "wakeup")
+
+    def __init__(self):
+        self.pending: dict[tuple[str | None, str], bool] = {}
+        self.wakeup = asyncio.Event()
+
+
+class SpotStream:
+    def __init__(self, heartbeat: int = 15, max_subscribers: int = 5000):
+        self.heartbeat = heartbeat
+        self.max_subscribers = max_subscribers
+        self._subscribers: dict[int, set[SpotSubscriber]] = {}
+        self.count = 0
+        self.published = 0
+        self.sent = 0
+        self.coalesced = 0
+
+    def is_full(self) -> bool:
+        return self.count >= self.max_subscribers
+
+    def on_status_changed(self, spot_id: int, is_available: bool, **_) -> None:
+        info = spot_index.spot_info(spot_id)
+        if info is None:
+            return
+        location_id, floor, number = info
+        subscribers = self._subscribers.get(location_id)
+        if not subscribers:
+            return
+        self.published += 1
+        key = (floor, number)
+        for subscriber in subscribers:
+            if key in subscriber.pending:
+                self.coalesced += 1
+            subscriber.pending[key] = bool(is_available)
+            subscriber.wakeup.set()
+
+    async def stream(self, location_id: int, is_disconnected):
+        subscriber = SpotSubscriber()
+        self._subscribers.setdefault(location_id, set()).add(subscriber)
+        self.count += 1
+        try:
+            yield "retry: 3000\n\n"
+            while True:
+                try:
+                    await asyncio.wait_for(subscriber.wakeup.wait(), timeout=self.heartbeat)
+                except asyncio.TimeoutError:
+                    pass
+                if await is_disconnected():
+                    break
+                subscriber.wakeup.clear()
+                if not subscriber.pending:
+                    yield ": ping\n\n"
+                    continue
+                pending, subscriber.pending = subscriber.pending, {}
+                delta = [[number, floor, int(available)] for (floor, number), available in pending.items()]
+                self.sent += 1
+                yield f"event: spots\ndata: {json.dumps(delta, separators=(',', ':'))}\n\n"
+        finally:
+            subscribers = self._subscribers.get(location_id)
+            if subscribers is not None:
+                subscribers.discard(subscriber)
+                if not subscribers:
+                    del self._subscribers[location_id]
+            self.count -= 1
+
+    def stats(self) -> dict:
+        return {
+            "subscribers": self.count,
+            "locations": len(self._subscribers),
+            "published": self.published,
+            "sent": self.sent,
+            "coalesced": self.coalesced
+        }
+
+
+spot_stream = SpotStream(heartbeat=heartbeat_seconds, max_subscribers=max_subscribers)
+events.subscribe(events.SPOT_STATUS_CHANGED, spot_stream.on_status_changed)
@@ -1,5 +1,6 @@
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
-from sqlalchemy import Integer, String, DateTime, ForeignKey, Numeric, Boolean
+from sqlalchemy import Integer, String, Text, Date, DateTime, Float, ForeignKey, Numeric, Boolean, Index
+from sqlalchemy.dialects.mssql import DATETIME2
 from sqlalchemy.sql import func
 
 
@@ -29,6 +30,7 @@ class Car(Base):
     UserID: Mapped[int] = mapped_column(ForeignKey("Users.UserID"), nullable=False)
     CarNumber: Mapped[str] = mapped_column(String(50), nullable=False)
     CarBrand: Mapped[str] = mapped_column(String(100), nullable=False)
+    BookingID: Mapped[int | None] = mapped_column(Integer, nullable=True)
     Created: Mapped[DateTime] = mapped_column(DateTime, default=func.now())
 
     user: Mapped["User"] = relationship("User", back_populates="cars")
@@ -59,14 +61,20 @@ class ParkingSpot(Base):
 
 class Booking(Base):
     __tablename__ = "Bookings"
+    __table_args__ = (
+        Index("IX_Bookings_EndTime", "EndTime"),
+        Index("IX_Bookings_SpotID_StartTime", "SpotID", "StartTime"),
+        Index("IX_Bookings_UserID", "UserID"),
+    )
 
     BookingID: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     UserID: Mapped[int] = mapped_column(ForeignKey("Users.UserID"), nullable=False)
-    CarID: Mapped[int] = mapped_column(ForeignKey("Cars.CarID"), nullable=False)
+    CarID: Mapped[int | None] = mapped_column(ForeignKey("Cars.CarID"), nullable=True)
     SpotID: Mapped[int] = mapped_column(ForeignKey("ParkingSpots.SpotID"), nullable=True)
-    StartTime: Mapped[str] = mapped_column(String(50), nullable=False)
-    EndTime: Mapped[str] = mapped_column(String(50), nullable=False)
+    StartTime: Mapped[DateTime] = mapped_column(DATETIME2, nullable=False)
+    EndTime: Mapped[DateTime] = mapped_column(DATETIME2, nullable=False)
     Created: Mapped[DateTime] = mapped_column(DateTime, default=func.now())
+    Revenue: Mapped[float | None] = mapped_column(Numeric(12, 2), nullable=True)
 
     user: Mapped["User"] = relationship("User", back_populates="bookings")
     parking_spot: Mapped["ParkingSpot"] = relationship("ParkingSpot", back_populates="bookings")
@@ -99,4 +107,34 @@ class CancelledBooking(Base):
     CancellationReason: Mapped[str] = mapped_column(String(255), nullable=False)
     CancellationTime: Mapped[DateTime] = mapped_column(DateTime, default=func.now())
 
-    user: Mapped["User"] = relationship("User", back_populates="cancelled_bookings")
\ No newline at end of file
+    user: Mapped["User"] = relationship("User", back_populates="cancelled_bookings")
+
+class BookingDailyRollup(Base):
+    __tablename__ = "BookingDailyRollups"
+    __table_args__ = (
+        Index("IX_BookingDailyRollups_Day_LocationID", "Day", "LocationID"),
+    )
+
+    Day: Mapped[Date] = mapped_column(Date, primary_key=True)
+    LocationID: Mapped[int] = mapped_column(ForeignKey("ParkingLocations.LocationID"), primary_key=True)
+    SpotID: Mapped[int] = mapped_column(ForeignKey("ParkingSpots.SpotID"), primary_key=True)
+    BookingCount: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    TotalHours: Mapped[float] = mapped_column(Float, nullable=False, default=0)
+    Revenue: Mapped[float] = mapped_column(Numeric(14, 2), nullable=False, default=0)
+
+class OutboxEvent(Base):
+    __tablename__ = "OutboxEvents"
+    __table_args__ = (
+        Index("IX_OutboxEvents_SentAt_EventID", "SentAt", "EventID"),
+        Index("IX_OutboxEvents_UserID_EventID", "UserID", "EventID"),
+    )
+
+    EventID: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    UserID: Mapped[int] = mapped_column(Integer, nullable=False)
+    EventType: Mapped[str] = mapped_column(String(50), nullable=False)
+    Payload: Mapped[str] = mapped_column(Text, nullable=False)
+    Created: Mapped[DateTime] = mapped_column(DATETIME2, nullable=False, default=func.now())
+    Attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    NextAttemptAt: Mapped[DateTime | None] = mapped_column(DATETIME2, nullable=True)
+    LastError: Mapped[str | None] = mapped_column(String(500), nullable=True)
+    SentAt: Mapped[DateTime | None] = mapped_column(DATETIME2, nullable=True)
@@ -1,3 +1,4 @@
+import asyncio
 import configparser
 from datetime import timedelta, datetime
 import json
@@ -6,14 +7,15 @@ from fastapi import APIRouter, HTTPException, Depends, Form, Response, status
 from fastapi.security import OAuth2PasswordRequestForm
 from fastapi.templating import Jinja2Templates
 from fastapi import Request
-from fastapi.responses import HTMLResponse, RedirectResponse
-from aiokafka import AIOKafkaProducer
+from fastapi.responses import HTMLResponse, RedirectResponse, JSONResponse, StreamingResponse
 from starlette.templating import _TemplateResponse
 
 from logging_manager import logger
-from db_conn import DB_connection
+from db_conn import UnitOfWork, db_registry, unit_of_work
 from users.db_manager import UserRepository
-from users.user_schemes import SLoginForm, SRegisterForm, SBookingData, Token, SUser, SCarInfoForm
+from users.price_table import price_table
+from users.spot_stream import spot_stream
+from users.user_schemes import SLoginForm, SRegisterForm, SBookingData, Token, SUser, SCarInfoForm, SPrincipal
 from users.db_manager import ACCESS_TOKEN_EXPIRE_MINUTES, oauth2_scheme
 
 router = APIRouter()
@@ -23,29 +25,15 @@ config = configparser.ConfigParser()
 config.read('config.ini')
 server = config['BD INFO']['USER_DB']
 pay_server = config['BD INFO']['PAY_DB']
-kafka_server = config['KAFKA SETTINGS']['KAFKA_SERVER']
-topic_name = config['KAFKA SETTINGS']['TOPIC_NAME']
 
 latest_booking_for_user: dict[int, int] = {}
 
-user_db = DB_connection(server)
-pay_db = DB_connection(pay_server)
+user_db = db_registry.get(server)
+pay_db = db_registry.get(pay_server)
+user_unit_of_work = unit_of_work(user_db)
 
-def get_user_repository() -> UserRepository:
-    return UserRepository(user_db)
-
-async def send_to_kafka(user_id: int, booking_id: int, amount: float) -> None:
-    producer = AIOKafkaProducer(bootstrap_servers=kafka_server)
-    await producer.start()
-    try:
-        message = {"user_id": user_id, "booking_id": booking_id, "amount": amount}
-        message_bytes = json.dumps(message).encode('utf-8')
-        await producer.send_and_wait(topic_name, message_bytes)
-        logger.info(f"Сообщение отправлено в Kafka: {message}")
-    except Exception as e:
-        logger.error(f"Ошибка отправки в Kafka: {e}")
-    finally:
-        await producer.stop()
+def get_user_repository(unit: UnitOfWork = Depends(user_unit_of_work)) -> UserRepository:
+    return UserRepository(unit)
 
 @router.get("/secure-data")
 async def secure_data(token: str = Depends(oauth2_scheme)):
@@ -126,17 +114,19 @@ async def login_for_access_token(
     )
     return Token(access_token=access_token, token_type="bearer")
 
-@router.get("/users/me/", response_model=SUser)
+@router.get("/users/me/", response_model=SPrincipal)
 async def read_users_me(
-    current_user: Annotated[SUser, Depends(get_user_repository().get_current_active_user)],
+    current_user: Annotated[SPrincipal, Depends(UserRepository(user_db).get_current_active_user)],
 ):
     return current_user
 
 @router.get("/main_page", response_class=HTMLResponse)
 async def main_page(request: Request, user_id: int, repository: UserRepository = Depends(get_user_repository)) -> _TemplateResponse:
     try:
-        username = await repository.get_username(user_id)
-        occupied_parking = await repository.check_available_parking_spots()
+        username, occupied_parking = await asyncio.gather(
+            repository.get_username(user_id),
+            repository.fork().check_available_parking_spots()
+        )
         cancellation_info = await repository.check_cancelled_bookings(user_id)
         
         show_modal = len(occupied_parking) > 0
@@ -174,11 +164,34 @@ async def get_parking_spots(location: str, repository: UserRepository = Depends(
         logger.error(f"Ошибка при получении парковочных мест: {str(e)}")
         raise HTTPException(status_code=500, detail="Ошибка при загрузке парковочных мест")
 
+@router.get("/api/parking_spots/stream")
+async def stream_parking_spots(request: Request, location: str, repository: UserRepository = Depends(get_user_repository)):
+    if spot_stream.is_full():
+        raise HTTPException(status_code=503, detail="Слишком много подписчиков, попробуйте позже")
+    try:
+        location_id = await repository.get_location_id(location)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Неверный формат локации")
+    if location_id is None:
+        raise HTTPException(status_code=404, detail="Парковка не найдена")
+    return StreamingResponse(
+        spot_stream.stream(location_id, request.is_disconnected),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @router.get("/parking_prices")
-async def get_parking_prices(repository: UserRepository = Depends(get_user_repository)):
+async def get_parking_prices(request: Request, repository: UserRepository = Depends(get_user_repository)):
     try:
         prices = await repository.get_parking_prices()
-        return prices
+        headers = {
+            "ETag": f'"{price_table.etag}"',
+            "X-Prices-Version": str(price_table.version),
+            "Cache-Control": "no-cache"
+        }
+        if request.headers.get("if-none-match") == headers["ETag"]:
+            return Response(status_code=304, headers=headers)
+        return JSONResponse(content=prices, headers=headers)
     except Exception as e:
         logger.error(f"Ошибка при получении цен: {e}")
         raise HTTPException(status_code=500, detail="Ошибка при загрузке цен")
@@ -187,10 +200,11 @@ async def get_parking_prices(repository: UserRepository = Depends(get_user_repos
 async def get_user_account(
     request: Request,
     user_id: int,
+    before: int | None = None,
     repository: UserRepository = Depends(get_user_repository)
 ) -> _TemplateResponse:
     try:
-        user_info = await repository.get_user_info(user_id)
+        user_info = await repository.get_user_info(user_id, before_booking_id=before)
         if not user_info.get("bookings"):
             user_info["bookings"] = []
 
@@ -203,6 +217,7 @@ async def get_user_account(
                 "phone": user_info["phone"],
                 "user_id": user_id,
                 "bookings": user_info["bookings"],  
+                "next_cursor": user_info["next_cursor"],
             }
         )
     except ValueError:
@@ -239,40 +254,24 @@ async def create_booking(booking_data: dict, repository: UserRepository = Depend
         if duration_minutes <= 0:
             raise HTTPException(status_code=400, detail="Время окончания должно быть позже времени начала.")
 
-        prices = await repository.get_parking_prices()
-        price_data = next((p for p in prices if p["address"] == address), None)
-        if not price_data:
+        if await repository.get_price_per_minute(address) is None:
             raise HTTPException(status_code=400, detail="Неверный адрес парковки.")
 
-        price_per_minute = price_data["price_per_minute"]
-        amount = duration_minutes * price_per_minute
-
-        spots = await repository.get_parking_spots(f"{0.0}|{address}")
-        logger.info(f"Полученные места для {address}: {spots}")
-
-        has_floors = any(s["floor"] is not None for s in spots)
-        
-        if has_floors and floor is not None:
-            spot = next((s for s in spots if s["spot_number"] == spot_number and s["floor"] == floor and s["is_available"]), None)
-        else:
-            spot = next((s for s in spots if s["spot_number"] == spot_number and s["floor"] is None and s["is_available"]), None)
-
-        if not spot:
-            floor_str = f"на этаже {floor}" if floor is not None else "без этажа"
-            logger.error(f"Место {spot_number} {floor_str} недоступно для адреса {address}")
-            raise HTTPException(status_code=400, detail=f"Место {spot_number} {floor_str} недоступно.")
+        has_floors = await repository.location_has_floors(address)
 
         booking_data_for_db = SBookingData(
             user_id=user_id,
             address=address,
             floor=None if not has_floors else floor,  
             spot_number=spot_number,
-            start_datetime=start_datetime,
-            end_datetime=end_datetime
+            start_datetime=start_dt.replace(tzinfo=None),
+            end_datetime=end_dt.replace(tzinfo=None)
         )
 
-        booking_id, spot_num = await repository.add_booking(booking_data_for_db)
-        await send_to_kafka(user_id, booking_id, round(amount, 2))
+        try:
+            booking_id, spot_num, amount = await repository.add_booking(booking_data_for_db)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
 
         latest_booking_for_user[user_id] = booking_id
         print("\n\n", latest_booking_for_user, "\n\n")
@@ -281,7 +280,7 @@ async def create_booking(booking_data: dict, repository: UserRepository = Depend
             "message": "Бронирование успешно создано",
             "booking_id": booking_id,
             "spot_number": spot_num,
-            "amount": round(amount, 2),
+            "amount": amount,
         }
         return response
 
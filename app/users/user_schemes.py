@@ -1,4 +1,5 @@
 import re
+from datetime import datetime
 
 from pydantic import BaseModel, Field, constr, field_validator, ConfigDict
 from typing import Optional
@@ -11,6 +12,15 @@ class Token(BaseModel):
 class TokenData(BaseModel):
     email: str | None = None
 
+class SPrincipal(BaseModel):
+    UserID: int
+    Username: str
+    Email: str
+    RoleName: str
+    Status: str
+
+    model_config = ConfigDict(from_attributes=True)
+
 class SLoginForm(BaseModel):
     email: str
     password: str = Field(...)
@@ -46,8 +56,9 @@ class SBookingData(BaseModel):
     address: str
     floor: Optional[str] = None
     spot_number: str
-    start_datetime: str
-    end_datetime: str
+    start_datetime: datetime
+    end_datetime: datetime
+    amount: Optional[float] = None
 
 class SCarInfoForm(BaseModel):
     user_id: int